@@ -0,0 +1,63 @@
+# **********************************************************************************************************************
+#   FileName:
+#       actuation_benchmark.py
+#
+#   Description:
+#       Measures the cost of one actuator pipeline tick, from received control input through the
+#       mixer, motor models and dynamics, and checks that the tick doesn't grow memory use
+#
+#   4/30/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import time
+import tracemalloc
+import numpy as np
+from VDrone.actuation import ActuatorPipeline
+from VDrone.dynamics.newton_euler import NewtonEulerSim
+from VDrone.parameters import Codec, StickInputsData
+
+TICKS = 20000
+DT = 0.001
+
+
+def make_pipeline() -> ActuatorPipeline:
+    drone = NewtonEulerSim()
+    drone.mass = 1.0
+    drone.moment_arm_length = 0.2
+    drone.Ixx = drone.Iyy = 0.01
+    drone.Izz = 0.02
+    drone.thrust_coefficient = 1e-5
+    drone.drag_coefficient = 1e-7
+    drone.resolution = DT
+    return ActuatorPipeline(dynamics=drone, max_speed=1000.0)
+
+
+def main() -> None:
+    pipeline = make_pipeline()
+    sticks = StickInputsData()
+    sticks.update((0.0, 0.0, 0.0, 0.5))
+    wire = sticks.encode(Codec.RAW)
+
+    # Warm up so that any compiled kernels and lazily imported protobuf modules are ready
+    for tick in range(100):
+        sticks.decode(wire, Codec.RAW)
+        pipeline.consume(sticks)
+        pipeline.step(tick * DT, DT)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    for tick in range(TICKS):
+        sticks.decode(wire, Codec.RAW)
+        pipeline.consume(sticks)
+        pipeline.step(tick * DT, DT)
+    elapsed = time.perf_counter() - start
+    growth = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    print("ticks: {}  {:.2f} us/tick  memory growth: {} bytes".format(TICKS, elapsed / TICKS * 1e6, growth))
+    print("motor speed: {}  z: {:.3f} m".format(np.round(pipeline.motor_speed, 1), pipeline.dynamics.z))
+
+
+if __name__ == "__main__":
+    main()
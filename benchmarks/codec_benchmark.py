@@ -0,0 +1,42 @@
+# **********************************************************************************************************************
+#   FileName:
+#       codec_benchmark.py
+#
+#   Description:
+#       Measures the per-message encode/decode cost of sensor parameters for each supported codec
+#
+#   4/25/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import timeit
+import numpy as np
+from VDrone.parameters import Codec, GyroData, AccelData, MagData, ImuFrameData
+
+ITERATIONS = 200000
+
+
+def report(name: str, seconds: float) -> None:
+    print("{:<32}{:>10.1f} ns/msg".format(name, seconds / ITERATIONS * 1e9))
+
+
+def main() -> None:
+    gyro = GyroData()
+    gyro.update(np.array([[0.1], [-0.2], [0.3]]))
+
+    frame = ImuFrameData()
+    for sensor, value in ((AccelData(), 9.81), (gyro, 0.0), (MagData(), 0.5)):
+        if sensor is not gyro:
+            sensor.update(np.full((3, 1), value))
+        frame.stage(sensor)
+
+    for name, param, receiver in (("gyro", gyro, GyroData()), ("imu frame", frame, ImuFrameData())):
+        for codec in Codec:
+            payload = param.encode(codec)
+            report("{} {} encode ({} B)".format(name, codec.value, len(payload)),
+                   timeit.timeit(lambda: param.encode(codec), number=ITERATIONS))
+            report("{} {} decode".format(name, codec.value),
+                   timeit.timeit(lambda: receiver.decode(payload, codec), number=ITERATIONS))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# **********************************************************************************************************************
+#   FileName:
+#       import_benchmark.py
+#
+#   Description:
+#       Guards package import time. Each module is imported in a fresh interpreter under
+#       "python -X importtime", and the run fails if a module exceeds its time budget or drags
+#       in a dependency that is supposed to be deferred until first use.
+#
+#   4/28/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Cumulative import time allowed per module (ms). Generous, as the goal is to catch a heavy
+# dependency creeping back in rather than to measure small changes.
+BUDGET_MS = {
+    "VDrone.parameters": 400,
+    "VDrone.database": 400,
+    "VDrone.connection": 600,
+    "VDrone.motors.ideal_motor": 50
+}
+
+# Dependencies that must only load when the feature using them is first exercised
+DEFERRED = [
+    "pint",
+    "pyutils.path",
+    "google.protobuf",
+    "VDrone.nanopb.sim_pb2",
+    "VDrone.nanopb.ahrs_pb2",
+    "VDrone.nanopb.controller_pb2",
+    "VDrone.shm_transport"
+]
+
+RUNS = 5
+
+
+def measure(module: str) -> Tuple[float, List[str]]:
+    """
+    Imports a module in a fresh interpreter
+    Args:
+        module: Module to import
+
+    Returns:
+        Tuple of (cumulative import time in ms, deferred modules that were loaded anyway)
+    """
+    check = "import sys, {0}; print(*[m for m in {1!r} if m in sys.modules])".format(module, DEFERRED)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", check], capture_output=True, text=True,
+                            check=True)
+
+    cumulative_us = 0
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            cumulative_us = int(fields[1])
+
+    return cumulative_us / 1000.0, result.stdout.split()
+
+
+def main() -> int:
+    failures = 0
+    results = {}  # type: Dict[str, float]
+    for module, budget in BUDGET_MS.items():
+        samples = []
+        leaked = []
+        for _ in range(RUNS):
+            elapsed, leaked = measure(module)
+            samples.append(elapsed)
+
+        results[module] = min(samples)
+        status = "ok"
+        if results[module] > budget:
+            status = "OVER BUDGET"
+            failures += 1
+        if leaked:
+            status = "eagerly imports {}".format(", ".join(leaked))
+            failures += 1
+
+        print("{:<32}{:>8.1f} ms  (budget {:>4} ms)  {}".format(module, results[module], budget, status))
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+# **********************************************************************************************************************
+#   FileName:
+#       latency_benchmark.py
+#
+#   Description:
+#       Loopback measurement of SimConnection end-to-end latency, from transmit() until the
+#       message is received by a subscriber playing the role of the flight software.
+#
+#   4/22/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import socket
+import time
+import numpy as np
+import zmq
+from loguru import logger
+from VDrone.connection import SimConnection
+from VDrone.parameters import HeartBeatData
+
+SAMPLES = 2000
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def loopback_config() -> dict:
+    ports = {key.value: free_port() for key in SimConnection.TxSocket}
+    ports.update({key.value: free_port() for key in SimConnection.RxSocket})
+    return {"transport": "tcp", "bind_ip": "127.0.0.1", "port": ports}
+
+
+def main() -> None:
+    logger.remove()
+    cfg = loopback_config()
+    conn = SimConnection(processing_period=0.01, sim_ports=cfg)
+    conn.start()
+
+    # Stand in for the flight software side
+    ctx = zmq.Context.instance()
+    fsw = ctx.socket(zmq.SUB)
+    fsw.connect("tcp://127.0.0.1:{}".format(cfg["port"][SimConnection.TxSocket.SIM_INTERNAL.value]))
+    fsw.setsockopt_string(zmq.SUBSCRIBE, SimConnection.TxTopics.HEARTBEAT.value)
+
+    # Wait out the PUB/SUB slow joiner window
+    hb = HeartBeatData()
+    while not fsw.poll(timeout=10):
+        conn.transmit(hb)
+    while fsw.poll(timeout=50):
+        fsw.recv_multipart()
+
+    latency = np.empty(SAMPLES)
+    for idx in range(SAMPLES):
+        start = time.perf_counter()
+        conn.transmit(hb)
+        fsw.recv_multipart()
+        latency[idx] = time.perf_counter() - start
+
+    conn.kill()
+    conn.join()
+    fsw.close()
+
+    p50, p99 = np.percentile(latency, [50, 99]) * 1e6
+    print("samples: {}  p50: {:.1f} us  p99: {:.1f} us  max: {:.1f} us".format(SAMPLES, p50, p99,
+                                                                               latency.max() * 1e6))
+
+
+if __name__ == "__main__":
+    main()
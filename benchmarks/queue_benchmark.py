@@ -0,0 +1,90 @@
+# **********************************************************************************************************************
+#   FileName:
+#       queue_benchmark.py
+#
+#   Description:
+#       Compares the throughput of queue.Queue against the SPSC ring buffer used by SimConnection
+#
+#   4/26/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import time
+from queue import Queue, Empty
+from threading import Thread
+from VDrone.ring_buffer import OverflowPolicy, SPSCRingBuffer
+
+ITEMS = 200000
+CAPACITY = 1024
+
+
+def report(name: str, seconds: float) -> None:
+    print("{:<36}{:>10.1f} ns/item {:>12.0f} items/s".format(name, seconds / ITEMS * 1e9, ITEMS / seconds))
+
+
+def queue_single_thread() -> float:
+    q = Queue(maxsize=CAPACITY)
+    start = time.perf_counter()
+    for i in range(ITEMS):
+        q.put(i, block=True, timeout=0.05)
+        q.get_nowait()
+    return time.perf_counter() - start
+
+
+def ring_single_thread(policy: OverflowPolicy) -> float:
+    q = SPSCRingBuffer(capacity=CAPACITY, policy=policy)
+    start = time.perf_counter()
+    for i in range(ITEMS):
+        q.put(i, timeout=0.05)
+        q.get()
+    return time.perf_counter() - start
+
+
+def queue_two_threads() -> float:
+    q = Queue(maxsize=CAPACITY)
+
+    def producer():
+        for i in range(ITEMS):
+            q.put(i)
+
+    start = time.perf_counter()
+    thread = Thread(target=producer)
+    thread.start()
+    received = 0
+    while received < ITEMS:
+        try:
+            q.get_nowait()
+            received += 1
+        except Empty:
+            pass
+    thread.join()
+    return time.perf_counter() - start
+
+
+def ring_two_threads() -> float:
+    q = SPSCRingBuffer(capacity=CAPACITY, policy=OverflowPolicy.BLOCK)
+
+    def producer():
+        for i in range(ITEMS):
+            q.put(i)
+
+    start = time.perf_counter()
+    thread = Thread(target=producer)
+    thread.start()
+    received = 0
+    while received < ITEMS:
+        if q.get() is not None:
+            received += 1
+    thread.join()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    report("queue.Queue put/get", queue_single_thread())
+    report("ring drop_oldest put/get", ring_single_thread(OverflowPolicy.DROP_OLDEST))
+    report("ring block put/get", ring_single_thread(OverflowPolicy.BLOCK))
+    report("queue.Queue producer/consumer", queue_two_threads())
+    report("ring producer/consumer", ring_two_threads())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# **********************************************************************************************************************
+#   FileName:
+#       routing_benchmark.py
+#
+#   Description:
+#       Measures the per-message cost of SimData routing lookups. Compares the original nested
+#       scans over the mapping against the precomputed hash indexes.
+#
+#   4/21/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import timeit
+from VDrone.connection import SimConnection, SimData
+from VDrone.parameters import ParameterID
+
+ITERATIONS = 200000
+
+
+def linear_tx_route(data: SimData, param_id: ParameterID):
+    """ Original TX path: two full scans plus a topic encode per message """
+    socket = None
+    topic = None
+    for s in data._mapping.keys():
+        for t in data._mapping[s].keys():
+            if data._mapping[s][t]['param_id'] == param_id:
+                socket = s
+                break
+        if socket:
+            break
+
+    for s in data._mapping.keys():
+        for t in data._mapping[s].keys():
+            if data._mapping[s][t]['param_id'] == param_id:
+                topic = t
+                break
+        if topic:
+            break
+
+    return socket, topic, topic.value.encode('utf-8')
+
+
+def linear_rx_route(data: SimData, raw_topic: bytes):
+    """ Original RX path: decode the topic frame, then scan for its parameter type """
+    topic = SimConnection.RxTopics(raw_topic.decode('utf-8'))
+    for s in data._mapping.keys():
+        if topic in data._mapping[s].keys():
+            return data._mapping[s][topic]['param_type']
+
+
+def indexed_tx_route(data: SimData, param_id: ParameterID):
+    return data.get_route(param_id)
+
+
+def indexed_rx_route(data: SimData, raw_topic: bytes):
+    return data._type_by_topic_bytes.get(raw_topic)
+
+
+def report(name: str, seconds: float) -> None:
+    print("{:<24}{:>10.1f} ns/msg".format(name, seconds / ITERATIONS * 1e9))
+
+
+def main() -> None:
+    data = SimData()
+    tx_param = ParameterID.MAG_DATA  # Last sensor in the mapping, so the worst case scan
+    rx_topic = SimConnection.RxTopics.HEARTBEAT.value.encode('utf-8')
+
+    report("tx linear", timeit.timeit(lambda: linear_tx_route(data, tx_param), number=ITERATIONS))
+    report("tx indexed", timeit.timeit(lambda: indexed_tx_route(data, tx_param), number=ITERATIONS))
+    report("rx linear", timeit.timeit(lambda: linear_rx_route(data, rx_topic), number=ITERATIONS))
+    report("rx indexed", timeit.timeit(lambda: indexed_rx_route(data, rx_topic), number=ITERATIONS))
+
+
+if __name__ == "__main__":
+    main()
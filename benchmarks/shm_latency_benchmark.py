@@ -0,0 +1,53 @@
+# **********************************************************************************************************************
+#   FileName:
+#       shm_latency_benchmark.py
+#
+#   Description:
+#       Same measurement as latency_benchmark.py, but over the shared memory transport. The flight
+#       software stand-in attaches to the regions and waits on its doorbell.
+#
+#   4/27/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import time
+import numpy as np
+import zmq
+from loguru import logger
+from VDrone.connection import SimConnection, SHM_TRANSPORT
+from VDrone.parameters import HeartBeatData
+from VDrone.shm_transport import ShmTransport
+
+SAMPLES = 2000
+
+
+def main() -> None:
+    logger.remove()
+    cfg = {"transport": SHM_TRANSPORT, "shm_name": "vdrone_bench", "bind_ip": "", "port": {}}
+    conn = SimConnection(processing_period=0.01, sim_ports=cfg)
+    conn.start()
+
+    # Stand in for the flight software side
+    fsw = ShmTransport(name=cfg["shm_name"], slot_count=0, context=zmq.Context.instance(), owner=False)
+    poller = zmq.Poller()
+    poller.register(fsw.doorbell, zmq.POLLIN)
+
+    hb = HeartBeatData()
+    latency = np.empty(SAMPLES)
+    for idx in range(SAMPLES):
+        start = time.perf_counter()
+        conn.transmit(hb)
+        while not any(True for _ in fsw.receive()):
+            poller.poll(timeout=100)
+        latency[idx] = time.perf_counter() - start
+
+    fsw.close()
+    conn.kill()
+    conn.join()
+
+    p50, p99 = np.percentile(latency, [50, 99]) * 1e6
+    print("samples: {}  p50: {:.1f} us  p99: {:.1f} us  max: {:.1f} us".format(SAMPLES, p50, p99,
+                                                                               latency.max() * 1e6))
+
+
+if __name__ == "__main__":
+    main()
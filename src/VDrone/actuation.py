@@ -0,0 +1,167 @@
+# **********************************************************************************************************************
+#   FileName:
+#       actuation.py
+#
+#   Description:
+#       Turns control inputs received from the flight software or the pilot into motor speeds,
+#       and those into motion of the airframe
+#
+#   4/30/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import numpy as np
+from enum import Enum
+from typing import List, Sequence
+from VDrone.dynamics.abstract import IDynamics
+from VDrone.motors.abstract_motor import IMotor
+from VDrone.motors.ideal_motor import IdealMotor
+from VDrone.motors.mixer import NUM_MOTORS, QuadMixer
+from VDrone.parameters import IParameter, ParameterID
+
+
+class ControlSource(Enum):
+    """ Which input is currently driving the motors """
+    NONE = "none"  # Nothing received yet, or the last input went stale
+    STICKS = "sticks"  # Pilot stick inputs passed through the mixer
+    MOTOR_COMMAND = "motor_command"  # Per motor commands from the flight software
+
+
+class ActuatorPipeline:
+    """
+    Streams control inputs through the mixer, the motor models and the dynamics. Inputs only
+    update preallocated buffers as they arrive, and step() runs the whole chain once per tick,
+    so every stage sees the same input and nothing is allocated per message or per tick.
+    Whichever input arrived most recently drives the motors.
+    """
+
+    def __init__(self, dynamics: IDynamics, motors: List[IMotor] = None, mixer: QuadMixer = None,
+                 max_speed: float = 1000.0, input_timeout: float = 0.5):
+        """
+        Initialize the pipeline
+        Args:
+            dynamics: Airframe model fed with the motor speeds, e.g. NewtonEulerSim
+            motors: Model of each motor in front, right, back, left order. Defaults to ideal motors.
+            mixer: Maps stick inputs to motor commands. Defaults to a plus configuration mixer.
+            max_speed: Motor speed reference at a full command (rad/s)
+            input_timeout: Sim time without any new input before the motors are commanded to
+                           stop (seconds)
+        """
+        self.dynamics = dynamics
+        self.motors = motors if motors else [IdealMotor() for _ in range(NUM_MOTORS)]
+        if len(self.motors) != NUM_MOTORS:
+            raise ValueError("Expected {} motors, got {}".format(NUM_MOTORS, len(self.motors)))
+
+        self.mixer = mixer if mixer else QuadMixer()
+        self.max_speed = max_speed
+        self.input_timeout = input_timeout
+
+        # Pipeline stage buffers, reused every tick
+        self._sticks = np.zeros(NUM_MOTORS)  # Latest (pitch, roll, yaw, throttle)
+        self._command = np.zeros(NUM_MOTORS)  # Normalized command per motor
+        self._reference = np.zeros(NUM_MOTORS)  # Speed reference handed to the motor models (rad/s)
+        self._speed = np.zeros(NUM_MOTORS)  # Motor model outputs, the control input of the dynamics
+
+        self._source = ControlSource.NONE
+        self._time = 0.0
+        self._input_time = -np.inf
+
+        # Inputs that were the wrong size and had to be thrown away
+        self.rejected = 0
+
+    @property
+    def source(self) -> ControlSource:
+        return self._source
+
+    @property
+    def motor_speed(self) -> np.ndarray:
+        """
+        Motor speeds used in the last step. This is the live buffer, so copy it to keep it.
+        Returns:
+            np.ndarray of rad/s in front, right, back, left order
+        """
+        return self._speed
+
+    def consume(self, param: IParameter) -> bool:
+        """
+        Takes in a parameter from SimConnection.receive() if it is a control input. The data is
+        copied out, so the parameter can be released right after.
+        Args:
+            param: Received parameter
+
+        Returns:
+            True: The parameter was a control input and has been applied
+            False: The parameter is not a control input, or was rejected
+        """
+        param_id = param.id
+        if param_id is ParameterID.STICK_INPUTS:
+            return self.set_sticks(param.view())
+        elif param_id is ParameterID.MOTOR_COMMAND:
+            return self.set_motor_command(param.view())
+        return False
+
+    def set_sticks(self, sticks: Sequence[float]) -> bool:
+        """
+        Drives the motors from pilot stick inputs on the following steps
+        Args:
+            sticks: (pitch, roll, yaw, throttle) as held by StickInputsData
+
+        Returns:
+            True: The inputs were applied
+            False: The inputs were the wrong size
+        """
+        if len(sticks) != NUM_MOTORS:
+            self.rejected += 1
+            return False
+
+        self._sticks[:] = sticks
+        self._source = ControlSource.STICKS
+        self._input_time = self._time
+        return True
+
+    def set_motor_command(self, command: Sequence[float]) -> bool:
+        """
+        Drives the motors directly on the following steps, bypassing the mixer. Accepts the
+        contents of MotorCommandData or the motor command of a tick acknowledgment.
+        Args:
+            command: Normalized command for each motor in front, right, back, left order
+
+        Returns:
+            True: The command was applied
+            False: The command was the wrong size
+        """
+        if len(command) != NUM_MOTORS:
+            self.rejected += 1
+            return False
+
+        self._command[:] = command
+        np.clip(self._command, 0.0, 1.0, out=self._command)
+        self._source = ControlSource.MOTOR_COMMAND
+        self._input_time = self._time
+        return True
+
+    def step(self, t: float, dt: float) -> np.ndarray:
+        """
+        Runs the latest input through the mixer, the motor models and the dynamics. The
+        signature matches SimScheduler tasks, so this can be registered directly.
+        Args:
+            t: Current sim time (seconds)
+            dt: How far forward to step the models (seconds)
+
+        Returns:
+            The state of the dynamics model after the step
+        """
+        self._time = t
+        if t - self._input_time > self.input_timeout:
+            self._source = ControlSource.NONE
+            self._command.fill(0.0)
+        elif self._source is ControlSource.STICKS:
+            self.mixer.mix(self._sticks, out=self._command)
+
+        np.multiply(self._command, self.max_speed, out=self._reference)
+
+        speed = self._speed
+        reference = self._reference
+        for idx, motor in enumerate(self.motors):
+            speed[idx] = motor.step(control=reference[idx], last_state=speed[idx], dt=dt)
+
+        return self.dynamics.step(control=speed, last_state=None, dt=dt)
@@ -0,0 +1,316 @@
+# **********************************************************************************************************************
+#   FileName:
+#       async_connection.py
+#
+#   Description:
+#       asyncio native connection to a simulated flight controller over ZMQ
+#
+#   4/23/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import asyncio
+import zmq
+import zmq.asyncio
+from pathlib import Path
+from typing import AsyncIterator, Dict, Tuple, Union
+from loguru import logger
+from VDrone.connection import SimConnection, SimData, configure_sockets, socket_codecs
+from VDrone.parameters import Codec, IParameter, SimTickData, TickAckData, TimedParameter
+
+
+class AsyncSimConnection:
+    """
+    Manages a connection to a simulated flight controller from within an asyncio event loop.
+    Uses the same sockets, topics and SimData routing as SimConnection, but without a
+    dedicated thread, so a single loop can drive many virtual drones.
+    """
+
+    TxSocket = SimConnection.TxSocket
+    TxTopics = SimConnection.TxTopics
+    RxSocket = SimConnection.RxSocket
+    RxTopics = SimConnection.RxTopics
+
+    def __init__(self, context: zmq.asyncio.Context = None, rx_queue_size: int = 1024,
+                 sim_ports: Union[str, Path, dict, None] = None, lockstep: bool = False,
+                 lockstep_timeout: float = 0.1, lockstep_max_missed: int = 3):
+        """
+        Initialize the connection and bind/connect its sockets
+        Args:
+            context: ZMQ context to create sockets on. Defaults to the shared global instance.
+            rx_queue_size: Maximum number of received parameters buffered for receive()
+            sim_ports: Sim port configuration or path to it. Defaults as for SimConnection.
+            lockstep: When set, end_tick() waits until the flight software has acknowledged the
+                      tick, as for SimConnection
+            lockstep_timeout: Longest end_tick() waits for an acknowledgment (seconds)
+            lockstep_max_missed: Consecutive timeouts before giving up on waiting and free running
+                                 until acknowledgments arrive again
+        """
+        # ---------------------------------------------------------
+        # Public Attributes: Modify to change the system behavior
+        # ---------------------------------------------------------
+        # How long the heartbeat signal may be missing before the connection is considered stale (seconds)
+        self.stale_connection_timeout = 5.0
+
+        # ---------------------------------------------------------
+        # Private configuration
+        # ---------------------------------------------------------
+        self._data_map = SimData()
+        self._heartbeat_topic = self._data_map.get_encoded_topic(self.RxTopics.HEARTBEAT)
+
+        # ZMQ Resources
+        self._zmq_context = context if context else zmq.asyncio.Context.instance()
+        self._zmq_pub_sockets = {key.value: self._zmq_context.socket(zmq.PUB) for key in
+                                 self.TxSocket}  # type: Dict[str, zmq.asyncio.Socket]
+        self._zmq_sub_sockets = {key.value: self._zmq_context.socket(zmq.SUB) for key in
+                                 self.RxSocket}  # type: Dict[str, zmq.asyncio.Socket]
+        cfg = SimConnection._load_sim_ports(sim_ports)
+        configure_sockets(cfg=cfg, pub_sockets=self._zmq_pub_sockets,
+                          sub_sockets=self._zmq_sub_sockets, data_map=self._data_map)
+        self._socket_codecs = socket_codecs(cfg)
+
+        # Flight controller connection status
+        self._fcs_connected = TimedParameter(bool, initial_value=False, timeout=0.5)
+        self._heartbeat_count = 0
+        self._heartbeat_event = asyncio.Event()
+
+        # Received data is buffered here by the pump task until consumed by receive()
+        self._rx_queue = asyncio.Queue(maxsize=rx_queue_size)  # type: asyncio.Queue[IParameter]
+        self._pump_task = None  # type: asyncio.Task
+
+        # Lockstep with the flight software, see SimConnection.end_tick()
+        self._lockstep = lockstep
+        self._lockstep_timeout = lockstep_timeout
+        self._lockstep_max_missed = lockstep_max_missed
+        self._lockstep_missed = 0
+        self._sim_tick = SimTickData()
+        self._tick_ack = TickAckData()
+        self._tick_ack_topic = self._data_map.get_encoded_topic(self.RxTopics.TICK_ACK)
+        self._last_ack = (-1, ())  # type: Tuple[int, tuple]
+        self._ack_event = asyncio.Event()
+        self._lockstep_stats = {"ticks": 0, "acked": 0, "timeouts": 0, "free_running": 0}
+
+    async def __aenter__(self) -> 'AsyncSimConnection':
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    def release(self, data: IParameter) -> None:
+        """
+        Hands a received parameter back for reuse once the consumer is done with it
+        Args:
+            data: Parameter previously yielded by receive()
+
+        Returns:
+            None
+        """
+        self._data_map.release_param(data)
+
+    def start(self) -> None:
+        """
+        Starts the receive pump on the running event loop. Safe to call more than once.
+        Returns:
+            None
+        """
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.ensure_future(self._rx_message_pump())
+
+    async def close(self) -> None:
+        """
+        Stops the receive pump and closes all sockets
+        Returns:
+            None
+        """
+        if self._pump_task is not None:
+            self._pump_task.cancel()
+            try:
+                await self._pump_task
+            except asyncio.CancelledError:
+                pass
+            self._pump_task = None
+
+        for socket in list(self._zmq_pub_sockets.values()) + list(self._zmq_sub_sockets.values()):
+            socket.close(linger=0)
+
+    async def transmit(self, data: IParameter) -> None:
+        """
+        Transmits a piece of data to the flight software
+        Args:
+            data: Parameter instance to be transmitted
+
+        Returns:
+            None
+        """
+        socket, topic, encoded_topic = self._data_map.get_route(data.id)
+        if socket is None:
+            logger.error("No route for parameter {}".format(data.id))
+            return
+
+        codec = self._socket_codecs.get(socket.value, Codec.PROTOBUF)
+        await self._zmq_pub_sockets[socket.value].send_multipart([encoded_topic, data.encode(codec)])
+        logger.trace("Send -- Topic: {}".format(topic.value))
+
+    async def end_tick(self, tick: int) -> Union[Tuple[int, tuple], None]:
+        """
+        Publishes the end of a simulation tick once all of its sensor data has been transmitted.
+        In lockstep mode this then waits until the flight software acknowledges the tick.
+        Args:
+            tick: Number of the tick that just finished, e.g. SimScheduler.tick
+
+        Returns:
+            The (tick, motor_command) acknowledgment, or None when not in lockstep mode, when the
+            acknowledgment timed out, or while free running after repeated timeouts
+        """
+        self._sim_tick.update(tick)
+        await self.transmit(self._sim_tick)
+        self._lockstep_stats['ticks'] += 1
+        if not self._lockstep:
+            return None
+
+        self.start()
+        free_running = self._lockstep_missed >= self._lockstep_max_missed
+        if free_running:
+            # Nothing else awaits on this path, so yield once to let the pump take in new acknowledgments
+            await asyncio.sleep(0)
+
+        async def wait_for_ack():
+            while self._last_ack[0] < tick:
+                self._ack_event.clear()
+                await self._ack_event.wait()
+
+        if self._last_ack[0] >= tick or not free_running:
+            try:
+                await asyncio.wait_for(wait_for_ack(), timeout=self._lockstep_timeout)
+                self._lockstep_missed = 0
+                self._lockstep_stats['acked'] += 1
+                return self._last_ack
+            except asyncio.TimeoutError:
+                pass
+
+        self._lockstep_missed += 1
+        if free_running:
+            self._lockstep_stats['free_running'] += 1
+        else:
+            self._lockstep_stats['timeouts'] += 1
+            if self._lockstep_missed == self._lockstep_max_missed:
+                logger.warning("No tick acknowledgment for {} ticks, free running".format(self._lockstep_missed))
+        return None
+
+    def metrics(self) -> Dict[str, Dict[str, int]]:
+        """
+        Snapshot of the lockstep statistics
+        Returns:
+            Dictionary with the lockstep counts under "lockstep", as for SimConnection.metrics()
+        """
+        return {"lockstep": dict(self._lockstep_stats)}
+
+    async def receive(self) -> AsyncIterator[IParameter]:
+        """
+        Asynchronously iterates over data received from the flight software
+        Returns:
+            Async iterator of IParameter
+        """
+        self.start()
+        while True:
+            yield await self._rx_queue.get()
+
+    async def connect(self, timeout: Union[float, int], heartbeats: int = 3) -> bool:
+        """
+        Waits for the remote flight controller software to show signs of life
+        Args:
+            timeout: How long to wait in seconds
+            heartbeats: How many heartbeats must be seen before considering the link up
+
+        Returns:
+            True: Successfully connected within the timeout window
+            False: Did not connect or connection was rejected
+        """
+        self.start()
+        target = self._heartbeat_count + heartbeats
+
+        async def wait_for_heartbeats():
+            while self._heartbeat_count < target:
+                self._heartbeat_event.clear()
+                await self._heartbeat_event.wait()
+
+        try:
+            await asyncio.wait_for(wait_for_heartbeats(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Timed out waiting for flight software heartbeat")
+            return False
+
+        return self.is_connected()
+
+    def is_connected(self) -> bool:
+        """
+        Checks if the virtual drone is connected up to the flight software
+        Returns:
+            True: Still connected
+            False: Not connected
+        """
+        return self._fcs_connected.is_valid()
+
+    async def _rx_message_pump(self) -> None:
+        """
+        Receives messages from every SUB socket as they arrive, tracking heartbeats and
+        queueing all other data for receive()
+        Returns:
+            None
+        """
+        poller = zmq.asyncio.Poller()
+        codecs = {}
+        for name, socket in self._zmq_sub_sockets.items():
+            poller.register(socket, zmq.POLLIN)
+            codecs[socket] = self._socket_codecs.get(name, Codec.PROTOBUF)
+
+        while True:
+            for socket, _ in await poller.poll():
+                msg = await socket.recv_multipart()
+                if len(msg) != 2:
+                    continue
+
+                if msg[0] == self._heartbeat_topic:
+                    self._fcs_connected.update(True)
+                    self._heartbeat_count += 1
+                    self._heartbeat_event.set()
+                    continue
+
+                if msg[0] == self._tick_ack_topic:
+                    self._handle_tick_ack(msg[1], codecs[socket])
+                    continue
+
+                param = self._data_map.acquire_param_from_topic_bytes(msg[0])
+                if not param:
+                    logger.error("No message type associated with topic {}".format(msg[0]))
+                    continue
+
+                if not param.decode(msg[1], codecs[socket]):
+                    logger.error("Failed to convert data for type {} on topic {}".format(type(param), msg[0]))
+                    self._data_map.release_param(param)
+                    continue
+
+                if self._rx_queue.full():
+                    # Favor fresh data. Discard the oldest sample rather than stalling the pump.
+                    self._data_map.release_param(self._rx_queue.get_nowait())
+                self._rx_queue.put_nowait(param)
+
+    def _handle_tick_ack(self, serialized_data: bytes, codec: Codec) -> None:
+        """
+        Records a tick acknowledgment from the flight software and wakes up end_tick()
+        Args:
+            serialized_data: The raw acknowledgment data
+            codec: Wire format used by the socket the data arrived on
+
+        Returns:
+            None
+        """
+        if not self._tick_ack.decode(serialized_data, codec):
+            logger.error("Failed to convert tick acknowledgment")
+            return
+
+        self._last_ack = self._tick_ack.view()
+        if self._lockstep_missed >= self._lockstep_max_missed:
+            logger.info("Tick acknowledgments resumed at tick {}, back in lockstep".format(self._last_ack[0]))
+        self._lockstep_missed = 0
+        self._ack_event.set()
@@ -0,0 +1,218 @@
+# **********************************************************************************************************************
+#   FileName:
+#       clock.py
+#
+#   Description:
+#       Time sources shared by the simulator, plus a deadline driven timeout service
+#
+#   4/29/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import heapq
+import itertools
+import time
+from abc import ABCMeta, abstractmethod
+from threading import Condition, Thread
+from typing import Any, List, Tuple, Union
+
+
+class IClock:
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def now(self) -> float:
+        """
+        Current time in seconds. Only differences between readings are meaningful.
+        Returns:
+            float
+        """
+        raise NotImplementedError
+
+
+class MonotonicClock(IClock):
+    """ Real time clock that never jumps backwards, unlike time.time() """
+
+    def now(self) -> float:
+        return time.monotonic_ns() * 1e-9
+
+    def now_ns(self) -> int:
+        return time.monotonic_ns()
+
+
+class SimClock(IClock):
+    """ Clock that only moves when the simulation advances it """
+
+    def __init__(self, start: float = 0.0):
+        """
+        Initialize the clock
+        Args:
+            start: Initial sim time in seconds
+        """
+        self._time = start
+
+    def now(self) -> float:
+        return self._time
+
+    def advance(self, dt: float) -> float:
+        """
+        Moves sim time forward
+        Args:
+            dt: How far to move in seconds
+
+        Returns:
+            The new sim time
+        """
+        self._time += dt
+        return self._time
+
+    def set(self, t: float) -> None:
+        self._time = t
+
+
+_default_clock = MonotonicClock()  # type: IClock
+
+
+def default_clock() -> IClock:
+    """
+    Clock used by anything that isn't handed one explicitly
+    Returns:
+        IClock
+    """
+    return _default_clock
+
+
+def set_default_clock(clock: IClock) -> None:
+    """
+    Replaces the process wide default clock. Only affects objects created afterwards.
+    Args:
+        clock: New default clock
+
+    Returns:
+        None
+    """
+    global _default_clock
+    _default_clock = clock
+
+
+class TimeoutService:
+    """
+    Min-heap of parameter deadlines. Each watched parameter has at most one live heap entry,
+    which is pushed back when it turns out the parameter was updated in the meantime, so
+    updates never touch the heap. Parameters expire exactly once per missed deadline.
+
+    Watched objects must provide a "deadline" property and an "_expire(now)" method that
+    returns True if the object actually expired, as TimedParameter does.
+    """
+
+    def __init__(self, clock: IClock = None):
+        """
+        Initialize the service
+        Args:
+            clock: Time source deadlines are measured against. Defaults to the default clock.
+        """
+        self.clock = clock if clock else default_clock()
+        self._heap = []  # type: List[Tuple[float, int, Any]]
+        self._sequence = itertools.count()
+        self._condition = Condition()
+        self._thread = None  # type: Union[Thread, None]
+        self._running = False
+
+        # Metrics
+        self.expired = 0
+        self.rearmed = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def watch(self, target: Any) -> None:
+        """
+        Starts tracking the deadline of an object
+        Args:
+            target: Object to watch
+
+        Returns:
+            None
+        """
+        with self._condition:
+            heapq.heappush(self._heap, (target.deadline, next(self._sequence), target))
+            if self._heap[0][2] is target:
+                self._condition.notify()
+
+    def next_deadline(self) -> float:
+        """
+        Earliest pending deadline
+        Returns:
+            Deadline in clock seconds, or infinity if nothing is watched
+        """
+        with self._condition:
+            return self._heap[0][0] if self._heap else float('inf')
+
+    def poll(self) -> int:
+        """
+        Expires everything whose deadline has passed. Call this after advancing a sim clock,
+        or let start() call it from a background thread when running in real time.
+        Returns:
+            Number of objects that expired
+        """
+        now = self.clock.now()
+        due = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, target = heapq.heappop(self._heap)
+                deadline = target.deadline
+                if deadline > now:
+                    heapq.heappush(self._heap, (deadline, next(self._sequence), target))
+                    self.rearmed += 1
+                else:
+                    due.append(target)
+
+        # Expiry hooks run outside the lock so they are free to watch() again
+        fired = 0
+        for target in due:
+            if target._expire(now):
+                fired += 1
+        self.expired += fired
+        return fired
+
+    def start(self) -> None:
+        """
+        Polls from a background thread, sleeping until the next deadline. Only meaningful for
+        clocks that track real time.
+        Returns:
+            None
+        """
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+
+        self._thread = Thread(target=self._run, name="timeout_service", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops the background thread, if running
+        Returns:
+            None
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._running:
+                    return
+
+                timeout = None
+                if self._heap:
+                    timeout = max(self._heap[0][0] - self.clock.now(), 0.0)
+                if timeout != 0.0:
+                    self._condition.wait(timeout)
+
+            self.poll()
@@ -8,17 +8,29 @@
 #   4/13/21 | Brandon Braun | brandonbraun653@gmail.com
 # **********************************************************************************************************************
 
+import copy
 import json
+import os
 import zmq
-from pyutils.path import find_parent_path
-from queue import Queue, Empty
-from typing import Union, List, Dict
+from typing import Union, List, Dict, Tuple
 from pathlib import Path
 from loguru import logger
-from time import sleep
 from enum import Enum, IntEnum
-from threading import Thread, Event
+from threading import Condition, Thread, Event, Lock
 from VDrone.parameters import *
+from VDrone.ring_buffer import OverflowPolicy, SPSCRingBuffer
+
+# File every SimConnection logs to unless told otherwise. Only added as a sink once per process.
+DEFAULT_LOG_FILE = "drone_log.log"
+_log_files = set()
+
+# Environment variable that points at the sim port configuration, bypassing the project search
+SIM_PORTS_ENV = "VDRONE_SIM_PORTS"
+
+# Process wide cache of parsed sim port configurations: {resolved path: (mtime, config)}
+_sim_ports_cache = {}  # type: Dict[Path, Tuple[int, dict]]
+_sim_ports_default = {}  # type: Dict[Path, Path]
+_sim_ports_lock = Lock()
 
 
 class SimConnection(Thread):
@@ -41,6 +53,9 @@ class SimConnection(Thread):
         ACCEL_DATA = "accel"
         GYRO_DATA = "gyro"
         MAG_DATA = "mag"
+        IMU_FRAME = "imu"
+        IMU_FRAME_BATCH = "imu_batch"
+        SIM_TICK = "sim_tick"
 
     class RxSocket(Enum):
         """ Supported sockets for receiving data """
@@ -51,14 +66,47 @@ class SimConnection(Thread):
     class RxTopics(Enum):
         """ Supported topics to receive data on for RX sockets """
         HEARTBEAT = "rx_heartbeat"
+        TICK_ACK = "tick_ack"
+        MOTOR_COMMAND = "motor_cmd"
+        STICK_INPUTS = "sticks"
 
     class DataFlow(Enum):
         """ Classifies the direction data is flowing """
         TX = "tx"
         RX = "rx"
 
-    def __init__(self, processing_period: float = 0.01):
-        """ Power up the drone class """
+    def __init__(self, processing_period: float = 0.01, imu_frame_mode: bool = False, imu_batch_size: int = 1,
+                 codecs: Dict[str, Codec] = None, tx_queue_size: int = 1024, rx_queue_size: int = 1024,
+                 tx_overflow: OverflowPolicy = OverflowPolicy.BLOCK,
+                 rx_overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+                 log_file: Union[str, None] = DEFAULT_LOG_FILE, sim_ports: Union[str, Path, dict, None] = None,
+                 lockstep: bool = False, lockstep_timeout: float = 0.1, lockstep_max_missed: int = 3):
+        """
+        Power up the drone class
+        Args:
+            processing_period: Longest the pump idles between checks of the kill signal (seconds)
+            imu_frame_mode: When set, accel, gyro and mag data are combined into a single ImuFrame
+                            message per tick instead of being published on their own topics
+            imu_batch_size: How many ticks of IMU frames to pack into one ImuFrameBatch message.
+                            A size of 1 publishes each frame as soon as it is complete.
+            codecs: Per socket codec overrides, keyed by socket name. Takes precedence over the
+                    "codec" section of the sim port configuration.
+            tx_queue_size: Capacity of the transmit queue
+            rx_queue_size: Capacity of the receive queue
+            tx_overflow: What transmit() does when the transmit queue is full
+            rx_overflow: What the pump does when the receive queue is full. BLOCK stalls the pump
+                         for up to 100ms, so prefer one of the drop policies.
+            log_file: File to write trace logs to. None skips file logging, which short lived
+                      workers may prefer.
+            sim_ports: Sim port configuration to use, either already loaded or as a path to the
+                       JSON file. Defaults to the VDRONE_SIM_PORTS environment variable, then to
+                       the copy in the Valkyrie project tree.
+            lockstep: When set, end_tick() holds the simulation until the flight software has
+                      acknowledged the tick, so neither side can run ahead of the other
+            lockstep_timeout: Longest end_tick() waits for an acknowledgment (wall seconds)
+            lockstep_max_missed: Consecutive timeouts before giving up on waiting and free running
+                                 until acknowledgments arrive again
+        """
         super().__init__()
 
         # ---------------------------------------------------------
@@ -71,7 +119,9 @@ class SimConnection(Thread):
         # Private configuration
         # ---------------------------------------------------------
         # Initialize the file logger for this class
-        logger.add("drone_log.log", level="TRACE")
+        if log_file and log_file not in _log_files:
+            logger.add(log_file, level="TRACE")
+            _log_files.add(log_file)
 
         # Initialize event signaling
         self._event_signals = {}
@@ -81,6 +131,7 @@ class SimConnection(Thread):
         # Networking information
         self._pump_rate = processing_period
         self._data_map = SimData()
+        self._heartbeat_topic = self._data_map.get_encoded_topic(self.RxTopics.HEARTBEAT)
 
         # ZMQ Resources
         self._zmq_context = zmq.Context(io_threads=8)
@@ -88,14 +139,81 @@ class SimConnection(Thread):
                                  self.TxSocket}  # type: Dict[str, zmq.Socket]
         self._zmq_sub_sockets = {key.value: self._zmq_context.socket(zmq.SUB) for key in
                                  self.RxSocket}  # type: Dict[str, zmq.Socket]
-        self._boot_zmq()
+        self._sim_cfg = self._load_sim_ports(sim_ports)
+
+        # Wire format used on each socket. Both ends read the same configuration, so they agree
+        # on the codec without a handshake.
+        self._socket_codecs = socket_codecs(self._sim_cfg)
+        self._socket_codecs.update(codecs or {})
+
+        # Same host flight software can skip the network entirely. Data then moves through one
+        # shared memory slot per parameter, and the PUB/SUB sockets are left unbound.
+        self._shm = None  # type: Union['ShmTransport', None]
+        self._shm_rx_routes = {}  # type: Dict[int, Tuple[bytes, Codec]]
+        if self._sim_cfg['transport'] == SHM_TRANSPORT:
+            self._boot_shm()
+        else:
+            self._boot_zmq()
+
+        # Wakeup channel that lets other threads interrupt the pump while it is blocked polling.
+        # The sending side is shared between threads, so it is guarded by a lock.
+        wakeup_address = "inproc://vdrone_wakeup_{}".format(id(self))
+        self._wakeup_rx = self._zmq_context.socket(zmq.PAIR)
+        self._wakeup_rx.bind(wakeup_address)
+        self._wakeup_tx = self._zmq_context.socket(zmq.PAIR)
+        self._wakeup_tx.connect(wakeup_address)
+        self._wakeup_lock = Lock()
+
+        # Pre-built topic frames for every routed parameter. Frames are reused for every send,
+        # so neither the topic string nor its encoding is rebuilt per message. RAW routes also
+        # get a buffer that each message is packed into. Payloads that small are always copied
+        # by ZMQ and by the shared memory transport, so the buffer is free again once sent.
+        self._tx_routes = {}  # type: Dict[ParameterID, Tuple[zmq.Socket, zmq.Frame, Codec, bytearray]]
+        for param_id in ParameterID:
+            socket, _, encoded_topic = self._data_map.get_route(param_id)
+            if isinstance(socket, self.TxSocket):
+                codec = self._socket_codecs.get(socket.value, Codec.PROTOBUF)
+                buffer = bytearray(RAW_MAX_SIZE) if codec is Codec.RAW else None
+                self._tx_routes[param_id] = (self._zmq_pub_sockets[socket.value], zmq.Frame(encoded_topic), codec,
+                                             buffer)
 
         # Flight controller connection status
         self._fcs_connected = TimedParameter(bool, initial_value=False, timeout=0.5)
 
-        # Data queues
-        self._tx_queue = Queue()  # type: Queue[IParameter]
-        self._rx_queue = Queue()  # type: Queue[IParameter]
+        # Combined IMU publishing. Sensor data is staged into the frame until each of the three
+        # sensors has reported for the tick, then the frame (or a full batch of them) is sent.
+        self._imu_frame_mode = imu_frame_mode
+        self._imu_frame = None  # type: Union[ImuFrameData, None]
+        self._imu_batch = None  # type: Union[ImuFrameBatchData, None]
+        if imu_frame_mode:
+            self._imu_frame = ImuFrameData()
+            if imu_batch_size > 1:
+                self._imu_batch = ImuFrameBatchData(batch_size=imu_batch_size)
+
+        # Lockstep with the flight software. The tick marker rides the sensor socket, so it always
+        # arrives after the sensor data published before it. Batched IMU frames are held back
+        # across ticks, which would leave the controller nothing to acknowledge.
+        if lockstep and self._imu_batch is not None:
+            raise ValueError("Lockstep requires an IMU batch size of 1")
+
+        self._lockstep = lockstep
+        self._lockstep_timeout = lockstep_timeout
+        self._lockstep_max_missed = lockstep_max_missed
+        self._lockstep_missed = 0
+        # Every tick gets its own marker instance, so ticks still waiting in the transmit queue
+        # are never overwritten. The pump hands each one back once it has been sent.
+        self._sim_ticks = ParameterPool(SimTickData, size=8)
+        self._tick_ack = TickAckData()  # Decode target, only touched by the pump thread
+        self._tick_ack_topic = self._data_map.get_encoded_topic(self.RxTopics.TICK_ACK)
+        self._last_ack = (-1, ())  # type: Tuple[int, tuple]
+        self._ack_condition = Condition()
+        self._lockstep_stats = {"ticks": 0, "acked": 0, "timeouts": 0, "free_running": 0}
+
+        # Data queues. Each has exactly one producer and one consumer: the user thread calling
+        # transmit()/receive() on one end and the pump thread on the other.
+        self._tx_queue = SPSCRingBuffer(capacity=tx_queue_size, policy=tx_overflow, on_evict=self._release_tx)
+        self._rx_queue = SPSCRingBuffer(capacity=rx_queue_size, policy=rx_overflow,
+                                        on_evict=self._data_map.release_param)
 
     def kill(self) -> None:
         """
@@ -104,39 +222,156 @@ class SimConnection(Thread):
             None
         """
         self._event_signals[self.Signals.KILL].set()
+        self._wakeup()
         logger.debug("Drone kill signal set")
 
     def run(self) -> None:
+        """
+        Event driven message pump. Blocks until data arrives on any subscribed socket or a
+        transmit request wakes it up, so messages are handled as soon as they are available.
+        The processing period only bounds how long the pump idles between checks of the
+        kill signal.
+        Returns:
+            None
+        """
         logger.info("Executing the SimConnection thread")
+        poller = zmq.Poller()
+        poller.register(self._wakeup_rx, zmq.POLLIN)
+        if self._shm:
+            poller.register(self._shm.doorbell, zmq.POLLIN)
+            self._shm_rx_message_pump()
+        else:
+            for socket in self._zmq_sub_sockets.values():
+                poller.register(socket, zmq.POLLIN)
+
+        sub_sockets = {socket: name for name, socket in self._zmq_sub_sockets.items()}
+        idle_timeout_ms = max(int(self._pump_rate * 1000.0), 1)
+
         while not self._event_signals[self.Signals.KILL].is_set():
-            self._rx_message_pump()
+            ready = poller.poll(timeout=idle_timeout_ms)
+
+            readable = []
+            for socket, _ in ready:
+                if socket is self._wakeup_rx:
+                    self._drain_wakeups()
+                elif self._shm and socket is self._shm.doorbell:
+                    self._shm_rx_message_pump()
+                else:
+                    readable.append(sub_sockets[socket])
+
+            if readable:
+                self._rx_message_pump(readable)
+            elif self._shm and not ready:
+                # Recovers a doorbell lost to the unfenced pending flag, see shm_transport.py
+                self._shm_rx_message_pump()
             self._tx_message_pump()
-            sleep(self._pump_rate)
 
+        if self._shm:
+            self._shm.close()
+
+        # Unsent messages would otherwise hold up terminating the context at interpreter exit
+        with self._wakeup_lock:
+            for socket in [*self._zmq_pub_sockets.values(), *self._zmq_sub_sockets.values(), self._wakeup_rx,
+                           self._wakeup_tx]:
+                socket.close(linger=0)
+        self._zmq_context.term()
         logger.info("Exiting the program")
 
-    def transmit(self, data: IParameter) -> None:
+    def transmit(self, data: IParameter) -> bool:
         """
-        Transmits a piece of data to the flight software
+        Transmits a piece of data to the flight software. Must only be called from one thread.
         Args:
             data: Parameter instance to be transmitted
 
         Returns:
-            None
+            True: The data was sent, or queued for the pump to send
+            False: The data was dropped
         """
-        self._tx_queue.put(data, block=True, timeout=0.05)
+        # Shared memory slots can be written straight from the caller, skipping the hop through
+        # the pump thread. IMU frames still need the pump to assemble them.
+        if self._sends_inline:
+            try:
+                self._send(data)
+            except Exception as e:
+                logger.error("{} exception: {}".format(type(e).__name__, str(e)))
+                return False
+            return True
+
+        if self._tx_queue.put(data, timeout=0.05):
+            self._wakeup()
+            return True
+        return False
 
     def receive(self) -> Union[IParameter, None]:
         """
-        Receives data from the RX queue
+        Receives data from the RX queue. Pass the result to release() once it has been
+        consumed so the instance can be reused for future messages.
         Returns:
             IParameter or None
         """
-        try:
-            return self._rx_queue.get_nowait()
-        except Empty:
+        return self._rx_queue.get()
+
+    def release(self, data: IParameter) -> None:
+        """
+        Hands a received parameter back for reuse. Optional, but avoids an allocation per
+        message on high rate topics. The instance must not be used after it is released.
+        Args:
+            data: Parameter previously returned by receive()
+
+        Returns:
+            None
+        """
+        self._data_map.release_param(data)
+
+    def end_tick(self, tick: int) -> Union[Tuple[int, tuple], None]:
+        """
+        Publishes the end of a simulation tick. Call from the transmitting thread once all of the
+        tick's sensor data has been passed to transmit(). In lockstep mode this then blocks until
+        the flight software acknowledges the tick, so the simulation never gets ahead of it.
+        Args:
+            tick: Number of the tick that just finished, e.g. SimScheduler.tick
+
+        Returns:
+            The (tick, motor_command) acknowledgment, or None when not in lockstep mode, when the
+            acknowledgment timed out, or while free running after repeated timeouts
+        """
+        sim_tick = self._sim_ticks.acquire()
+        sim_tick.update(tick)
+        if not self.transmit(sim_tick) or self._sends_inline:
+            self._sim_ticks.release(sim_tick)
+        self._lockstep_stats['ticks'] += 1
+        if not self._lockstep:
+            return None
+
+        with self._ack_condition:
+            free_running = self._lockstep_missed >= self._lockstep_max_missed
+            timeout = 0.0 if free_running else self._lockstep_timeout
+            if self._ack_condition.wait_for(lambda: self._last_ack[0] >= tick, timeout):
+                self._lockstep_missed = 0
+                self._lockstep_stats['acked'] += 1
+                return self._last_ack
+
+            self._lockstep_missed += 1
+            if free_running:
+                self._lockstep_stats['free_running'] += 1
+            else:
+                self._lockstep_stats['timeouts'] += 1
+                if self._lockstep_missed == self._lockstep_max_missed:
+                    logger.warning("No tick acknowledgment for {} ticks, free running".format(self._lockstep_missed))
             return None
 
+    def metrics(self) -> Dict[str, Dict[str, int]]:
+        """
+        Snapshot of the transmit and receive queue health counters, plus lockstep statistics
+        Returns:
+            Dictionary of queue metrics keyed by "tx" and "rx", and lockstep counts under "lockstep"
+        """
+        return {
+            self.DataFlow.TX.value: self._tx_queue.metrics(),
+            self.DataFlow.RX.value: self._rx_queue.metrics(),
+            "lockstep": dict(self._lockstep_stats)
+        }
+
     def signal_event(self, signal: Signals) -> None:
         """
         Signal a system event within the virtual drone
@@ -147,6 +382,7 @@ class SimConnection(Thread):
             None
         """
         self._event_signals[signal.value].set()
+        self._wakeup()
 
     def connect(self, timeout: float or int) -> bool:
         """
@@ -169,6 +405,11 @@ class SimConnection(Thread):
         """
         return self._fcs_connected.is_valid()
 
+    @property
+    def _sends_inline(self) -> bool:
+        """ Whether transmit() sends from the calling thread instead of queueing for the pump """
+        return self._shm is not None and not self._imu_frame_mode
+
     def _boot_zmq(self) -> None:
         """
         Powers up the various ZMQ resources for communicating with the flight
@@ -176,64 +417,144 @@ class SimConnection(Thread):
         Returns:
             None
         """
-        cfg = self._load_sim_ports()
-        port_format = "{}://{}".format(cfg['transport'], cfg['bind_ip'])
+        configure_sockets(cfg=self._sim_cfg, pub_sockets=self._zmq_pub_sockets,
+                          sub_sockets=self._zmq_sub_sockets, data_map=self._data_map)
+
+    def _boot_shm(self) -> None:
+        """
+        Creates the shared memory regions used in place of the ZMQ sockets, along with the
+        lookup from slot index back to the topic each RX parameter would have arrived on.
+        Returns:
+            None
+        """
+        from VDrone.shm_transport import ShmTransport
+
+        self._shm = ShmTransport(name=self._sim_cfg.get('shm_name', 'vdrone'),
+                                 slot_count=max(param.value for param in ParameterID) + 1,
+                                 context=self._zmq_context, owner=True)
 
-        # Configure the PUB sockets
-        for socket in self._zmq_pub_sockets.keys():
-            if socket not in cfg['port'].keys():
-                logger.error("Missing port configuration for {}".format(socket))
-            bind_to = "{}:{}".format(port_format, cfg['port'][socket])
-            self._zmq_pub_sockets[socket].bind(bind_to)
-            logger.debug("Bind pub socket [{}] to {}".format(socket, bind_to))
+        for param_id in ParameterID:
+            socket, _, encoded_topic = self._data_map.get_rx_route(param_id)
+            if socket is not None:
+                codec = self._socket_codecs.get(socket.value, Codec.PROTOBUF)
+                self._shm_rx_routes[param_id.value] = (encoded_topic, codec)
 
-        # Configure the SUB sockets
-        for socket in self._zmq_sub_sockets.keys():
-            if socket not in cfg['port'].keys():
-                logger.error("Missing port configuration for {}".format(socket))
+        logger.debug("Shared memory transport ready on {}".format(self._sim_cfg.get('shm_name', 'vdrone')))
 
-            # Do the connection
-            conn_to = "{}:{}".format(port_format, cfg['port'][socket])
-            self._zmq_sub_sockets[socket].connect(conn_to)
-            logger.debug("Connect sub socket [{}] to {}".format(socket, conn_to))
+    def _wakeup(self) -> None:
+        """
+        Interrupts the message pump if it is blocked waiting on data
+        Returns:
+            None
+        """
+        with self._wakeup_lock:
+            try:
+                self._wakeup_tx.send(b'', flags=zmq.NOBLOCK)
+            except zmq.ZMQError:
+                # Pump already has wakeups pending, so another one adds nothing
+                pass
 
-            # Subscribe to various topics
-            for topic in self._data_map.get_socket_subscriber_list(socket):
-                self._zmq_sub_sockets[socket].setsockopt_string(zmq.SUBSCRIBE, topic.value)
-                logger.debug("Subscribed socket {} to topic {}".format(socket, topic.value))
+    def _drain_wakeups(self) -> None:
+        """
+        Clears all pending wakeup signals
+        Returns:
+            None
+        """
+        try:
+            while True:
+                self._wakeup_rx.recv(flags=zmq.NOBLOCK)
+        except zmq.ZMQError:
+            pass
 
-    def _rx_message_pump(self) -> None:
+    def _rx_message_pump(self, sockets: List[str] = None) -> None:
         """
         Process incoming messages from the flight software
+        Args:
+            sockets: Which sockets have data available. Defaults to checking all of them.
+
         Returns:
             None
         """
         # Check each socket for available data
-        for socket in self._zmq_sub_sockets.keys():
+        for socket in sockets if sockets is not None else self._zmq_sub_sockets.keys():
+            codec = self._socket_codecs.get(socket, Codec.PROTOBUF)
             more_data = True
             while more_data:
                 try:
                     # Receive the next message from the socket. It's expected that each message
                     # is a key value pair of {topic, data}.
-                    msg = self._zmq_sub_sockets[socket].recv_multipart(flags=zmq.NOBLOCK)
+                    # Frames are received without copying; the payload is only ever
+                    # touched through its memoryview.
+                    msg = self._zmq_sub_sockets[socket].recv_multipart(flags=zmq.NOBLOCK, copy=False)
                     if len(msg) != 2 or not isinstance(msg, list):
                         raise zmq.ZMQError()
 
                     # Update the connection status if the heart beat is sent
-                    if msg[0].decode('utf-8') == self.RxTopics.HEARTBEAT.value:
+                    topic = msg[0].bytes
+                    if topic == self._heartbeat_topic:
                         self._fcs_connected.update(True)
                         continue
 
+                    # Tick acknowledgments release end_tick() rather than going to the queue
+                    if topic == self._tick_ack_topic:
+                        self._handle_tick_ack(msg[1].buffer, codec)
+                        continue
+
                     # Reconstruct the data into the expected type
-                    param = self._parameter_rx_factory(topic=self.RxTopics(msg[0]), serialized_data=msg[1])
+                    param = self._parameter_rx_factory(topic=topic, serialized_data=msg[1].buffer, codec=codec)
 
-                    # Push to the queue
-                    if isinstance(param, IParameter):
-                        self._rx_queue.put(item=param, block=True, timeout=0.1)
+                    # Push to the queue, recycling the instance if the queue turned it away
+                    if isinstance(param, IParameter) and not self._rx_queue.put(param, timeout=0.1):
+                        self._data_map.release_param(param)
 
                 except (zmq.ZMQError, ValueError) as e:
                     more_data = False
 
+    def _shm_rx_message_pump(self) -> None:
+        """
+        Process every parameter the flight software has written to shared memory since the
+        last doorbell. Each slot only holds the latest sample of its parameter.
+        Returns:
+            None
+        """
+        for index, payload in self._shm.receive():
+            topic, codec = self._shm_rx_routes.get(index, (None, None))
+            if topic is None:
+                continue
+
+            if topic == self._heartbeat_topic:
+                self._fcs_connected.update(True)
+                continue
+
+            if topic == self._tick_ack_topic:
+                self._handle_tick_ack(payload, codec)
+                continue
+
+            param = self._parameter_rx_factory(topic=topic, serialized_data=payload, codec=codec)
+            if isinstance(param, IParameter) and not self._rx_queue.put(param, timeout=0.1):
+                self._data_map.release_param(param)
+
+    def _handle_tick_ack(self, serialized_data: Union[bytes, memoryview], codec: Codec) -> None:
+        """
+        Records a tick acknowledgment from the flight software and wakes up end_tick()
+        Args:
+            serialized_data: The raw acknowledgment data
+            codec: Wire format used by the socket the data arrived on
+
+        Returns:
+            None
+        """
+        if not self._tick_ack.decode(serialized_data, codec):
+            logger.error("Failed to convert tick acknowledgment")
+            return
+
+        with self._ack_condition:
+            self._last_ack = self._tick_ack.view()
+            if self._lockstep_missed >= self._lockstep_max_missed:
+                logger.info("Tick acknowledgments resumed at tick {}, back in lockstep".format(self._last_ack[0]))
+            self._lockstep_missed = 0
+            self._ack_condition.notify_all()
+
     def _tx_message_pump(self) -> None:
         """
         Pulls items from the transmit queue and pushes it through the ZMQ connection
@@ -242,57 +563,255 @@ class SimConnection(Thread):
         """
         while not self._tx_queue.empty():
             try:
-                param = self._tx_queue.get_nowait()
+                param = self._tx_queue.get()
                 if not param:
                     continue
 
-                socket = self._data_map.get_socket_from_parameter(param.id)
-                topic = self._data_map.get_topic_from_parameter(param.id)
+                if self._imu_frame_mode and param.id in ImuFrameData.SENSOR_ROWS:
+                    param = self._stage_imu_data(param)
+                    if not param:
+                        continue
 
-                encoded_topic = topic.value.encode('utf-8')
-                serialized_data = param.serialize()
-                self._zmq_pub_sockets[socket.value].send_multipart([encoded_topic, serialized_data])
-                logger.trace("Send -- Topic: {}".format(topic.value))
+                try:
+                    self._send(param)
+                finally:
+                    # Recycle even when the send failed, or the instance is lost to its pool
+                    self._release_tx(param)
             except Exception as e:
                 logger.error("{} exception: {}".format(type(e).__name__, str(e)))
 
-    def _parameter_rx_factory(self, topic: RxTopics, serialized_data: str) -> Union[IParameter, None]:
+    def _release_tx(self, param: IParameter) -> None:
+        """
+        Recycles a transmitted or dropped parameter if the connection owns it
+        Args:
+            param: Parameter taken off the transmit queue
+
+        Returns:
+            None
+        """
+        if param.id is ParameterID.SIM_TICK:
+            self._sim_ticks.release(param)
+
+    def _send(self, param: IParameter) -> None:
+        """
+        Encodes a parameter and writes it to whichever transport is active
+        Args:
+            param: Parameter to send
+
+        Returns:
+            None
+        """
+        pub_socket, topic_frame, codec, buffer = self._tx_routes[param.id]
+        payload = param.encode_into(buffer, codec) if buffer is not None else param.encode(codec)
+        if self._shm:
+            self._shm.write(param.id.value, payload)
+        else:
+            pub_socket.send_multipart([topic_frame, payload], copy=False)
+        logger.trace("Send -- Topic: {}".format(topic_frame.bytes))
+
+    def _stage_imu_data(self, sensor: Vector3Parameter) -> Union[IParameter, None]:
+        """
+        Adds one sensor's data to the IMU frame for the current tick
+        Args:
+            sensor: Accel, gyro or mag data pulled from the transmit queue
+
+        Returns:
+            The frame or batch parameter once it is ready to publish, else None
+        """
+        if not self._imu_frame.stage(sensor):
+            return None
+
+        if self._imu_batch is None:
+            return self._imu_frame
+
+        if not self._imu_batch.append(self._imu_frame):
+            return None
+
+        return self._imu_batch
+
+    def _parameter_rx_factory(self, topic: bytes, serialized_data: Union[bytes, memoryview],
+                              codec: Codec = Codec.PROTOBUF) -> Union[IParameter, None]:
         """
         Converts serialized data back into the appropriate registered type
         Args:
-            topic: Which topic data was received under
+            topic: Encoded topic the data was received under
             serialized_data: The raw data from the topic
+            codec: Wire format used by the socket the data arrived on
 
         Returns:
             A parameter class containing the data else None if not convertible
         """
-        new_object = self._data_map.get_param_type_from_topic(topic)
+        new_object = self._data_map.acquire_param_from_topic_bytes(topic)
         if not new_object:
             logger.error("No message type associated with topic {}".format(topic))
             return None
 
-        if not new_object.deserialize(serialized_data):
+        if not new_object.decode(serialized_data, codec):
             logger.error("Failed to convert data for type {} on topic {}".format(type(new_object), topic))
+            self._data_map.release_param(new_object)
+            return None
 
         return new_object
 
     @staticmethod
-    def _load_sim_ports() -> dict:
+    def _load_sim_ports(source: Union[str, Path, dict, None] = None) -> dict:
         """
-        Pulls the simulator configuration port information from disk
+        Pulls the simulator configuration port information
+        Args:
+            source: Already loaded configuration, or path to it. See load_sim_ports() for the
+                    defaults used when not given.
+
         Returns:
             dict
         """
-        project_root = find_parent_path(Path.cwd(), "Valkyrie")
-        config_file = Path(project_root, 'src', 'database', 'sim_ports.json')
-        with config_file.open() as f:
-            return json.load(f)
+        if isinstance(source, dict):
+            return source
+        return load_sim_ports(source)
+
+
+def resolve_sim_ports_path(path: Union[str, Path, None] = None) -> Path:
+    """
+    Works out which sim port configuration file to use. An explicit path wins, then the
+    VDRONE_SIM_PORTS environment variable, then sim_ports.json in the Valkyrie project tree
+    above the working directory. The project search is only done once per working directory.
+    Args:
+        path: Explicit configuration file
+
+    Returns:
+        Resolved path to the configuration file
+    """
+    if path is None:
+        path = os.environ.get(SIM_PORTS_ENV)
+
+    if path is not None:
+        return Path(path).resolve()
+
+    cwd = Path.cwd()
+    with _sim_ports_lock:
+        default = _sim_ports_default.get(cwd)
+        if default is None:
+            from pyutils.path import find_parent_path
+
+            project_root = find_parent_path(cwd, "Valkyrie")
+            default = Path(project_root, 'src', 'database', 'sim_ports.json').resolve()
+            _sim_ports_default[cwd] = default
+        return default
+
+
+def load_sim_ports(path: Union[str, Path, None] = None) -> dict:
+    """
+    Loads a sim port configuration, parsing the file only when it is new or has changed on
+    disk since it was last read.
+    Args:
+        path: Configuration file. See resolve_sim_ports_path() for the defaults.
+
+    Returns:
+        Configuration dictionary. Callers get their own copy and are free to modify it.
+    """
+    config_file = resolve_sim_ports_path(path)
+    mtime = config_file.stat().st_mtime_ns
+
+    with _sim_ports_lock:
+        cached = _sim_ports_cache.get(config_file)
+        if cached is None or cached[0] != mtime:
+            with config_file.open() as f:
+                cached = (mtime, json.load(f))
+            _sim_ports_cache[config_file] = cached
+
+    return copy.deepcopy(cached[1])
+
+
+# Value of "transport" in the sim port configuration that selects shared memory instead of ZMQ
+SHM_TRANSPORT = "shm"
+
+
+def configure_sockets(cfg: dict, pub_sockets: Dict[str, zmq.Socket], sub_sockets: Dict[str, zmq.Socket],
+                      data_map: 'SimData') -> None:
+    """
+    Binds the PUB sockets and connects/subscribes the SUB sockets according to the sim port
+    configuration. Shared by every connection flavor so they all route identically.
+    Args:
+        cfg: Sim port configuration, as loaded from sim_ports.json
+        pub_sockets: PUB sockets keyed by TxSocket value
+        sub_sockets: SUB sockets keyed by RxSocket value
+        data_map: Routing information used to pick topic subscriptions. Pass None to leave
+                  the sockets unsubscribed.
+
+    Returns:
+        None
+    """
+    if cfg['transport'] == SHM_TRANSPORT:
+        raise ValueError("The shared memory transport is only supported by SimConnection")
+
+    port_format = "{}://{}".format(cfg['transport'], cfg['bind_ip'])
+
+    # Configure the PUB sockets
+    for socket in pub_sockets.keys():
+        if socket not in cfg['port'].keys():
+            logger.error("Missing port configuration for {}".format(socket))
+        bind_to = "{}:{}".format(port_format, cfg['port'][socket])
+        pub_sockets[socket].bind(bind_to)
+        logger.debug("Bind pub socket [{}] to {}".format(socket, bind_to))
+
+    # Configure the SUB sockets
+    for socket in sub_sockets.keys():
+        if socket not in cfg['port'].keys():
+            logger.error("Missing port configuration for {}".format(socket))
+
+        # Do the connection
+        conn_to = "{}:{}".format(port_format, cfg['port'][socket])
+        sub_sockets[socket].connect(conn_to)
+        logger.debug("Connect sub socket [{}] to {}".format(socket, conn_to))
+
+        # Subscribe to various topics
+        if data_map is not None:
+            subscribe_topics(sub_sockets[socket], socket, data_map)
+
+
+def socket_codecs(cfg: dict) -> Dict[str, Codec]:
+    """
+    Reads the codec chosen for each socket from the sim port configuration. Sockets that
+    aren't listed use protobuf.
+    Args:
+        cfg: Sim port configuration, as loaded from sim_ports.json
+
+    Returns:
+        Codec keyed by socket name
+    """
+    return {socket: Codec(name) for socket, name in cfg.get('codec', {}).items()}
+
+
+def subscribe_topics(sub_socket: zmq.Socket, socket_id: str, data_map: 'SimData') -> None:
+    """
+    Subscribes a SUB socket to every topic routed through it by the data map
+    Args:
+        sub_socket: Socket to subscribe
+        socket_id: Which RxSocket value the socket is serving
+        data_map: Routing information used to pick topic subscriptions
+
+    Returns:
+        None
+    """
+    for topic in data_map.get_socket_subscriber_list(socket_id):
+        encoded = data_map.get_encoded_topic(topic)
+        sub_socket.setsockopt(zmq.SUBSCRIBE, encoded)
+        logger.debug("Subscribed socket {} to topic {}".format(socket_id, encoded))
 
 
 class SimData:
     """ A collection of mappings for data passed around through the sim """
 
-    def __init__(self):
+    def __init__(self, vehicle_id: Union[int, str, None] = None, pool_size: int = 64):
+        """
+        Initialize the mappings
+        Args:
+            vehicle_id: When set, every topic on the wire is prefixed with "<vehicle_id>/" so that
+                        many vehicles can share the same sockets.
+            pool_size: How many received parameter instances to keep for reuse per topic
+        """
+        self.vehicle_id = vehicle_id
+        self.pool_size = pool_size
+        self.topic_prefix = "" if vehicle_id is None else "{}/".format(vehicle_id)
         self._mapping = {
             SimConnection.TxSocket.SIM_INTERNAL: {
                 SimConnection.TxTopics.HEARTBEAT: {
@@ -316,6 +835,21 @@ class SimData:
                     "direction": SimConnection.DataFlow.TX,
                     "param_id": ParameterID.MAG_DATA,
                     "param_type": MagData
+                },
+                SimConnection.TxTopics.IMU_FRAME: {
+                    "direction": SimConnection.DataFlow.TX,
+                    "param_id": ParameterID.IMU_FRAME,
+                    "param_type": ImuFrameData
+                },
+                SimConnection.TxTopics.IMU_FRAME_BATCH: {
+                    "direction": SimConnection.DataFlow.TX,
+                    "param_id": ParameterID.IMU_FRAME_BATCH,
+                    "param_type": ImuFrameBatchData
+                },
+                SimConnection.TxTopics.SIM_TICK: {
+                    "direction": SimConnection.DataFlow.TX,
+                    "param_id": ParameterID.SIM_TICK,
+                    "param_type": SimTickData
                 }
             },
             SimConnection.RxSocket.SIM_INTERNAL: {
@@ -323,12 +857,94 @@ class SimData:
                     "direction": SimConnection.DataFlow.RX,
                     "param_id": ParameterID.HEARTBEAT,
                     "param_type": HeartBeatData
+                },
+                SimConnection.RxTopics.TICK_ACK: {
+                    "direction": SimConnection.DataFlow.RX,
+                    "param_id": ParameterID.TICK_ACK,
+                    "param_type": TickAckData
                 }
             },
-            SimConnection.RxSocket.SYS_CONTROL: {},
-            SimConnection.RxSocket.USER_INPUT: {}
+            SimConnection.RxSocket.SYS_CONTROL: {
+                SimConnection.RxTopics.MOTOR_COMMAND: {
+                    "direction": SimConnection.DataFlow.RX,
+                    "param_id": ParameterID.MOTOR_COMMAND,
+                    "param_type": MotorCommandData
+                }
+            },
+            SimConnection.RxSocket.USER_INPUT: {
+                SimConnection.RxTopics.STICK_INPUTS: {
+                    "direction": SimConnection.DataFlow.RX,
+                    "param_id": ParameterID.STICK_INPUTS,
+                    "param_type": StickInputsData
+                }
+            }
         }
 
+        self._build_indexes()
+
+    def _build_indexes(self) -> None:
+        """
+        Precomputes hash lookups over the mapping so that routing a message is a single
+        dictionary access rather than a scan of every socket and topic. Where a parameter
+        appears more than once, the first occurrence in the mapping wins.
+        Returns:
+            None
+        """
+        self._route_by_param = {}  # type: Dict[ParameterID, Tuple[Enum, Enum, bytes]]
+        self._rx_route_by_param = {}  # type: Dict[ParameterID, Tuple[Enum, Enum, bytes]]
+        self._type_by_topic = {}  # type: Dict[Enum, type]
+        self._type_by_topic_bytes = {}  # type: Dict[bytes, type]
+        self._encoded_topics = {}  # type: Dict[Enum, bytes]
+        self._pools = {}  # type: Dict[type, ParameterPool]
+
+        for socket, topics in self._mapping.items():
+            for topic, info in topics.items():
+                encoded = (self.topic_prefix + topic.value).encode('utf-8')
+                self._encoded_topics[topic] = encoded
+                self._route_by_param.setdefault(info['param_id'], (socket, topic, encoded))
+                if info['direction'] == SimConnection.DataFlow.RX:
+                    self._rx_route_by_param.setdefault(info['param_id'], (socket, topic, encoded))
+                self._type_by_topic.setdefault(topic, info['param_type'])
+                self._type_by_topic_bytes.setdefault(encoded, info['param_type'])
+
+    def get_route(self, param_id: ParameterID) -> Tuple[Union[SimConnection.TxSocket, SimConnection.RxSocket, None],
+                                                        Union[SimConnection.TxTopics, SimConnection.RxTopics, None],
+                                                        Union[bytes, None]]:
+        """
+        Gets everything needed to publish a parameter in one lookup
+        Args:
+            param_id: The parameter to look up
+
+        Returns:
+            Tuple of (socket, topic, encoded topic), or all None if the parameter isn't routed
+        """
+        return self._route_by_param.get(param_id, (None, None, None))
+
+    def get_rx_route(self, param_id: ParameterID) -> Tuple[Union[SimConnection.RxSocket, None],
+                                                           Union[SimConnection.RxTopics, None],
+                                                           Union[bytes, None]]:
+        """
+        Same as get_route(), but only considers routes the parameter is received on
+        Args:
+            param_id: The parameter to look up
+
+        Returns:
+            Tuple of (socket, topic, encoded topic), or all None if the parameter isn't received
+        """
+        return self._rx_route_by_param.get(param_id, (None, None, None))
+
+    def get_encoded_topic(self, topic: Union[SimConnection.TxTopics, SimConnection.RxTopics]) -> bytes:
+        """
+        Gets the wire encoding of a topic
+        Args:
+            topic: The topic to look up
+
+        Returns:
+            UTF-8 encoded topic name, including any vehicle prefix
+        """
+        encoded = self._encoded_topics.get(topic)
+        return encoded if encoded is not None else (self.topic_prefix + topic.value).encode('utf-8')
+
     def get_socket_from_parameter(self, param_id: ParameterID) -> SimConnection.TxSocket:
         """
         Gets the socket associated with a parameter type
@@ -338,10 +954,7 @@ class SimData:
         Returns:
             Which socket the parameter is transmitted or received on
         """
-        for socket in self._mapping.keys():
-            for topic in self._mapping[socket].keys():
-                if self._mapping[socket][topic]['param_id'] == param_id:
-                    return socket
+        return self._route_by_param.get(param_id, (None, None, None))[0]
 
     def get_topic_from_parameter(self, param_id: ParameterID) -> Union[SimConnection.TxTopics, SimConnection.RxTopics]:
         """
@@ -352,10 +965,7 @@ class SimData:
         Returns:
             Which topic the parameter is transmitted or received on
         """
-        for socket in self._mapping.keys():
-            for topic in self._mapping[socket].keys():
-                if self._mapping[socket][topic]['param_id'] == param_id:
-                    return topic
+        return self._route_by_param.get(param_id, (None, None, None))[1]
 
     def get_param_type_from_topic(self, topic: Union[SimConnection.RxTopics, SimConnection.TxTopics]) -> Union[
         None, IParameter]:
@@ -367,10 +977,56 @@ class SimData:
         Returns:
             Core protocol buffer type that understands how to translate network data
         """
-        for socket in self._mapping.keys():
-            if topic in self._mapping[socket].keys():
-                # This creates a new instance of the class type stored in the mapping
-                return self._mapping[socket][topic]['param_type']()
+        # This creates a new instance of the class type stored in the mapping
+        param_type = self._type_by_topic.get(topic)
+        return param_type() if param_type else None
+
+    def get_param_type_from_topic_bytes(self, topic: bytes) -> Union[None, IParameter]:
+        """
+        Same as get_param_type_from_topic(), but keyed directly by the topic frame received
+        off the wire so no decoding is needed.
+        Args:
+            topic: Encoded topic to look up
+
+        Returns:
+            Core protocol buffer type that understands how to translate network data
+        """
+        param_type = self._type_by_topic_bytes.get(topic)
+        return param_type() if param_type else None
+
+    def acquire_param_from_topic_bytes(self, topic: bytes) -> Union[None, IParameter]:
+        """
+        Pooled version of get_param_type_from_topic_bytes(). Pools are created the first time a
+        topic is received on, so only topics that actually carry traffic hold instances.
+        Args:
+            topic: Encoded topic to look up
+
+        Returns:
+            Parameter instance to decode into, or None if the topic isn't routed
+        """
+        param_type = self._type_by_topic_bytes.get(topic)
+        if not param_type:
+            return None
+
+        pool = self._pools.get(param_type)
+        if pool is None:
+            pool = ParameterPool(param_type, size=self.pool_size)
+            self._pools[param_type] = pool
+
+        return pool.acquire()
+
+    def release_param(self, param: IParameter) -> None:
+        """
+        Recycles a parameter obtained from acquire_param_from_topic_bytes()
+        Args:
+            param: Instance to recycle
+
+        Returns:
+            None
+        """
+        pool = self._pools.get(type(param))
+        if pool is not None:
+            pool.release(param)
 
     def get_socket_subscriber_list(self, socket_id: Union[SimConnection.RxSocket, str]) -> List[SimConnection.RxTopics]:
         """
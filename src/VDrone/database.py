@@ -10,10 +10,14 @@
 
 import collections
 import copy
-from threading import RLock
-from typing import Callable, Any, DefaultDict, List
+import math
+from concurrent.futures import Executor, ThreadPoolExecutor
+from threading import Lock, RLock
+from typing import Callable, Any, DefaultDict, Dict, Iterable, List, Set, Tuple
 from enum import Enum
-from VDrone.parameters import ParameterID, IParameter
+from loguru import logger
+from VDrone.clock import IClock, TimeoutService, default_clock
+from VDrone.parameters import ParameterID, IParameter, TimedParameter
 # Database is a collection of IParameters organized by key
 # Database will have a callback registry for acting on events
 # Database will have a core type, with each type containing a parameter and accessory functions
@@ -28,6 +32,262 @@ class Events(Enum):
     ERROR = 'error'
 
 
+class ListenerDispatcher:
+    """
+    Delivers listener callbacks on an executor so the thread writing a parameter never runs
+    consumer code. Events are delivered in the order they were submitted, with a separate limit
+    on how many of each event type may be pending. Once an event type reaches its limit, new
+    events of that type are dropped rather than blocking the writer.
+    """
+
+    def __init__(self, queue_size: int = 1024, coalesce_updates: bool = True, executor: Executor = None):
+        """
+        Initialize the dispatcher
+        Args:
+            queue_size: Maximum number of pending events per event type
+            coalesce_updates: Only deliver the latest pending UPDATE for each parameter
+            executor: Where callbacks are run. Defaults to a private single worker pool.
+        """
+        self.queue_size = queue_size
+        self.coalesce_updates = coalesce_updates
+
+        self._owns_executor = executor is None
+        self._executor = executor if executor else ThreadPoolExecutor(max_workers=1,
+                                                                      thread_name_prefix="db_listeners")
+        self._lock = Lock()
+        self._draining = False
+        self._queue = collections.deque()  # type: collections.deque
+        self._depth = {key: 0 for key in Events}
+        self._pending_updates = set([])
+
+        # Metrics
+        self._high_water = {key: 0 for key in Events}
+        self._dropped = {key: 0 for key in Events}
+        self._coalesced = 0
+        self._delivered = 0
+        self._errors = 0
+
+    def submit(self, event_id: Events, param_id: ParameterID, callbacks: Tuple[Callable]) -> bool:
+        """
+        Queues an event for delivery. Never blocks.
+        Args:
+            event_id: Which event occurred
+            param_id: Parameter the event occurred on
+            callbacks: Listeners to deliver the event to
+
+        Returns:
+            True: The event was queued or merged with one already pending
+            False: The queue was full and the event was dropped
+        """
+        coalesce = self.coalesce_updates and event_id == Events.UPDATE
+        return self._enqueue(event_id, param_id, callbacks, coalesce)
+
+    def submit_batch(self, events: Dict[ParameterID, Events], callbacks: Tuple[Callable]) -> bool:
+        """
+        Queues the result of a set_many() transaction for delivery to batch listeners. Batches
+        count against the UPDATE queue but are never coalesced. Never blocks.
+        Args:
+            events: Resulting event for every parameter in the batch
+            callbacks: Batch listeners to deliver the events to
+
+        Returns:
+            True: The batch was queued
+            False: The queue was full and the batch was dropped
+        """
+        return self._enqueue(Events.UPDATE, events, callbacks, False)
+
+    def _enqueue(self, event_id: Events, arg: Any, callbacks: Tuple[Callable], coalesce: bool) -> bool:
+        """
+        Adds an event to its queue and schedules a drain if one isn't already running
+        Args:
+            event_id: Queue the event is counted against
+            arg: What each callback is called with
+            callbacks: Listeners to deliver the event to
+            coalesce: Merge with a pending UPDATE for the same parameter
+
+        Returns:
+            True: The event was queued or merged with one already pending
+            False: The queue was full and the event was dropped
+        """
+        if not callbacks:
+            return True
+
+        with self._lock:
+            if coalesce and arg in self._pending_updates:
+                self._coalesced += 1
+                return True
+
+            depth = self._depth[event_id]
+            if depth >= self.queue_size:
+                self._dropped[event_id] += 1
+                return False
+
+            self._queue.append((event_id, arg, callbacks, coalesce))
+            self._depth[event_id] = depth + 1
+            self._high_water[event_id] = max(self._high_water[event_id], depth + 1)
+            if coalesce:
+                self._pending_updates.add(arg)
+
+            schedule = not self._draining
+            self._draining = True
+
+        if schedule:
+            self._executor.submit(self._drain)
+        return True
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Snapshot of the dispatcher health counters
+        Returns:
+            Dictionary of queue depths, high water marks, drop counts and delivery counts
+        """
+        with self._lock:
+            return {
+                "queue_depth": dict(self._depth),
+                "high_water": dict(self._high_water),
+                "dropped": dict(self._dropped),
+                "coalesced": self._coalesced,
+                "delivered": self._delivered,
+                "errors": self._errors
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stops the dispatcher's private executor, if it owns one
+        Args:
+            wait: Block until all pending callbacks have run
+
+        Returns:
+            None
+        """
+        if self._owns_executor:
+            self._executor.shutdown(wait=wait)
+
+    def _drain(self) -> None:
+        """
+        Runs queued callbacks until the queue is empty. Only one drain is ever scheduled at
+        a time, so events are delivered in the order they were submitted.
+        Returns:
+            None
+        """
+        while True:
+            with self._lock:
+                if not self._queue:
+                    self._draining = False
+                    return
+
+                event_id, arg, callbacks, coalesced = self._queue.popleft()
+                self._depth[event_id] -= 1
+                if coalesced:
+                    self._pending_updates.discard(arg)
+
+            for callback in callbacks:
+                try:
+                    callback(arg)
+                    self._delivered += 1
+                except Exception:
+                    self._errors += 1
+                    logger.exception("Listener {} failed on {} event for {}".format(callback, event_id.value, arg))
+
+
+class DependencyGraph:
+    """ Directed acyclic graph of which parameters depend on which others for validity """
+
+    def __init__(self):
+        self._depends_on = {}  # type: Dict[ParameterID, Tuple[ParameterID, ...]]
+        self._dependents = collections.defaultdict(set)  # type: DefaultDict[ParameterID, Set[ParameterID]]
+        self._closure_cache = {}  # type: Dict[ParameterID, Tuple[ParameterID, ...]]
+
+    def add(self, param_id: ParameterID, dependencies: Iterable[ParameterID]) -> None:
+        """
+        Registers the dependencies of a parameter
+        Args:
+            param_id: Parameter being registered
+            dependencies: Parameters it depends upon
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: The new edges would create a dependency cycle
+        """
+        dependencies = tuple(dependencies) if dependencies else ()
+        for dep in dependencies:
+            if dep == param_id or param_id in self.upstream(dep):
+                raise ValueError("Dependency {} -> {} creates a cycle".format(param_id, dep))
+
+        self.remove(param_id)
+        self._depends_on[param_id] = dependencies
+        for dep in dependencies:
+            self._dependents[dep].add(param_id)
+        self._closure_cache.clear()
+
+    def remove(self, param_id: ParameterID) -> None:
+        """
+        Drops all outgoing dependency edges of a parameter
+        Args:
+            param_id: Parameter to remove
+
+        Returns:
+            None
+        """
+        for dep in self._depends_on.pop(param_id, ()):
+            self._dependents[dep].discard(param_id)
+        self._closure_cache.clear()
+
+    def depends_on(self, param_id: ParameterID) -> Tuple[ParameterID, ...]:
+        """
+        Direct dependencies of a parameter
+        Args:
+            param_id: Parameter to look up
+
+        Returns:
+            Tuple of parameter IDs
+        """
+        return self._depends_on.get(param_id, ())
+
+    def upstream(self, param_id: ParameterID) -> Set[ParameterID]:
+        """
+        Every parameter the given one transitively depends upon
+        Args:
+            param_id: Parameter to look up
+
+        Returns:
+            Set of parameter IDs
+        """
+        found = set([])
+        stack = list(self.depends_on(param_id))
+        while stack:
+            node = stack.pop()
+            if node not in found:
+                found.add(node)
+                stack.extend(self.depends_on(node))
+        return found
+
+    def downstream(self, param_id: ParameterID) -> Tuple[ParameterID, ...]:
+        """
+        The parameter itself plus every parameter that transitively depends upon it. Results
+        are cached until the graph changes.
+        Args:
+            param_id: Parameter to look up
+
+        Returns:
+            Tuple of parameter IDs
+        """
+        closure = self._closure_cache.get(param_id)
+        if closure is None:
+            found = [param_id]
+            seen = {param_id}
+            for node in found:
+                for child in self._dependents.get(node, ()):
+                    if child not in seen:
+                        seen.add(child)
+                        found.append(child)
+            closure = tuple(found)
+            self._closure_cache[param_id] = closure
+        return closure
+
+
 class Entry:
 
     def __init__(self, param_id: ParameterID, param_data: IParameter, dependencies: List[ParameterID] = None):
@@ -43,6 +303,12 @@ class Entry:
         self._dependencies = dependencies
         self._lock = RLock()
 
+        # When assigned, listener callbacks are handed off here instead of running inline
+        self.dispatcher = None  # type: ListenerDispatcher
+
+        # Called with the parameter ID after every write so owners can invalidate cached state
+        self.change_hook = None  # type: Callable[[ParameterID], None]
+
         # ---------------------------------------------------------
         # Listener registry for each supported event type. Uses a
         # set() type to prevent duplicate callback entries.
@@ -60,10 +326,22 @@ class Entry:
 
     @property
     def validity(self) -> bool:
-        # TODO: Walk the dependency tree to determine validity
+        """
+        Validity of this entry's own data. Dependencies are resolved by ParameterDatabase.is_valid().
+        Returns:
+            bool
+        """
         with self._lock:
             return self._param_data.is_valid()
 
+    @property
+    def deadline(self) -> float:
+        return self._param_data.deadline
+
+    @property
+    def timeout_managed(self) -> bool:
+        return self._param_data.timeout_managed
+
     @property
     def depends(self) -> List[ParameterID]:
         with self._lock:
@@ -81,7 +359,7 @@ class Entry:
         """
         # Due to this being a set(), callbacks won't be duplicated
         with self._lock:
-            self._callbacks[event_id].add(callback)
+            self._callbacks[event_id.value].add(callback)
 
     def remove_listener(self, event_id: Events,  callback: Callable[[ParameterID], None]) -> None:
         """
@@ -94,50 +372,251 @@ class Entry:
             None
         """
         with self._lock:
-            self._callbacks[event_id].remove(callback)
+            self._callbacks[event_id.value].remove(callback)
 
-    def update(self, new_value: Any) -> bool:
+    def update(self, new_value: Any, notify: bool = True) -> bool:
+        """
+        Updates the stored parameter data
+        Args:
+            new_value: New data to update with
+            notify: Whether or not to notify listeners of the result. Batch writers
+                    disable this and notify once all of their updates have landed.
+
+        Returns:
+            True: Update was successful
+            False: Update was not successful
+        """
         with self._lock:
             updated = self._param_data.update(new_value=new_value)
-            if updated:
-                self._notify_listeners(Events.UPDATE)
-            else:
-                self._notify_listeners(Events.ERROR)
-            return updated
+
+        # The hook takes the database lock, so it runs after the entry lock is released. Holding
+        # both here would take them in the opposite order to ParameterDatabase.set().
+        if updated and self.change_hook is not None:
+            self.change_hook(self._param_id)
+
+        # Listeners run outside the lock so they are free to read or write the database
+        if notify:
+            self._notify_listeners(Events.UPDATE if updated else Events.ERROR)
+        return updated
 
     def value(self) -> Any:
         with self._lock:
             return self._param_data.value()
 
+    def view(self) -> Any:
+        """
+        Lock free read of the latest published value. See IParameter.view().
+        Returns:
+            Read-only view of the stored data
+        """
+        return self._param_data.view()
+
+    def versioned_view(self) -> Tuple[int, Any]:
+        """
+        Lock free read of the latest published value and its version number
+        Returns:
+            Tuple of (version, read-only data)
+        """
+        return self._param_data.versioned_view()
+
     def _notify_listeners(self, event_id: Events):
         with self._lock:
-            [callback(self._param_id) for callback in self._callbacks[event_id.value] if callable(callback)]
+            callbacks = tuple(self._callbacks[event_id.value])
+
+        if self.dispatcher is not None:
+            self.dispatcher.submit(event_id, self._param_id, callbacks)
+        else:
+            for callback in callbacks:
+                if callable(callback):
+                    callback(self._param_id)
 
 
 class ParameterDatabase:
 
-    def __init__(self):
+    def __init__(self, dispatcher: ListenerDispatcher = None, timeout_service: TimeoutService = None,
+                 clock: IClock = None):
+        """
+        Initialize the database
+        Args:
+            dispatcher: Optional asynchronous listener dispatcher shared by every entry
+            timeout_service: Optional service that expires timed parameters. When given, each
+                             expiry fires a TIMEOUT event and validity checks never read the clock.
+            clock: Time source of the timed parameters, used to check cached deadlines. Defaults
+                   to the timeout service clock, then to the default clock.
+
+        Raises:
+            ValueError: The clock and the timeout service clock differ
+        """
+        if clock is not None and timeout_service is not None and clock is not timeout_service.clock:
+            raise ValueError("Database clock does not match the timeout service clock")
+
         self._lock = RLock()
         self._database = collections.defaultdict()  # type: DefaultDict[ParameterID, Entry]
+        self._dispatcher = dispatcher
+        self._timeout_service = timeout_service
+        # TimeoutService defines __len__, so an idle service is falsy and has to be checked against None
+        if clock is None:
+            clock = timeout_service.clock if timeout_service is not None else default_clock()
+        self._clock = clock  # type: IClock
+
+        # Validity resolution. Each cached result is (valid, deadline) where the deadline is the
+        # earliest time any parameter in the dependency tree expires.
+        self._graph = DependencyGraph()
+        self._validity_cache = {}  # type: Dict[ParameterID, Tuple[bool, float]]
+        self._forced_invalid = set([])  # type: Set[ParameterID]
+
+        # Listeners that receive a single callback per set_many() transaction
+        self._batch_callbacks = set([])  # type: Set[Callable[[Dict[ParameterID, Events]], None]]
 
     def exists(self, param_id: ParameterID) -> bool:
-        pass
+        return param_id in self._database
 
     def invalidate(self, param_id: ParameterID) -> None:
-        pass
+        """
+        Marks a parameter invalid until it is next updated. Everything that depends upon it
+        becomes invalid as well, and INVALID listeners are notified across the whole tree.
+        Args:
+            param_id: Which parameter to invalidate
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._forced_invalid.add(param_id)
+            affected = self._graph.downstream(param_id)
+            for node in affected:
+                self._validity_cache.pop(node, None)
+
+            entries = [self._database[node] for node in affected if node in self._database]
+
+        for entry in entries:
+            entry._notify_listeners(Events.INVALID)
 
     def create(self, entry: Entry) -> None:
+        """
+        Adds an entry to the database along with its dependency edges
+        Args:
+            entry: Entry to add
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: The entry's dependencies would create a cycle, or its parameter runs on a
+                        different clock than the database
+        """
         with self._lock:
             if entry.param_id not in self._database.keys():
+                param = entry._param_data
+                timed = isinstance(param, TimedParameter)
+                if timed and param.clock is not self._clock:
+                    raise ValueError("Parameter {} does not use the database clock".format(entry.param_id))
+                managed = timed and self._timeout_service is not None
+
+                self._graph.add(entry.param_id, entry.depends)
+                if entry.dispatcher is None:
+                    entry.dispatcher = self._dispatcher
+                entry.change_hook = self._on_entry_changed
                 self._database[entry.param_id] = entry
+                self._on_entry_changed(entry.param_id)
+
+                if managed:
+                    param.timeout_hook = lambda _, param_id=entry.param_id: self._on_entry_timeout(param_id)
+                    param.attach_timeout_service(self._timeout_service)
 
     def set(self, param_id: ParameterID, new_value: Any) -> bool:
         with self._lock:
-            return self._database[param_id].update(new_value=new_value)
+            entry = self._database[param_id]
+            updated = entry.update(new_value=new_value, notify=False)
+
+        entry._notify_listeners(Events.UPDATE if updated else Events.ERROR)
+        return updated
+
+    def set_many(self, new_values: Dict[ParameterID, Any]) -> Dict[ParameterID, bool]:
+        """
+        Updates several parameters as a single transaction. Readers using get_many() will see
+        either all or none of the new values. Per-entry listeners are notified once the whole
+        batch has been written, followed by a single call to each batch listener. No listener
+        runs while the database lock is held. With a dispatcher, batch listeners are delivered
+        on it as well.
+        Args:
+            new_values: New data to write, keyed by parameter
+
+        Returns:
+            Whether or not each individual update succeeded
+        """
+        results = {}
+        with self._lock:
+            entries = [(self._database[param_id], value) for param_id, value in new_values.items()]
+            for entry, value in entries:
+                results[entry.param_id] = entry.update(new_value=value, notify=False)
+
+            batch_callbacks = tuple(self._batch_callbacks)
+
+        events = {param_id: Events.UPDATE if ok else Events.ERROR for param_id, ok in results.items()}
+        for entry, _ in entries:
+            entry._notify_listeners(events[entry.param_id])
+
+        if self._dispatcher is not None:
+            self._dispatcher.submit_batch(events, batch_callbacks)
+        else:
+            for callback in batch_callbacks:
+                callback(events)
+
+        return results
+
+    def get_many(self, param_ids: Iterable[ParameterID]) -> Dict[ParameterID, Any]:
+        """
+        Reads several parameters as a consistent snapshot. No set() or set_many() call can
+        land in the middle of the read, so values from the same tick are never torn.
+        Args:
+            param_ids: Which parameters to read
+
+        Returns:
+            Read-only view of each parameter's data, keyed by parameter
+        """
+        with self._lock:
+            return {param_id: self._database[param_id].view() for param_id in param_ids}
+
+    def register_batch_listener(self, callback: Callable[[Dict[ParameterID, Events]], None]) -> None:
+        """
+        Register a listener that is called once per set_many() transaction
+        Args:
+            callback: Callback to attach. Receives the resulting event for every parameter in the batch.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._batch_callbacks.add(callback)
+
+    def remove_batch_listener(self, callback: Callable[[Dict[ParameterID, Events]], None]) -> None:
+        """
+        Removes a batch listener callback
+        Args:
+            callback: Callback to remove
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._batch_callbacks.remove(callback)
 
     def get_value(self, param_id: ParameterID) -> Any:
         return self._database[param_id].value()
 
+    def get_view(self, param_id: ParameterID) -> Any:
+        """
+        Gets a read-only view of the latest value without copying or taking any locks. Prefer
+        this over get_value() for high rate consumers that only need to read the data.
+        Args:
+            param_id: Which parameter to look up
+
+        Returns:
+            Read-only view of the stored data
+        """
+        return self._database[param_id].view()
+
     def get_param(self, param_id: ParameterID) -> IParameter:
         """
         Gets a copy of the underlying parameter storage class
@@ -150,7 +629,89 @@ class ParameterDatabase:
         return self._database[param_id].param_data
 
     def is_valid(self, param_id: ParameterID) -> bool:
-        return self._database[param_id].validity
+        """
+        Checks if a parameter and everything it depends upon is valid. Results are cached and
+        only recomputed after something in the dependency tree changes or times out, so the
+        steady state cost is a dictionary lookup, plus a clock read for timed parameters that
+        aren't managed by a timeout service.
+        Args:
+            param_id: Which parameter to check
+
+        Returns:
+            True: Parameter and all of its dependencies are valid
+            False: Something in the dependency tree is invalid, stale or missing
+        """
+        cached = self._validity_cache.get(param_id)
+        if cached is None:
+            with self._lock:
+                cached = self._resolve_validity(param_id)
+
+        valid, deadline = cached
+        return valid and (deadline == math.inf or self._clock.now() < deadline)
+
+    def _resolve_validity(self, param_id: ParameterID) -> Tuple[bool, float]:
+        """
+        Computes and caches the validity of a parameter, reusing cached results for its
+        dependencies. Must be called with the database lock held.
+        Args:
+            param_id: Which parameter to resolve
+
+        Returns:
+            Tuple of (valid, deadline)
+        """
+        cached = self._validity_cache.get(param_id)
+        if cached is not None:
+            return cached
+
+        entry = self._database.get(param_id)
+        if entry is None or param_id in self._forced_invalid:
+            result = (False, math.inf)
+        else:
+            valid = entry.validity
+
+            # Managed parameters report their own expiry, which drops this cached result
+            deadline = math.inf if entry.timeout_managed else entry.deadline
+            for dep in self._graph.depends_on(param_id):
+                dep_valid, dep_deadline = self._resolve_validity(dep)
+                valid = valid and dep_valid
+                deadline = min(deadline, dep_deadline)
+            result = (valid, deadline)
+
+        self._validity_cache[param_id] = result
+        return result
+
+    def _on_entry_changed(self, param_id: ParameterID) -> None:
+        """
+        Drops cached validity for a parameter and everything downstream of it. Runs whenever
+        an entry is written, including direct Entry.update() calls that bypass the database.
+        Args:
+            param_id: Parameter that changed
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._forced_invalid.discard(param_id)
+            for node in self._graph.downstream(param_id):
+                self._validity_cache.pop(node, None)
+
+    def _on_entry_timeout(self, param_id: ParameterID) -> None:
+        """
+        Called by the timeout service when a parameter misses its deadline. Drops cached
+        validity across the dependency tree and notifies TIMEOUT listeners.
+        Args:
+            param_id: Parameter that timed out
+
+        Returns:
+            None
+        """
+        with self._lock:
+            for node in self._graph.downstream(param_id):
+                self._validity_cache.pop(node, None)
+            entry = self._database.get(param_id)
+
+        if entry is not None:
+            entry._notify_listeners(Events.TIMEOUT)
 
     def dependency_list(self, param_id: ParameterID) -> List[ParameterID]:
         return self._database[param_id].depends
@@ -10,6 +10,7 @@
 
 import numpy as np
 from abc import ABCMeta, abstractmethod, abstractproperty
+from VDrone.dynamics.integrators import IIntegrator, RK4Integrator
 
 
 class IDynamics:
@@ -17,6 +18,7 @@ class IDynamics:
 
     def __init__(self):
         self._step_resolution = 0.001
+        self._integrator = RK4Integrator()
 
     @property
     def resolution(self) -> float:
@@ -26,6 +28,14 @@ class IDynamics:
     def resolution(self, val: float) -> None:
         self._step_resolution = val
 
+    @property
+    def integrator(self) -> IIntegrator:
+        return self._integrator
+
+    @integrator.setter
+    def integrator(self, val: IIntegrator) -> None:
+        self._integrator = val
+
     @abstractmethod
     def step(self, control: np.ndarray, last_state: np.ndarray, dt: float) -> np.ndarray:
         """
@@ -38,6 +48,20 @@ class IDynamics:
         """
         raise NotImplementedError
 
+    @abstractmethod
+    def derivative(self, state: np.ndarray, control: np.ndarray, out: np.ndarray) -> None:
+        """
+        Computes the time derivative of the system state
+        Args:
+            state: System state vector to evaluate at
+            control: System control input vector
+            out: Buffer the state derivative is written into
+
+        Returns:
+            None
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def get_state(self) -> np.ndarray:
         raise NotImplementedError
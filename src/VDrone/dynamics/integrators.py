@@ -0,0 +1,252 @@
+# **********************************************************************************************************************
+#   FileName:
+#       integrators.py
+#
+#   Description:
+#       Numerical integration schemes used to step the drone dynamics models forward in time
+#
+#   4/18/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import math
+import numpy as np
+from abc import ABCMeta, abstractmethod
+from typing import Callable
+
+# Signature of a state derivative function: f(state, control, out) -> None. The derivative
+# is written into 'out' so that no memory is allocated while integrating.
+DerivativeFunc = Callable[[np.ndarray, np.ndarray, np.ndarray], None]
+
+
+class IIntegrator:
+    __metaclass__ = ABCMeta
+
+    def __init__(self):
+        self._size = 0
+
+    def reserve(self, size: int) -> None:
+        """
+        Allocates the scratch buffers needed to integrate a state vector of the given size.
+        This only does work when the size changes, so it is cheap to call every step.
+        Args:
+            size: Number of elements in the state vector
+
+        Returns:
+            None
+        """
+        if size != self._size:
+            self._size = size
+            self._allocate(size)
+
+    @abstractmethod
+    def _allocate(self, size: int) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def integrate(self, func: DerivativeFunc, state: np.ndarray, control: np.ndarray, dt: float, h: float) -> int:
+        """
+        Advances the state in place by dt seconds
+        Args:
+            func: State derivative function
+            state: State vector to advance. Updated in place.
+            control: Control input held constant over the interval
+            dt: Total time to advance
+            h: Nominal internal step size
+
+        Returns:
+            Number of internal steps taken
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def _fixed_step_count(dt: float, h: float) -> int:
+        if h <= 0.0 or h >= dt:
+            return 1
+        return max(1, int(math.ceil(dt / h - 1e-9)))
+
+
+class EulerIntegrator(IIntegrator):
+    """ First order explicit Euler integration """
+
+    def _allocate(self, size: int) -> None:
+        self._k = np.zeros(size)
+
+    def integrate(self, func: DerivativeFunc, state: np.ndarray, control: np.ndarray, dt: float, h: float) -> int:
+        self.reserve(state.shape[0])
+        steps = self._fixed_step_count(dt, h)
+        h = dt / steps
+
+        for _ in range(steps):
+            func(state, control, self._k)
+            self._k *= h
+            state += self._k
+
+        return steps
+
+
+class RK4Integrator(IIntegrator):
+    """ Classic fixed step, fourth order Runge-Kutta integration """
+
+    def _allocate(self, size: int) -> None:
+        self._k = np.zeros((4, size))
+        self._tmp = np.zeros(size)
+
+    def integrate(self, func: DerivativeFunc, state: np.ndarray, control: np.ndarray, dt: float, h: float) -> int:
+        self.reserve(state.shape[0])
+        steps = self._fixed_step_count(dt, h)
+        h = dt / steps
+        k1, k2, k3, k4 = self._k
+        tmp = self._tmp
+
+        for _ in range(steps):
+            func(state, control, k1)
+
+            np.multiply(k1, 0.5 * h, out=tmp)
+            tmp += state
+            func(tmp, control, k2)
+
+            np.multiply(k2, 0.5 * h, out=tmp)
+            tmp += state
+            func(tmp, control, k3)
+
+            np.multiply(k3, h, out=tmp)
+            tmp += state
+            func(tmp, control, k4)
+
+            # state += h/6 * (k1 + 2*k2 + 2*k3 + k4)
+            np.add(k2, k3, out=tmp)
+            tmp *= 2.0
+            tmp += k1
+            tmp += k4
+            tmp *= h / 6.0
+            state += tmp
+
+        return steps
+
+
+class RK45Integrator(IIntegrator):
+    """ Adaptive Dormand-Prince 5(4) integration with local error control """
+
+    # Butcher tableau
+    _A = np.array([
+        [0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+        [1.0 / 5.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+        [3.0 / 40.0, 9.0 / 40.0, 0.0, 0.0, 0.0, 0.0],
+        [44.0 / 45.0, -56.0 / 15.0, 32.0 / 9.0, 0.0, 0.0, 0.0],
+        [19372.0 / 6561.0, -25360.0 / 2187.0, 64448.0 / 6561.0, -212.0 / 729.0, 0.0, 0.0],
+        [9017.0 / 3168.0, -355.0 / 33.0, 46732.0 / 5247.0, 49.0 / 176.0, -5103.0 / 18656.0, 0.0],
+    ])
+
+    # Fifth order solution weights. The last stage is evaluated at the new state and reused
+    # as the first stage of the next step (first same as last).
+    _B = np.array([35.0 / 384.0, 0.0, 500.0 / 1113.0, 125.0 / 192.0, -2187.0 / 6784.0, 11.0 / 84.0, 0.0])
+
+    # Difference between the fifth and embedded fourth order weights
+    _E = np.array([71.0 / 57600.0, 0.0, -71.0 / 16695.0, 71.0 / 1920.0, -17253.0 / 339200.0, 22.0 / 525.0,
+                   -1.0 / 40.0])
+
+    def __init__(self, rtol: float = 1e-6, atol: float = 1e-9, min_step: float = 1e-7, max_step: float = 0.0):
+        """
+        Initialize the adaptive integrator
+        Args:
+            rtol: Relative error tolerance per step
+            atol: Absolute error tolerance per step
+            min_step: Smallest step the controller may take. Steps at this size are always accepted.
+            max_step: Largest step the controller may take. Zero means unbounded.
+        """
+        super().__init__()
+        self.rtol = rtol
+        self.atol = atol
+        self.min_step = min_step
+        self.max_step = max_step
+        self.safety = 0.9
+        self.min_factor = 0.2
+        self.max_factor = 10.0
+
+        # Step size carried across calls so steady flight keeps the large steps it earned
+        self._h = 0.0
+
+    @property
+    def step_size(self) -> float:
+        """
+        Step size the controller will attempt next
+        Returns:
+            float
+        """
+        return self._h
+
+    def _allocate(self, size: int) -> None:
+        self._k = np.zeros((7, size))
+        self._y_new = np.zeros(size)
+        self._tmp = np.zeros(size)
+        self._err = np.zeros(size)
+        self._scale = np.zeros(size)
+
+    def integrate(self, func: DerivativeFunc, state: np.ndarray, control: np.ndarray, dt: float, h: float) -> int:
+        self.reserve(state.shape[0])
+        k = self._k
+        y_new = self._y_new
+        tmp = self._tmp
+        err = self._err
+        scale = self._scale
+
+        if self._h <= 0.0:
+            self._h = h if h > 0.0 else dt
+
+        remaining = dt
+        steps = 0
+        fsal = False
+
+        while remaining > 0.0:
+            step = min(self._h, remaining)
+            if self.max_step > 0.0:
+                step = min(step, self.max_step)
+
+            if not fsal:
+                func(state, control, k[0])
+
+            # Intermediate stages
+            for stage in range(1, 6):
+                np.dot(self._A[stage, :stage], k[:stage], out=tmp)
+                tmp *= step
+                tmp += state
+                func(tmp, control, k[stage])
+
+            # Fifth order solution and the stage evaluated on it
+            np.dot(self._B, k, out=y_new)
+            y_new *= step
+            y_new += state
+            func(y_new, control, k[6])
+
+            # Scaled RMS norm of the embedded error estimate
+            np.dot(self._E, k, out=err)
+            err *= step
+            np.abs(state, out=scale)
+            np.abs(y_new, out=tmp)
+            np.maximum(scale, tmp, out=scale)
+            scale *= self.rtol
+            scale += self.atol
+            err /= scale
+            err_norm = math.sqrt(float(np.dot(err, err)) / err.shape[0])
+
+            if err_norm <= 1.0 or step <= self.min_step:
+                np.copyto(state, y_new)
+                np.copyto(k[0], k[6])
+                fsal = True
+                remaining -= step
+                steps += 1
+
+                # Guard against float residue leaving a vanishingly small final step
+                if remaining <= 1e-12 * dt:
+                    remaining = 0.0
+
+            if err_norm == 0.0:
+                factor = self.max_factor
+            else:
+                factor = min(self.max_factor, max(self.min_factor, self.safety * err_norm ** -0.2))
+
+            # Don't let a truncated final step shrink the carried step size
+            if step == self._h or factor < 1.0:
+                self._h = max(self.min_step, step * factor)
+
+        return steps
@@ -0,0 +1,192 @@
+# **********************************************************************************************************************
+#   FileName:
+#       kernels.py
+#
+#   Description:
+#       Flat array numerical kernels for the Newton-Euler dynamics. Compiled with Numba when it
+#       is installed, otherwise executed as plain Python with identical arithmetic. The fused
+#       integration loops only pay off when compiled, so uncompiled callers should drive the
+#       derivative through the NumPy integrators in integrators.py instead.
+#
+#   4/20/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import math
+import os
+import numpy as np
+
+# ---------------------------------------------------------
+# Backend selection. Set VDRONE_DYNAMICS_BACKEND=numpy to
+# force the uncompiled path even if Numba is available.
+# ---------------------------------------------------------
+BACKEND_NUMBA = "numba"
+BACKEND_NUMPY = "numpy"
+
+try:
+    if os.environ.get("VDRONE_DYNAMICS_BACKEND", BACKEND_NUMBA).lower() == BACKEND_NUMPY:
+        raise ImportError
+    from numba import njit
+    BACKEND = BACKEND_NUMBA
+except ImportError:
+    BACKEND = BACKEND_NUMPY
+
+    def njit(*args, **kwargs):
+        """ Stand in for numba.njit that leaves the function uncompiled """
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Whether the kernels below are compiled
+COMPILED = BACKEND == BACKEND_NUMBA
+
+# ---------------------------------------------------------
+# Layout of the packed physical parameter vector
+# ---------------------------------------------------------
+PARAM_MASS = 0
+PARAM_ARM_LENGTH = 1
+PARAM_IXX = 2
+PARAM_IYY = 3
+PARAM_IZZ = 4
+PARAM_THRUST_COEFF = 5
+PARAM_DRAG_COEFF = 6
+PARAM_GRAVITY = 7
+PARAM_SIZE = 8
+
+STATE_SIZE = 12
+
+
+@njit(cache=True, error_model='numpy')
+def derivative(state: np.ndarray, control: np.ndarray, params: np.ndarray, out: np.ndarray) -> None:
+    """
+    Evaluates the Newton-Euler equations of motion for a plus configuration airframe with
+    motors numbered front, right, back, left. State layout matches NewtonEulerSim.
+    Args:
+        state: 12 element state vector to evaluate at
+        control: Angular speed of each of the four motors (rad/s)
+        params: Packed physical parameters, see PARAM_*
+        out: 12 element buffer the state derivative is written into
+
+    Returns:
+        None
+    """
+    mass = params[PARAM_MASS]
+    arm = params[PARAM_ARM_LENGTH]
+    Ixx = params[PARAM_IXX]
+    Iyy = params[PARAM_IYY]
+    Izz = params[PARAM_IZZ]
+    k_thrust = params[PARAM_THRUST_COEFF]
+    k_drag = params[PARAM_DRAG_COEFF]
+    gravity = params[PARAM_GRAVITY]
+
+    phi = state[6]
+    theta = state[7]
+    psi = state[8]
+    wx = state[9]
+    wy = state[10]
+    wz = state[11]
+
+    # Motor forces and torques
+    w1 = control[0] * control[0]
+    w2 = control[1] * control[1]
+    w3 = control[2] * control[2]
+    w4 = control[3] * control[3]
+
+    thrust = k_thrust * (w1 + w2 + w3 + w4)
+    arm_k = arm * k_thrust
+    tau_phi = arm_k * (w4 - w2)
+    tau_theta = arm_k * (w3 - w1)
+    tau_psi = k_drag * (w1 - w2 + w3 - w4)
+
+    s_phi = math.sin(phi)
+    c_phi = math.cos(phi)
+    s_theta = math.sin(theta)
+    c_theta = math.cos(theta)
+    s_psi = math.sin(psi)
+    c_psi = math.cos(psi)
+
+    # Position changes with the inertial velocity
+    out[0] = state[3]
+    out[1] = state[4]
+    out[2] = state[5]
+
+    # Body thrust rotated into the inertial frame, less gravity
+    accel = thrust / mass
+    out[3] = accel * (c_psi * s_theta * c_phi + s_psi * s_phi)
+    out[4] = accel * (s_psi * s_theta * c_phi - c_psi * s_phi)
+    out[5] = accel * (c_theta * c_phi) - gravity
+
+    # Euler angle rates from the body angular velocity
+    t_theta = s_theta / c_theta
+    out[6] = wx + (s_phi * wy + c_phi * wz) * t_theta
+    out[7] = c_phi * wy - s_phi * wz
+    out[8] = (s_phi * wy + c_phi * wz) / c_theta
+
+    # Euler's rotation equations
+    out[9] = ((Iyy - Izz) * wy * wz + tau_phi) / Ixx
+    out[10] = ((Izz - Ixx) * wx * wz + tau_theta) / Iyy
+    out[11] = ((Ixx - Iyy) * wx * wy + tau_psi) / Izz
+
+
+@njit(cache=True, error_model='numpy')
+def euler_integrate(state: np.ndarray, control: np.ndarray, params: np.ndarray, dt: float, steps: int,
+                    work: np.ndarray) -> None:
+    """
+    Advances the state in place with explicit Euler integration
+    Args:
+        state: 12 element state vector. Updated in place.
+        control: Angular speed of each of the four motors (rad/s)
+        params: Packed physical parameters, see PARAM_*
+        dt: Total time to advance
+        steps: Number of equal internal steps to take
+        work: Scratch buffer of at least shape (1, 12)
+
+    Returns:
+        None
+    """
+    h = dt / steps
+    k = work[0]
+    for _ in range(steps):
+        derivative(state, control, params, k)
+        for i in range(STATE_SIZE):
+            state[i] += k[i] * h
+
+
+@njit(cache=True, error_model='numpy')
+def rk4_integrate(state: np.ndarray, control: np.ndarray, params: np.ndarray, dt: float, steps: int,
+                  work: np.ndarray) -> None:
+    """
+    Advances the state in place with classic fourth order Runge-Kutta integration
+    Args:
+        state: 12 element state vector. Updated in place.
+        control: Angular speed of each of the four motors (rad/s)
+        params: Packed physical parameters, see PARAM_*
+        dt: Total time to advance
+        steps: Number of equal internal steps to take
+        work: Scratch buffer of at least shape (5, 12)
+
+    Returns:
+        None
+    """
+    h = dt / steps
+    k1 = work[0]
+    k2 = work[1]
+    k3 = work[2]
+    k4 = work[3]
+    tmp = work[4]
+
+    for _ in range(steps):
+        derivative(state, control, params, k1)
+        for i in range(STATE_SIZE):
+            tmp[i] = state[i] + k1[i] * (0.5 * h)
+
+        derivative(tmp, control, params, k2)
+        for i in range(STATE_SIZE):
+            tmp[i] = state[i] + k2[i] * (0.5 * h)
+
+        derivative(tmp, control, params, k3)
+        for i in range(STATE_SIZE):
+            tmp[i] = state[i] + k3[i] * h
+
+        derivative(tmp, control, params, k4)
+        for i in range(STATE_SIZE):
+            state[i] += ((k2[i] + k3[i]) * 2.0 + k1[i] + k4[i]) * (h / 6.0)
@@ -9,15 +9,65 @@
 # **********************************************************************************************************************
 
 import numpy as np
+from VDrone.dynamics import kernels
 from VDrone.dynamics.abstract import IDynamics
+from VDrone.dynamics.integrators import EulerIntegrator, RK4Integrator
+from VDrone.dynamics.rotation import EulerRotation
+
+
+def _state_property(index: int) -> property:
+    """
+    Builds an attribute that reads and writes a single element of the state vector
+    Args:
+        index: Position of the element in the state vector
+
+    Returns:
+        property
+    """
+    def getter(self) -> float:
+        return self._state[index]
+
+    def setter(self, val: float) -> None:
+        self._state[index] = val
+
+    return property(getter, setter)
 
 
 class NewtonEulerSim(IDynamics):
     """ A highly theoretical approach to modeling the quadcopter """
 
+    # ---------------------------------------------------------
+    # State vector layout
+    # ---------------------------------------------------------
+    IDX_X = 0
+    IDX_Y = 1
+    IDX_Z = 2
+    IDX_P = 3
+    IDX_Q = 4
+    IDX_R = 5
+    IDX_PHI = 6
+    IDX_THETA = 7
+    IDX_PSI = 8
+    IDX_WX = 9
+    IDX_WY = 10
+    IDX_WZ = 11
+    STATE_SIZE = 12
+
     def __init__(self):
         super().__init__()
 
+        # Full system state. All of the named state attributes below are views into this buffer.
+        self._state = np.zeros(self.STATE_SIZE)
+
+        # Body to inertial rotation kernel for rotation_matrix_to_interial(). Caches trig results
+        # between calls. The dynamics kernels rotate the thrust themselves, because they need the
+        # same sin/cos values for the Euler angle rates anyway.
+        self._rotation = EulerRotation()
+
+        # Flat buffers handed to the dynamics kernels
+        self._params = np.zeros(kernels.PARAM_SIZE)
+        self._kernel_work = np.zeros((5, self.STATE_SIZE))
+
         # ---------------------------------------------------------
         # Physical Properties
         # ---------------------------------------------------------
@@ -33,6 +83,13 @@ class NewtonEulerSim(IDynamics):
         self.Iyy = 0.0
         self.Izz = 0.0
 
+        # Motor thrust (N) and reaction torque (N*m) generated per squared unit of angular speed
+        self.thrust_coefficient = 0.0
+        self.drag_coefficient = 0.0
+
+        # Gravitational acceleration, acting along the inertial -Z axis
+        self.gravity = 9.81
+
         # ---------------------------------------------------------
         # Linear Position (Inertial Frame)
         # ---------------------------------------------------------
@@ -54,19 +111,113 @@ class NewtonEulerSim(IDynamics):
         self.theta = 0.0    # Rotation angle about the y-axis
         self.psi = 0.0      # Rotation angle about the z-axis
 
+        # ---------------------------------------------------------
+        # Angular Velocity (Body Frame)
+        # ---------------------------------------------------------
+        self.wx = 0.0   # X-axis
+        self.wy = 0.0   # Y-axis
+        self.wz = 0.0   # Z-axis
+
         # ---------------------------------------------------------
         # Motor models
         # ---------------------------------------------------------
         self.motors = [4]
 
+    def step(self, control: np.ndarray, last_state: np.ndarray, dt: float) -> np.ndarray:
+        """
+        Advances the rigid body dynamics with the configured integrator
+        Args:
+            control: Angular speed of each of the four motors (rad/s)
+            last_state: State to start from. Pass None to continue from the current state.
+            dt: How far forward to step the simulation in seconds
+
+        Returns:
+            The internal state buffer, updated in place
+        """
+        if last_state is not None and last_state is not self._state:
+            np.copyto(self._state, last_state)
+
+        self._pack_params()
+        control = np.asarray(control, dtype=np.float64)
+
+        # Fixed step integrators run entirely inside the compiled kernels. Without Numba, and for
+        # anything else, the generic integrator interface calls the derivative once per stage.
+        integrator_type = type(self._integrator) if kernels.COMPILED else None
+        if integrator_type is RK4Integrator:
+            steps = RK4Integrator._fixed_step_count(dt, self._step_resolution)
+            kernels.rk4_integrate(self._state, control, self._params, dt, steps, self._kernel_work)
+        elif integrator_type is EulerIntegrator:
+            steps = EulerIntegrator._fixed_step_count(dt, self._step_resolution)
+            kernels.euler_integrate(self._state, control, self._params, dt, steps, self._kernel_work)
+        else:
+            self._integrator.integrate(self.derivative, self._state, control, dt, self._step_resolution)
+
+        return self._state
+
+    def derivative(self, state: np.ndarray, control: np.ndarray, out: np.ndarray) -> None:
+        """
+        Evaluates the Newton-Euler equations of motion for a plus configuration airframe
+        with motors numbered front, right, back, left.
+        Args:
+            state: 12 element state vector to evaluate at
+            control: Angular speed of each of the four motors (rad/s)
+            out: 12 element buffer the state derivative is written into
+
+        Returns:
+            None
+        """
+        kernels.derivative(state, control, self._params, out)
 
-    def step(self, input: np.ndarray, state: np.ndarray, dt: float) -> bool:
-        pass
+    def get_state(self) -> np.ndarray:
+        return self._state.copy()
 
+    def rotation_matrix_to_interial(self, phi: float, theta: float, psi: float) -> np.ndarray:
+        """
+        Calculates the current rotation matrix from the body frame to the inertial frame.
+        Args:
+            phi: Rotation angle about the x-axis
+            theta: Rotation angle about the y-axis
+            psi: Rotation angle about the z-axis
 
+        Returns:
+            3x3 rotation matrix. This is a reused buffer that is overwritten on the next call.
+        """
+        return self._rotation.compute(phi, theta, psi)
 
+    def _pack_params(self) -> None:
+        """
+        Copies the physical properties into the flat parameter vector used by the kernels
+        Returns:
+            None
 
-    def rotation_matrix_to_interial(self, phi: float, theta: float, psi: float) -> np.ndarray:
+        Raises:
+            ValueError: Mass or a moment of inertia is not positive
         """
-        Calculates the current rotation matrix from the body frame to the inertial frame.
-        """
\ No newline at end of file
+        if self.mass <= 0.0 or self.Ixx <= 0.0 or self.Iyy <= 0.0 or self.Izz <= 0.0:
+            raise ValueError("Mass and moments of inertia must be positive before stepping the dynamics")
+
+        params = self._params
+        params[kernels.PARAM_MASS] = self.mass
+        params[kernels.PARAM_ARM_LENGTH] = self.moment_arm_length
+        params[kernels.PARAM_IXX] = self.Ixx
+        params[kernels.PARAM_IYY] = self.Iyy
+        params[kernels.PARAM_IZZ] = self.Izz
+        params[kernels.PARAM_THRUST_COEFF] = self.thrust_coefficient
+        params[kernels.PARAM_DRAG_COEFF] = self.drag_coefficient
+        params[kernels.PARAM_GRAVITY] = self.gravity
+
+    # ---------------------------------------------------------
+    # Named accessors into the state vector
+    # ---------------------------------------------------------
+    x = _state_property(IDX_X)
+    y = _state_property(IDX_Y)
+    z = _state_property(IDX_Z)
+    p = _state_property(IDX_P)
+    q = _state_property(IDX_Q)
+    r = _state_property(IDX_R)
+    phi = _state_property(IDX_PHI)
+    theta = _state_property(IDX_THETA)
+    psi = _state_property(IDX_PSI)
+    wx = _state_property(IDX_WX)
+    wy = _state_property(IDX_WY)
+    wz = _state_property(IDX_WZ)
@@ -0,0 +1,269 @@
+# **********************************************************************************************************************
+#   FileName:
+#       rotation.py
+#
+#   Description:
+#       Body to inertial frame rotation kernels for the dynamics models
+#
+#   4/19/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import math
+import numpy as np
+from abc import ABCMeta, abstractmethod
+
+
+class IRotation:
+    """
+    Body to inertial frame rotation from ZYX Euler angles. Implementations are interchangeable
+    and only differ in how the matrix is computed.
+    """
+    __metaclass__ = ABCMeta
+
+    def __init__(self):
+        # Output buffer reused by every call that doesn't supply its own
+        self._matrix = np.eye(3)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """
+        Most recently computed rotation matrix
+        Returns:
+            3x3 np.ndarray
+        """
+        return self._matrix
+
+    @abstractmethod
+    def compute(self, phi: float, theta: float, psi: float, out: np.ndarray = None) -> np.ndarray:
+        """
+        Calculates the rotation matrix from the body frame to the inertial frame
+        Args:
+            phi: Rotation angle about the x-axis
+            theta: Rotation angle about the y-axis
+            psi: Rotation angle about the z-axis
+            out: Optional 3x3 buffer to write the result into
+
+        Returns:
+            The rotation matrix, written into 'out' or the internal buffer
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def compute_batch(self, phi: np.ndarray, theta: np.ndarray, psi: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        Vectorized form of compute() for many attitudes at once
+        Args:
+            phi: Rotation angles about the x-axis, shaped (N,)
+            theta: Rotation angles about the y-axis, shaped (N,)
+            psi: Rotation angles about the z-axis, shaped (N,)
+            out: Optional (N, 3, 3) buffer to write the result into
+
+        Returns:
+            Rotation matrices shaped (N, 3, 3)
+        """
+        raise NotImplementedError
+
+
+class EulerRotation(IRotation):
+    """ ZYX Euler angle rotation from the body frame to the inertial frame """
+
+    def __init__(self):
+        super().__init__()
+
+        # Angles the cached trig values were computed for. NaN guarantees the first call misses.
+        self._angles = (math.nan, math.nan, math.nan)
+
+        self.s_phi = 0.0
+        self.c_phi = 1.0
+        self.s_theta = 0.0
+        self.c_theta = 1.0
+        self.s_psi = 0.0
+        self.c_psi = 1.0
+
+    def compute(self, phi: float, theta: float, psi: float, out: np.ndarray = None) -> np.ndarray:
+        """
+        Calculates the rotation matrix from the body frame to the inertial frame. The sine and
+        cosine of each angle are only recomputed when that angle changes.
+        Args:
+            phi: Rotation angle about the x-axis
+            theta: Rotation angle about the y-axis
+            psi: Rotation angle about the z-axis
+            out: Optional 3x3 buffer to write the result into
+
+        Returns:
+            The rotation matrix, written into 'out' or the internal buffer
+        """
+        last_phi, last_theta, last_psi = self._angles
+        if phi != last_phi:
+            self.s_phi = math.sin(phi)
+            self.c_phi = math.cos(phi)
+        if theta != last_theta:
+            self.s_theta = math.sin(theta)
+            self.c_theta = math.cos(theta)
+        if psi != last_psi:
+            self.s_psi = math.sin(psi)
+            self.c_psi = math.cos(psi)
+        self._angles = (phi, theta, psi)
+
+        s_phi, c_phi = self.s_phi, self.c_phi
+        s_theta, c_theta = self.s_theta, self.c_theta
+        s_psi, c_psi = self.s_psi, self.c_psi
+
+        R = self._matrix if out is None else out
+        R[0, 0] = c_psi * c_theta
+        R[0, 1] = c_psi * s_theta * s_phi - s_psi * c_phi
+        R[0, 2] = c_psi * s_theta * c_phi + s_psi * s_phi
+        R[1, 0] = s_psi * c_theta
+        R[1, 1] = s_psi * s_theta * s_phi + c_psi * c_phi
+        R[1, 2] = s_psi * s_theta * c_phi - c_psi * s_phi
+        R[2, 0] = -s_theta
+        R[2, 1] = c_theta * s_phi
+        R[2, 2] = c_theta * c_phi
+        return R
+
+    def compute_batch(self, phi: np.ndarray, theta: np.ndarray, psi: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        s_phi, c_phi = np.sin(phi), np.cos(phi)
+        s_theta, c_theta = np.sin(theta), np.cos(theta)
+        s_psi, c_psi = np.sin(psi), np.cos(psi)
+
+        R = np.empty((np.size(phi), 3, 3)) if out is None else out
+        R[:, 0, 0] = c_psi * c_theta
+        R[:, 0, 1] = c_psi * s_theta * s_phi - s_psi * c_phi
+        R[:, 0, 2] = c_psi * s_theta * c_phi + s_psi * s_phi
+        R[:, 1, 0] = s_psi * c_theta
+        R[:, 1, 1] = s_psi * s_theta * s_phi + c_psi * c_phi
+        R[:, 1, 2] = s_psi * s_theta * c_phi - c_psi * s_phi
+        R[:, 2, 0] = -s_theta
+        R[:, 2, 1] = c_theta * s_phi
+        R[:, 2, 2] = c_theta * c_phi
+        return R
+
+
+class QuaternionRotation(IRotation):
+    """
+    Unit quaternion rotation from the body frame to the inertial frame. Free of gimbal lock.
+    Only compute_quaternion() and compute_quaternion_batch() avoid trig, so they are the fast
+    entry points for models that keep their attitude as a quaternion. compute() and
+    compute_batch() take Euler angles like EulerRotation, and pay for the same six sin/cos
+    evaluations converting them.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._quaternion = np.array([1.0, 0.0, 0.0, 0.0])
+
+    def compute(self, phi: float, theta: float, psi: float, out: np.ndarray = None) -> np.ndarray:
+        """
+        Same result as EulerRotation.compute(), by way of from_euler(). No cheaper than the Euler
+        kernel, and uncached, so prefer compute_quaternion() when the quaternion is at hand.
+        Args:
+            phi: Rotation angle about the x-axis
+            theta: Rotation angle about the y-axis
+            psi: Rotation angle about the z-axis
+            out: Optional 3x3 buffer to write the result into
+
+        Returns:
+            The rotation matrix, written into 'out' or the internal buffer
+        """
+        return self.compute_quaternion(self.from_euler(phi, theta, psi, out=self._quaternion), out=out)
+
+    def compute_batch(self, phi: np.ndarray, theta: np.ndarray, psi: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        return self.compute_quaternion_batch(self.from_euler_batch(phi, theta, psi), out=out)
+
+    def compute_quaternion(self, q: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        Calculates the rotation matrix from the body frame to the inertial frame. No trig is
+        required, only products of the quaternion components.
+        Args:
+            q: Unit quaternion ordered (w, x, y, z)
+            out: Optional 3x3 buffer to write the result into
+
+        Returns:
+            The rotation matrix, written into 'out' or the internal buffer
+        """
+        w, x, y, z = q[0], q[1], q[2], q[3]
+
+        R = self._matrix if out is None else out
+        R[0, 0] = 1.0 - 2.0 * (y * y + z * z)
+        R[0, 1] = 2.0 * (x * y - w * z)
+        R[0, 2] = 2.0 * (x * z + w * y)
+        R[1, 0] = 2.0 * (x * y + w * z)
+        R[1, 1] = 1.0 - 2.0 * (x * x + z * z)
+        R[1, 2] = 2.0 * (y * z - w * x)
+        R[2, 0] = 2.0 * (x * z - w * y)
+        R[2, 1] = 2.0 * (y * z + w * x)
+        R[2, 2] = 1.0 - 2.0 * (x * x + y * y)
+        return R
+
+    @staticmethod
+    def compute_quaternion_batch(q: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        Vectorized form of compute_quaternion() for many attitudes at once
+        Args:
+            q: Unit quaternions ordered (w, x, y, z), shaped (N, 4)
+            out: Optional (N, 3, 3) buffer to write the result into
+
+        Returns:
+            Rotation matrices shaped (N, 3, 3)
+        """
+        w, x, y, z = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+
+        R = np.empty((q.shape[0], 3, 3)) if out is None else out
+        R[:, 0, 0] = 1.0 - 2.0 * (y * y + z * z)
+        R[:, 0, 1] = 2.0 * (x * y - w * z)
+        R[:, 0, 2] = 2.0 * (x * z + w * y)
+        R[:, 1, 0] = 2.0 * (x * y + w * z)
+        R[:, 1, 1] = 1.0 - 2.0 * (x * x + z * z)
+        R[:, 1, 2] = 2.0 * (y * z - w * x)
+        R[:, 2, 0] = 2.0 * (x * z - w * y)
+        R[:, 2, 1] = 2.0 * (y * z + w * x)
+        R[:, 2, 2] = 1.0 - 2.0 * (x * x + y * y)
+        return R
+
+    @staticmethod
+    def from_euler(phi: float, theta: float, psi: float, out: np.ndarray = None) -> np.ndarray:
+        """
+        Converts ZYX Euler angles into the equivalent unit quaternion
+        Args:
+            phi: Rotation angle about the x-axis
+            theta: Rotation angle about the y-axis
+            psi: Rotation angle about the z-axis
+            out: Optional 4 element buffer to write the result into
+
+        Returns:
+            Quaternion ordered (w, x, y, z)
+        """
+        s_phi, c_phi = math.sin(0.5 * phi), math.cos(0.5 * phi)
+        s_theta, c_theta = math.sin(0.5 * theta), math.cos(0.5 * theta)
+        s_psi, c_psi = math.sin(0.5 * psi), math.cos(0.5 * psi)
+
+        q = np.empty(4) if out is None else out
+        q[0] = c_phi * c_theta * c_psi + s_phi * s_theta * s_psi
+        q[1] = s_phi * c_theta * c_psi - c_phi * s_theta * s_psi
+        q[2] = c_phi * s_theta * c_psi + s_phi * c_theta * s_psi
+        q[3] = c_phi * c_theta * s_psi - s_phi * s_theta * c_psi
+        return q
+
+    @staticmethod
+    def from_euler_batch(phi: np.ndarray, theta: np.ndarray, psi: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        Vectorized form of from_euler() for many attitudes at once
+        Args:
+            phi: Rotation angles about the x-axis, shaped (N,)
+            theta: Rotation angles about the y-axis, shaped (N,)
+            psi: Rotation angles about the z-axis, shaped (N,)
+            out: Optional (N, 4) buffer to write the result into
+
+        Returns:
+            Quaternions ordered (w, x, y, z), shaped (N, 4)
+        """
+        s_phi, c_phi = np.sin(0.5 * phi), np.cos(0.5 * phi)
+        s_theta, c_theta = np.sin(0.5 * theta), np.cos(0.5 * theta)
+        s_psi, c_psi = np.sin(0.5 * psi), np.cos(0.5 * psi)
+
+        q = np.empty((np.size(phi), 4)) if out is None else out
+        q[:, 0] = c_phi * c_theta * c_psi + s_phi * s_theta * s_psi
+        q[:, 1] = s_phi * c_theta * c_psi - c_phi * s_theta * s_psi
+        q[:, 2] = c_phi * s_theta * c_psi + s_phi * c_theta * s_psi
+        q[:, 3] = c_phi * c_theta * s_psi - s_phi * s_theta * c_psi
+        return q
@@ -51,3 +51,29 @@ class TransferFunction:
             Output of the transfer function
         """
         raise NotImplementedError
+
+    def tf_evaluate_batch(self, sig_in: np.ndarray, dt: float = 0.0) -> np.ndarray:
+        """
+        Evaluates the transfer function for many independent inputs at once. Models that can
+        operate on the whole batch with vectorized math should override this. The default
+        falls back to calling tf_evaluate() once per row.
+        Args:
+            sig_in: Input signals to evaluate, shaped (N, input_dim)
+            dt: Time step to evaluate over
+
+        Returns:
+            Output of the transfer function for each input, shaped (N, output_dim)
+        """
+        sig_in = np.atleast_2d(sig_in)
+        rows = [np.ravel(self.tf_evaluate(sig_in=row, dt=dt)) for row in sig_in]
+        return np.stack(rows, axis=0)
+
+    @property
+    def tf_batch_capable(self) -> bool:
+        """
+        Checks if the model provides a vectorized batch evaluation
+        Returns:
+            True: tf_evaluate_batch() is overridden with a vectorized implementation
+            False: Batch evaluation falls back to the scalar path
+        """
+        return type(self).tf_evaluate_batch is not TransferFunction.tf_evaluate_batch
@@ -8,7 +8,6 @@
 #   4/8/21 | Brandon Braun | brandonbraun653@gmail.com
 # **********************************************************************************************************************
 
-from pint import UnitRegistry
 from VDrone.motors.abstract_motor import IMotor
 
 
@@ -21,6 +20,6 @@ class IdealMotor(IMotor):
     def set_controller(self, controller) -> None:
         pass
 
-    def step(self, control: float, dt: float) -> float:
+    def step(self, control: float, last_state: float, dt: float) -> float:
         return control
 
@@ -0,0 +1,75 @@
+# **********************************************************************************************************************
+#   FileName:
+#       mixer.py
+#
+#   Description:
+#       Maps pilot stick inputs onto individual motor commands
+#
+#   4/30/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import numpy as np
+
+NUM_MOTORS = 4
+
+
+class QuadMixer:
+    """
+    Mixer for a plus configuration airframe with motors numbered front, right, back, left, the
+    same layout the Newton-Euler dynamics use. Throttle sets the collective command and the
+    other axes add differential commands on top, e.g. positive roll speeds up the left motor
+    and slows the right one. Commands are normalized to [0, 1] of full motor speed.
+    """
+
+    # Rows are motors, columns are the (pitch, roll, yaw, throttle) order of StickInputs
+    PLUS_MATRIX = np.array([
+        [-1.0, 0.0, 1.0, 1.0],  # Front
+        [0.0, -1.0, -1.0, 1.0],  # Right
+        [1.0, 0.0, 1.0, 1.0],  # Back
+        [0.0, 1.0, -1.0, 1.0]  # Left
+    ])
+
+    def __init__(self, attitude_authority: float = 0.25, yaw_authority: float = 0.1):
+        """
+        Initialize the mixer
+        Args:
+            attitude_authority: Largest differential command a full pitch or roll stick adds
+            yaw_authority: Largest differential command a full yaw stick adds
+        """
+        self._matrix = self.PLUS_MATRIX * np.array([attitude_authority, attitude_authority, yaw_authority, 1.0])
+        self._output = np.zeros(NUM_MOTORS)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._matrix
+
+    def mix(self, sticks: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        Computes the motor commands for one set of stick inputs
+        Args:
+            sticks: (pitch, roll, yaw, throttle) with throttle in [0, 1] and the rest in [-1, 1]
+            out: Buffer to write the commands into. Defaults to a buffer owned by the mixer,
+                 which is overwritten on the next call.
+
+        Returns:
+            Command for each motor, clipped to [0, 1]
+        """
+        out = self._output if out is None else out
+        np.dot(self._matrix, sticks, out=out)
+        return np.clip(out, 0.0, 1.0, out=out)
+
+    def mix_batch(self, sticks: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        Computes the motor commands for many independent sets of stick inputs at once
+        Args:
+            sticks: Stick inputs shaped (N, 4)
+            out: Buffer shaped (N, 4) to write the commands into. Allocated if not given.
+
+        Returns:
+            Commands shaped (N, 4), clipped to [0, 1]
+        """
+        sticks = np.atleast_2d(sticks)
+        if out is None:
+            out = np.empty((sticks.shape[0], NUM_MOTORS))
+        np.dot(sticks, self._matrix.T, out=out)
+        return np.clip(out, 0.0, 1.0, out=out)
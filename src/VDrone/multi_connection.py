@@ -0,0 +1,311 @@
+# **********************************************************************************************************************
+#   FileName:
+#       multi_connection.py
+#
+#   Description:
+#       Multiplexes many virtual drones over a single set of ZMQ sockets
+#
+#   4/24/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import zmq
+from pathlib import Path
+from queue import Queue, Empty, Full
+from typing import Dict, List, Tuple, Union
+from loguru import logger
+from threading import Thread, Event, Lock
+from VDrone.connection import SimConnection, SimData, configure_sockets, socket_codecs, subscribe_topics
+from VDrone.parameters import Codec, IParameter, TimedParameter
+from VDrone.ring_buffer import OverflowPolicy, SPSCRingBuffer
+
+
+class VehicleLink:
+    """ Per-vehicle endpoint handed out by the ConnectionManager """
+
+    def __init__(self, manager: 'ConnectionManager', vehicle_id: Union[int, str], rx_queue_size: int = 1024,
+                 rx_overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST):
+        """
+        Initialize the vehicle endpoint
+        Args:
+            manager: Connection manager that owns the shared sockets
+            vehicle_id: Unique identifier of the vehicle. Used as the topic prefix on the wire.
+            rx_queue_size: Capacity of the receive queue
+            rx_overflow: What the manager pump does when the receive queue is full
+        """
+        self._manager = manager
+        self._vehicle_id = vehicle_id
+        self._data_map = SimData(vehicle_id=vehicle_id)
+        self._heartbeat_topic = self._data_map.get_encoded_topic(SimConnection.RxTopics.HEARTBEAT)
+        self._fcs_connected = TimedParameter(bool, initial_value=False, timeout=0.5)
+
+        # Filled by the manager pump thread and drained by the thread calling receive(). Dropped
+        # data goes back to the pool it was acquired from.
+        self._rx_queue = SPSCRingBuffer(capacity=rx_queue_size, policy=rx_overflow,
+                                        on_evict=self._data_map.release_param)
+
+    @property
+    def vehicle_id(self) -> Union[int, str]:
+        return self._vehicle_id
+
+    @property
+    def data_map(self) -> SimData:
+        return self._data_map
+
+    def transmit(self, data: IParameter) -> None:
+        """
+        Transmits a piece of data to this vehicle's flight software
+        Args:
+            data: Parameter instance to be transmitted
+
+        Returns:
+            None
+        """
+        self._manager._enqueue_tx(self, data)
+
+    def receive(self) -> Union[IParameter, None]:
+        """
+        Receives data from this vehicle's RX queue
+        Returns:
+            IParameter or None
+        """
+        return self._rx_queue.get()
+
+    def release(self, data: IParameter) -> None:
+        """
+        Hands a received parameter back for reuse
+        Args:
+            data: Parameter previously returned by receive()
+
+        Returns:
+            None
+        """
+        self._data_map.release_param(data)
+
+    def metrics(self) -> Dict[str, int]:
+        """
+        Snapshot of the receive queue health counters
+        Returns:
+            Dictionary of the receive queue metrics
+        """
+        return self._rx_queue.metrics()
+
+    def is_connected(self) -> bool:
+        """
+        Checks if this vehicle is connected up to its flight software
+        Returns:
+            True: Still connected
+            False: Not connected
+        """
+        return self._fcs_connected.is_valid()
+
+
+class ConnectionManager(Thread):
+    """
+    Shares one ZMQ context and one socket per TxSocket/RxSocket between any number of
+    vehicles. Each vehicle's topics are prefixed with its ID, so SUB subscriptions and the
+    RX routing table keep the traffic separated while per-vehicle routing stays in SimData.
+    """
+
+    def __init__(self, processing_period: float = 0.01, context: zmq.Context = None,
+                 sim_ports: Union[str, Path, dict, None] = None, rx_queue_size: int = 1024,
+                 rx_overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST):
+        """
+        Initialize the manager and bind the shared sockets
+        Args:
+            processing_period: Longest the pump idles between checks of the kill signal (seconds)
+            context: ZMQ context to create sockets on. Defaults to the shared global instance.
+            sim_ports: Sim port configuration or path to it. Defaults as for SimConnection.
+            rx_queue_size: Capacity of each vehicle's receive queue
+            rx_overflow: What the pump does when a vehicle's receive queue is full. BLOCK stalls
+                         the pump, and with it every vehicle, for up to 100ms, so prefer one of
+                         the drop policies.
+        """
+        super().__init__()
+        self._pump_rate = processing_period
+        self._rx_queue_size = rx_queue_size
+        self._rx_overflow = rx_overflow
+        self._kill = Event()
+
+        # ZMQ Resources
+        self._zmq_context = context if context else zmq.Context.instance()
+        self._zmq_pub_sockets = {key.value: self._zmq_context.socket(zmq.PUB) for key in
+                                 SimConnection.TxSocket}  # type: Dict[str, zmq.Socket]
+        self._zmq_sub_sockets = {key.value: self._zmq_context.socket(zmq.SUB) for key in
+                                 SimConnection.RxSocket}  # type: Dict[str, zmq.Socket]
+        cfg = SimConnection._load_sim_ports(sim_ports)
+        configure_sockets(cfg=cfg, pub_sockets=self._zmq_pub_sockets,
+                          sub_sockets=self._zmq_sub_sockets, data_map=None)
+        self._socket_codecs = socket_codecs(cfg)
+        self._sub_codecs = {socket: self._socket_codecs.get(name, Codec.PROTOBUF) for name, socket in
+                            self._zmq_sub_sockets.items()}  # type: Dict[zmq.Socket, Codec]
+
+        wakeup_address = "inproc://vdrone_mux_wakeup_{}".format(id(self))
+        self._wakeup_rx = self._zmq_context.socket(zmq.PAIR)
+        self._wakeup_rx.bind(wakeup_address)
+        self._wakeup_tx = self._zmq_context.socket(zmq.PAIR)
+        self._wakeup_tx.connect(wakeup_address)
+
+        # Vehicle registry. Sockets may only be touched by the pump thread, so new subscriptions
+        # are staged here and applied on the next pump cycle.
+        self._lock = Lock()
+        self._vehicles = {}  # type: Dict[Union[int, str], VehicleLink]
+        self._rx_routes = {}  # type: Dict[bytes, VehicleLink]
+        self._pending_subscriptions = []  # type: List[VehicleLink]
+
+        self._tx_queue = Queue()  # type: Queue[Tuple[VehicleLink, IParameter]]
+
+    def register(self, vehicle_id: Union[int, str]) -> VehicleLink:
+        """
+        Adds a vehicle to the manager
+        Args:
+            vehicle_id: Unique identifier of the vehicle
+
+        Returns:
+            Endpoint used to talk to the vehicle's flight software
+        """
+        with self._lock:
+            if vehicle_id in self._vehicles:
+                return self._vehicles[vehicle_id]
+
+            link = VehicleLink(manager=self, vehicle_id=vehicle_id, rx_queue_size=self._rx_queue_size,
+                               rx_overflow=self._rx_overflow)
+            self._vehicles[vehicle_id] = link
+            for socket in self._zmq_sub_sockets.keys():
+                for topic in link.data_map.get_socket_subscriber_list(socket):
+                    self._rx_routes[link.data_map.get_encoded_topic(topic)] = link
+            self._pending_subscriptions.append(link)
+
+        self._wakeup()
+        logger.debug("Registered vehicle {}".format(vehicle_id))
+        return link
+
+    def vehicle(self, vehicle_id: Union[int, str]) -> Union[VehicleLink, None]:
+        return self._vehicles.get(vehicle_id)
+
+    def kill(self) -> None:
+        """
+        Kills the connection manager thread
+        Returns:
+            None
+        """
+        self._kill.set()
+        self._wakeup()
+
+    def run(self) -> None:
+        logger.info("Executing the ConnectionManager thread")
+        poller = zmq.Poller()
+        poller.register(self._wakeup_rx, zmq.POLLIN)
+        for socket in self._zmq_sub_sockets.values():
+            poller.register(socket, zmq.POLLIN)
+
+        idle_timeout_ms = max(int(self._pump_rate * 1000.0), 1)
+
+        while not self._kill.is_set():
+            self._apply_subscriptions()
+
+            for socket, _ in poller.poll(timeout=idle_timeout_ms):
+                if socket is self._wakeup_rx:
+                    self._drain_wakeups()
+                else:
+                    self._rx_message_pump(socket)
+
+            self._tx_message_pump()
+
+        # The context may be shared, so only the sockets are torn down. Unsent messages would
+        # otherwise hold up terminating it.
+        with self._lock:
+            for socket in [*self._zmq_pub_sockets.values(), *self._zmq_sub_sockets.values(), self._wakeup_rx,
+                           self._wakeup_tx]:
+                socket.close(linger=0)
+        logger.info("Exiting the ConnectionManager thread")
+
+    def _enqueue_tx(self, link: VehicleLink, data: IParameter) -> None:
+        try:
+            self._tx_queue.put((link, data), block=True, timeout=0.05)
+        except Full:
+            logger.warning("TX queue full, dropping data for vehicle {}".format(link.vehicle_id))
+            return
+        self._wakeup()
+
+    def _wakeup(self) -> None:
+        with self._lock:
+            try:
+                self._wakeup_tx.send(b'', flags=zmq.NOBLOCK)
+            except zmq.ZMQError:
+                pass
+
+    def _drain_wakeups(self) -> None:
+        try:
+            while True:
+                self._wakeup_rx.recv(flags=zmq.NOBLOCK)
+        except zmq.ZMQError:
+            pass
+
+    def _apply_subscriptions(self) -> None:
+        """
+        Subscribes the shared SUB sockets to the topics of newly registered vehicles
+        Returns:
+            None
+        """
+        with self._lock:
+            pending, self._pending_subscriptions = self._pending_subscriptions, []
+
+        for link in pending:
+            for name, socket in self._zmq_sub_sockets.items():
+                subscribe_topics(socket, name, link.data_map)
+
+    def _rx_message_pump(self, socket: zmq.Socket) -> None:
+        """
+        Routes every message waiting on a SUB socket to the vehicle named in its topic prefix
+        Args:
+            socket: Socket with data available
+
+        Returns:
+            None
+        """
+        while True:
+            try:
+                msg = socket.recv_multipart(flags=zmq.NOBLOCK, copy=False)
+            except zmq.ZMQError:
+                return
+
+            if len(msg) != 2:
+                continue
+
+            topic = msg[0].bytes
+            link = self._rx_routes.get(topic)
+            if link is None:
+                continue
+
+            if topic == link._heartbeat_topic:
+                link._fcs_connected.update(True)
+                continue
+
+            param = link.data_map.acquire_param_from_topic_bytes(topic)
+            if param and param.decode(msg[1].buffer, self._sub_codecs[socket]):
+                # Recycle the instance if the queue turned it away
+                if not link._rx_queue.put(param, timeout=0.1):
+                    link.data_map.release_param(param)
+            else:
+                if param:
+                    link.data_map.release_param(param)
+                logger.error("Failed to convert data for vehicle {} on topic {}".format(link.vehicle_id, topic))
+
+    def _tx_message_pump(self) -> None:
+        """
+        Publishes queued data for every vehicle over the shared PUB sockets
+        Returns:
+            None
+        """
+        while True:
+            try:
+                link, param = self._tx_queue.get_nowait()
+            except Empty:
+                return
+
+            try:
+                socket, topic, encoded_topic = link.data_map.get_route(param.id)
+                codec = self._socket_codecs.get(socket.value, Codec.PROTOBUF)
+                self._zmq_pub_sockets[socket.value].send_multipart([encoded_topic, param.encode(codec)], copy=False)
+            except Exception as e:
+                logger.error("{} exception: {}".format(type(e).__name__, str(e)))
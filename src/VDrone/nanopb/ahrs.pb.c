@@ -15,4 +15,10 @@ PB_BIND(GyroSample, GyroSample, AUTO)
 PB_BIND(MagSample, MagSample, AUTO)
 
 
+PB_BIND(ImuFrame, ImuFrame, AUTO)
+
+
+PB_BIND(ImuFrameBatch, ImuFrameBatch, 2)
+
+
 
@@ -31,6 +31,18 @@ typedef struct _MagSample {
     uint32_t timestamp; 
 } MagSample;
 
+typedef struct _ImuFrame { 
+    uint32_t timestamp; 
+    AccelSample accel; 
+    GyroSample gyro; 
+    MagSample mag; 
+} ImuFrame;
+
+typedef struct _ImuFrameBatch { 
+    pb_size_t frames_count; 
+    ImuFrame frames[16]; 
+} ImuFrameBatch;
+
 
 #ifdef __cplusplus
 extern "C" {
@@ -40,9 +52,13 @@ extern "C" {
 #define AccelSample_init_default                 {0, 0, 0, 0}
 #define GyroSample_init_default                  {0, 0, 0, 0}
 #define MagSample_init_default                   {0, 0, 0, 0}
+#define ImuFrame_init_default                    {0, AccelSample_init_default, GyroSample_init_default, MagSample_init_default}
+#define ImuFrameBatch_init_default               {0, {ImuFrame_init_default, ImuFrame_init_default, ImuFrame_init_default, ImuFrame_init_default, ImuFrame_init_default, ImuFrame_init_default, ImuFrame_init_default, ImuFrame_init_default, ImuFrame_init_default, ImuFrame_init_default, ImuFrame_init_default, ImuFrame_init_default, ImuFrame_init_default, ImuFrame_init_default, ImuFrame_init_default, ImuFrame_init_default}}
 #define AccelSample_init_zero                    {0, 0, 0, 0}
 #define GyroSample_init_zero                     {0, 0, 0, 0}
 #define MagSample_init_zero                      {0, 0, 0, 0}
+#define ImuFrame_init_zero                       {0, AccelSample_init_zero, GyroSample_init_zero, MagSample_init_zero}
+#define ImuFrameBatch_init_zero                  {0, {ImuFrame_init_zero, ImuFrame_init_zero, ImuFrame_init_zero, ImuFrame_init_zero, ImuFrame_init_zero, ImuFrame_init_zero, ImuFrame_init_zero, ImuFrame_init_zero, ImuFrame_init_zero, ImuFrame_init_zero, ImuFrame_init_zero, ImuFrame_init_zero, ImuFrame_init_zero, ImuFrame_init_zero, ImuFrame_init_zero, ImuFrame_init_zero}}
 
 /* Field tags (for use in manual encoding/decoding) */
 #define AccelSample_x_tag                        1
@@ -57,6 +73,11 @@ extern "C" {
 #define MagSample_y_tag                          2
 #define MagSample_z_tag                          3
 #define MagSample_timestamp_tag                  4
+#define ImuFrame_timestamp_tag                   1
+#define ImuFrame_accel_tag                       2
+#define ImuFrame_gyro_tag                        3
+#define ImuFrame_mag_tag                         4
+#define ImuFrameBatch_frames_tag                 1
 
 /* Struct field encoding specification for nanopb */
 #define AccelSample_FIELDLIST(X, a) \
@@ -83,18 +104,41 @@ X(a, STATIC,   REQUIRED, UINT32,   timestamp,         4)
 #define MagSample_CALLBACK NULL
 #define MagSample_DEFAULT NULL
 
+#define ImuFrame_FIELDLIST(X, a) \
+X(a, STATIC,   REQUIRED, UINT32,   timestamp,         1) \
+X(a, STATIC,   REQUIRED, MESSAGE,  accel,             2) \
+X(a, STATIC,   REQUIRED, MESSAGE,  gyro,              3) \
+X(a, STATIC,   REQUIRED, MESSAGE,  mag,               4)
+#define ImuFrame_CALLBACK NULL
+#define ImuFrame_DEFAULT NULL
+#define ImuFrame_accel_MSGTYPE AccelSample
+#define ImuFrame_gyro_MSGTYPE GyroSample
+#define ImuFrame_mag_MSGTYPE MagSample
+
+#define ImuFrameBatch_FIELDLIST(X, a) \
+X(a, STATIC,   REPEATED, MESSAGE,  frames,            1)
+#define ImuFrameBatch_CALLBACK NULL
+#define ImuFrameBatch_DEFAULT NULL
+#define ImuFrameBatch_frames_MSGTYPE ImuFrame
+
 extern const pb_msgdesc_t AccelSample_msg;
 extern const pb_msgdesc_t GyroSample_msg;
 extern const pb_msgdesc_t MagSample_msg;
+extern const pb_msgdesc_t ImuFrame_msg;
+extern const pb_msgdesc_t ImuFrameBatch_msg;
 
 /* Defines for backwards compatibility with code written before nanopb-0.4.0 */
 #define AccelSample_fields &AccelSample_msg
 #define GyroSample_fields &GyroSample_msg
 #define MagSample_fields &MagSample_msg
+#define ImuFrame_fields &ImuFrame_msg
+#define ImuFrameBatch_fields &ImuFrameBatch_msg
 
 /* Maximum encoded size of messages (where known) */
 #define AccelSample_size                         21
 #define GyroSample_size                          21
+#define ImuFrameBatch_size                       1232
+#define ImuFrame_size                            75
 #define MagSample_size                           21
 
 #ifdef __cplusplus
@@ -19,7 +19,7 @@ DESCRIPTOR = _descriptor.FileDescriptor(
   syntax='proto2',
   serialized_options=None,
   create_key=_descriptor._internal_create_key,
-  serialized_pb=b'\n\nahrs.proto\"A\n\x0b\x41\x63\x63\x65lSample\x12\t\n\x01x\x18\x01 \x02(\x02\x12\t\n\x01y\x18\x02 \x02(\x02\x12\t\n\x01z\x18\x03 \x02(\x02\x12\x11\n\ttimestamp\x18\x04 \x02(\r\"@\n\nGyroSample\x12\t\n\x01x\x18\x01 \x02(\x02\x12\t\n\x01y\x18\x02 \x02(\x02\x12\t\n\x01z\x18\x03 \x02(\x02\x12\x11\n\ttimestamp\x18\x04 \x02(\r\"?\n\tMagSample\x12\t\n\x01x\x18\x01 \x02(\x02\x12\t\n\x01y\x18\x02 \x02(\x02\x12\t\n\x01z\x18\x03 \x02(\x02\x12\x11\n\ttimestamp\x18\x04 \x02(\r'
+  serialized_pb=b'\n\nahrs.proto\"A\n\x0b\x41\x63\x63\x65lSample\x12\t\n\x01x\x18\x01 \x02(\x02\x12\t\n\x01y\x18\x02 \x02(\x02\x12\t\n\x01z\x18\x03 \x02(\x02\x12\x11\n\ttimestamp\x18\x04 \x02(\r\"@\n\nGyroSample\x12\t\n\x01x\x18\x01 \x02(\x02\x12\t\n\x01y\x18\x02 \x02(\x02\x12\t\n\x01z\x18\x03 \x02(\x02\x12\x11\n\ttimestamp\x18\x04 \x02(\r\"?\n\tMagSample\x12\t\n\x01x\x18\x01 \x02(\x02\x12\t\n\x01y\x18\x02 \x02(\x02\x12\t\n\x01z\x18\x03 \x02(\x02\x12\x11\n\ttimestamp\x18\x04 \x02(\r\"n\n\x08ImuFrame\x12\x11\n\ttimestamp\x18\x01 \x02(\r\x12\x1b\n\x05\x61\x63\x63\x65l\x18\x02 \x02(\x0b\x32\x0c.AccelSample\x12\x19\n\x04gyro\x18\x03 \x02(\x0b\x32\x0b.GyroSample\x12\x17\n\x03mag\x18\x04 \x02(\x0b\x32\n.MagSample\"*\n\rImuFrameBatch\x12\x19\n\x06\x66rames\x18\x01 \x03(\x0b\x32\t.ImuFrame'
 )
 
 
@@ -183,9 +183,100 @@ _MAGSAMPLE = _descriptor.Descriptor(
   serialized_end=210,
 )
 
+
+_IMUFRAME = _descriptor.Descriptor(
+  name='ImuFrame',
+  full_name='ImuFrame',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  create_key=_descriptor._internal_create_key,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='timestamp', full_name='ImuFrame.timestamp', index=0,
+      number=1, type=13, cpp_type=3, label=2,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='accel', full_name='ImuFrame.accel', index=1,
+      number=2, type=11, cpp_type=10, label=2,
+      has_default_value=False, default_value=None,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='gyro', full_name='ImuFrame.gyro', index=2,
+      number=3, type=11, cpp_type=10, label=2,
+      has_default_value=False, default_value=None,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='mag', full_name='ImuFrame.mag', index=3,
+      number=4, type=11, cpp_type=10, label=2,
+      has_default_value=False, default_value=None,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto2',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=212,
+  serialized_end=322,
+)
+
+
+_IMUFRAMEBATCH = _descriptor.Descriptor(
+  name='ImuFrameBatch',
+  full_name='ImuFrameBatch',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  create_key=_descriptor._internal_create_key,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='frames', full_name='ImuFrameBatch.frames', index=0,
+      number=1, type=11, cpp_type=10, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto2',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=324,
+  serialized_end=366,
+)
+
+_IMUFRAME.fields_by_name['accel'].message_type = _ACCELSAMPLE
+_IMUFRAME.fields_by_name['gyro'].message_type = _GYROSAMPLE
+_IMUFRAME.fields_by_name['mag'].message_type = _MAGSAMPLE
+_IMUFRAMEBATCH.fields_by_name['frames'].message_type = _IMUFRAME
 DESCRIPTOR.message_types_by_name['AccelSample'] = _ACCELSAMPLE
 DESCRIPTOR.message_types_by_name['GyroSample'] = _GYROSAMPLE
 DESCRIPTOR.message_types_by_name['MagSample'] = _MAGSAMPLE
+DESCRIPTOR.message_types_by_name['ImuFrame'] = _IMUFRAME
+DESCRIPTOR.message_types_by_name['ImuFrameBatch'] = _IMUFRAMEBATCH
 _sym_db.RegisterFileDescriptor(DESCRIPTOR)
 
 AccelSample = _reflection.GeneratedProtocolMessageType('AccelSample', (_message.Message,), {
@@ -209,5 +300,19 @@ MagSample = _reflection.GeneratedProtocolMessageType('MagSample', (_message.Mess
   })
 _sym_db.RegisterMessage(MagSample)
 
+ImuFrame = _reflection.GeneratedProtocolMessageType('ImuFrame', (_message.Message,), {
+  'DESCRIPTOR' : _IMUFRAME,
+  '__module__' : 'ahrs_pb2'
+  # @@protoc_insertion_point(class_scope:ImuFrame)
+  })
+_sym_db.RegisterMessage(ImuFrame)
+
+ImuFrameBatch = _reflection.GeneratedProtocolMessageType('ImuFrameBatch', (_message.Message,), {
+  'DESCRIPTOR' : _IMUFRAMEBATCH,
+  '__module__' : 'ahrs_pb2'
+  # @@protoc_insertion_point(class_scope:ImuFrameBatch)
+  })
+_sym_db.RegisterMessage(ImuFrameBatch)
+
 
 # @@protoc_insertion_point(module_scope)
@@ -9,4 +9,13 @@
 PB_BIND(HeartBeat, HeartBeat, AUTO)
 
 
+PB_BIND(SimTick, SimTick, AUTO)
+
+
+PB_BIND(TickAck, TickAck, AUTO)
+
+
+PB_BIND(MotorCommand, MotorCommand, AUTO)
+
+
 
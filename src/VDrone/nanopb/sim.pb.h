@@ -14,6 +14,23 @@ typedef struct _HeartBeat {
     uint32_t timestamp; 
 } HeartBeat;
 
+typedef struct _MotorCommand { 
+    uint32_t timestamp; 
+    pb_size_t speed_count; 
+    float speed[4]; 
+} MotorCommand;
+
+typedef struct _SimTick { 
+    uint32_t tick; 
+    uint32_t timestamp; 
+} SimTick;
+
+typedef struct _TickAck { 
+    uint32_t tick; 
+    pb_size_t motor_command_count; 
+    float motor_command[4]; 
+} TickAck;
+
 
 #ifdef __cplusplus
 extern "C" {
@@ -21,10 +38,22 @@ extern "C" {
 
 /* Initializer values for message structs */
 #define HeartBeat_init_default                   {0}
+#define SimTick_init_default                     {0, 0}
+#define TickAck_init_default                     {0, 0, {0, 0, 0, 0}}
+#define MotorCommand_init_default                {0, 0, {0, 0, 0, 0}}
 #define HeartBeat_init_zero                      {0}
+#define SimTick_init_zero                        {0, 0}
+#define TickAck_init_zero                        {0, 0, {0, 0, 0, 0}}
+#define MotorCommand_init_zero                   {0, 0, {0, 0, 0, 0}}
 
 /* Field tags (for use in manual encoding/decoding) */
 #define HeartBeat_timestamp_tag                  1
+#define MotorCommand_timestamp_tag               1
+#define MotorCommand_speed_tag                   2
+#define SimTick_tick_tag                         1
+#define SimTick_timestamp_tag                    2
+#define TickAck_tick_tag                         1
+#define TickAck_motor_command_tag                2
 
 /* Struct field encoding specification for nanopb */
 #define HeartBeat_FIELDLIST(X, a) \
@@ -32,13 +61,40 @@ X(a, STATIC,   REQUIRED, UINT32,   timestamp,         1)
 #define HeartBeat_CALLBACK NULL
 #define HeartBeat_DEFAULT NULL
 
+#define SimTick_FIELDLIST(X, a) \
+X(a, STATIC,   REQUIRED, UINT32,   tick,              1) \
+X(a, STATIC,   REQUIRED, UINT32,   timestamp,         2)
+#define SimTick_CALLBACK NULL
+#define SimTick_DEFAULT NULL
+
+#define TickAck_FIELDLIST(X, a) \
+X(a, STATIC,   REQUIRED, UINT32,   tick,              1) \
+X(a, STATIC,   REPEATED, FLOAT,    motor_command,     2)
+#define TickAck_CALLBACK NULL
+#define TickAck_DEFAULT NULL
+
+#define MotorCommand_FIELDLIST(X, a) \
+X(a, STATIC,   REQUIRED, UINT32,   timestamp,         1) \
+X(a, STATIC,   REPEATED, FLOAT,    speed,             2)
+#define MotorCommand_CALLBACK NULL
+#define MotorCommand_DEFAULT NULL
+
 extern const pb_msgdesc_t HeartBeat_msg;
+extern const pb_msgdesc_t SimTick_msg;
+extern const pb_msgdesc_t TickAck_msg;
+extern const pb_msgdesc_t MotorCommand_msg;
 
 /* Defines for backwards compatibility with code written before nanopb-0.4.0 */
 #define HeartBeat_fields &HeartBeat_msg
+#define SimTick_fields &SimTick_msg
+#define TickAck_fields &TickAck_msg
+#define MotorCommand_fields &MotorCommand_msg
 
 /* Maximum encoded size of messages (where known) */
 #define HeartBeat_size                           6
+#define MotorCommand_size                        26
+#define SimTick_size                             12
+#define TickAck_size                             26
 
 #ifdef __cplusplus
 } /* extern "C" */
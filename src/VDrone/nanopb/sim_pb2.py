@@ -19,7 +19,7 @@ DESCRIPTOR = _descriptor.FileDescriptor(
   syntax='proto2',
   serialized_options=None,
   create_key=_descriptor._internal_create_key,
-  serialized_pb=b'\n\tsim.proto\"\x1e\n\tHeartBeat\x12\x11\n\ttimestamp\x18\x01 \x02(\r'
+  serialized_pb=b'\n\tsim.proto\"\x1e\n\tHeartBeat\x12\x11\n\ttimestamp\x18\x01 \x02(\r\"*\n\x07SimTick\x12\x0c\n\x04tick\x18\x01 \x02(\r\x12\x11\n\ttimestamp\x18\x02 \x02(\r\".\n\x07TickAck\x12\x0c\n\x04tick\x18\x01 \x02(\r\x12\x15\n\rmotor_command\x18\x02 \x03(\x02\"0\n\x0cMotorCommand\x12\x11\n\ttimestamp\x18\x01 \x02(\r\x12\r\n\x05speed\x18\x02 \x03(\x02'
 )
 
 
@@ -56,7 +56,127 @@ _HEARTBEAT = _descriptor.Descriptor(
   serialized_end=43,
 )
 
+
+_SIMTICK = _descriptor.Descriptor(
+  name='SimTick',
+  full_name='SimTick',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  create_key=_descriptor._internal_create_key,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='tick', full_name='SimTick.tick', index=0,
+      number=1, type=13, cpp_type=3, label=2,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='timestamp', full_name='SimTick.timestamp', index=1,
+      number=2, type=13, cpp_type=3, label=2,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto2',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=45,
+  serialized_end=87,
+)
+
+
+_TICKACK = _descriptor.Descriptor(
+  name='TickAck',
+  full_name='TickAck',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  create_key=_descriptor._internal_create_key,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='tick', full_name='TickAck.tick', index=0,
+      number=1, type=13, cpp_type=3, label=2,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='motor_command', full_name='TickAck.motor_command', index=1,
+      number=2, type=2, cpp_type=6, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto2',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=89,
+  serialized_end=135,
+)
+
+
+_MOTORCOMMAND = _descriptor.Descriptor(
+  name='MotorCommand',
+  full_name='MotorCommand',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  create_key=_descriptor._internal_create_key,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='timestamp', full_name='MotorCommand.timestamp', index=0,
+      number=1, type=13, cpp_type=3, label=2,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='speed', full_name='MotorCommand.speed', index=1,
+      number=2, type=2, cpp_type=6, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto2',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=137,
+  serialized_end=185,
+)
+
 DESCRIPTOR.message_types_by_name['HeartBeat'] = _HEARTBEAT
+DESCRIPTOR.message_types_by_name['SimTick'] = _SIMTICK
+DESCRIPTOR.message_types_by_name['TickAck'] = _TICKACK
+DESCRIPTOR.message_types_by_name['MotorCommand'] = _MOTORCOMMAND
 _sym_db.RegisterFileDescriptor(DESCRIPTOR)
 
 HeartBeat = _reflection.GeneratedProtocolMessageType('HeartBeat', (_message.Message,), {
@@ -66,5 +186,26 @@ HeartBeat = _reflection.GeneratedProtocolMessageType('HeartBeat', (_message.Mess
   })
 _sym_db.RegisterMessage(HeartBeat)
 
+SimTick = _reflection.GeneratedProtocolMessageType('SimTick', (_message.Message,), {
+  'DESCRIPTOR' : _SIMTICK,
+  '__module__' : 'sim_pb2'
+  # @@protoc_insertion_point(class_scope:SimTick)
+  })
+_sym_db.RegisterMessage(SimTick)
+
+TickAck = _reflection.GeneratedProtocolMessageType('TickAck', (_message.Message,), {
+  'DESCRIPTOR' : _TICKACK,
+  '__module__' : 'sim_pb2'
+  # @@protoc_insertion_point(class_scope:TickAck)
+  })
+_sym_db.RegisterMessage(TickAck)
+
+MotorCommand = _reflection.GeneratedProtocolMessageType('MotorCommand', (_message.Message,), {
+  'DESCRIPTOR' : _MOTORCOMMAND,
+  '__module__' : 'sim_pb2'
+  # @@protoc_insertion_point(class_scope:MotorCommand)
+  })
+_sym_db.RegisterMessage(MotorCommand)
+
 
 # @@protoc_insertion_point(module_scope)
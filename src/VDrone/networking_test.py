@@ -13,29 +13,25 @@ import signal
 import numpy as np
 from loguru import logger
 from pathlib import Path
-from threading import Event
 from VDrone.connection import SimConnection
 from VDrone.parameters import *
 from VDrone.database import *
-
-main_loop_kill = Event()
-
-
-def sig_int_handler(signum, frame):
-    main_loop_kill.set()
+from VDrone.scheduler import RunMode, SimScheduler
 
 
 def main() -> None:
+    scheduler = SimScheduler(base_tick=0.010, mode=RunMode.REAL_TIME)
+
     # Register the system teardown functionality
-    main_loop_kill.clear()
-    signal.signal(signal.SIGINT, sig_int_handler)
+    signal.signal(signal.SIGINT, lambda signum, frame: scheduler.stop())
 
     db = ParameterDatabase()
     db.create(entry=Entry(param_id=ParameterID.GYRO_DATA, param_data=GyroData(timeout=0.5)))
     db.set(param_id=ParameterID.GYRO_DATA, new_value=np.zeros((3, 1)))
 
-    db.create(entry=Entry(param_id=ParameterID.HEARTBEAT, param_data=HeartBeatData()))
-    db.set(param_id=ParameterID.HEARTBEAT, new_value=time.time())
+    heartbeat = HeartBeatData()
+    db.create(entry=Entry(param_id=ParameterID.HEARTBEAT, param_data=heartbeat))
+    db.set(param_id=ParameterID.HEARTBEAT, new_value=int(heartbeat.clock.now() * 1000.0))
 
     gyro_data = db.get_param(param_id=ParameterID.GYRO_DATA)
     hb_data = db.get_param(param_id=ParameterID.HEARTBEAT)
@@ -44,10 +40,9 @@ def main() -> None:
     conn.start()
     conn.connect(timeout=5.0)
 
-    while not main_loop_kill.is_set():
-        #conn.transmit(gyro_data)
-        conn.transmit(hb_data)
-        time.sleep(0.250)
+    #scheduler.add_task("gyro", period=0.010, callback=lambda t, dt: conn.transmit(gyro_data))
+    scheduler.add_task("heartbeat", period=0.250, callback=lambda t, dt: conn.transmit(hb_data))
+    scheduler.run()
 
     conn.kill()
     conn.join()
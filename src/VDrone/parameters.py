@@ -9,15 +9,54 @@
 # **********************************************************************************************************************
 
 import copy
-import time
+import importlib
+import math
+import struct
 import numpy as np
 from abc import ABCMeta, abstractmethod
-from typing import Any
+from collections import deque
+from typing import Any, Callable, Tuple, Union
 from threading import RLock
 from enum import Enum, auto
-from VDrone.nanopb.sim_pb2 import HeartBeat
-from VDrone.nanopb.ahrs_pb2 import GyroSample, AccelSample, MagSample
-from google.protobuf.message import DecodeError
+from VDrone.clock import IClock, TimeoutService, default_clock
+
+# Where each protobuf name used by this module lives. Building the generated descriptor pools is
+# a large share of import time, so the modules are only imported once a message is needed.
+_PROTOBUF_NAMES = {
+    "HeartBeat": "VDrone.nanopb.sim_pb2",
+    "SimTick": "VDrone.nanopb.sim_pb2",
+    "TickAck": "VDrone.nanopb.sim_pb2",
+    "MotorCommand": "VDrone.nanopb.sim_pb2",
+    "StickInputs": "VDrone.nanopb.controller_pb2",
+    "GyroSample": "VDrone.nanopb.ahrs_pb2",
+    "AccelSample": "VDrone.nanopb.ahrs_pb2",
+    "MagSample": "VDrone.nanopb.ahrs_pb2",
+    "ImuFrame": "VDrone.nanopb.ahrs_pb2",
+    "ImuFrameBatch": "VDrone.nanopb.ahrs_pb2",
+    "DecodeError": "google.protobuf.message"
+}
+
+
+class _LazyProtobuf:
+    """ Namespace that imports protobuf names on first access, then caches them as attributes """
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in _PROTOBUF_NAMES:
+            raise AttributeError(name)
+
+        value = getattr(importlib.import_module(_PROTOBUF_NAMES[name]), name)
+        setattr(self, name, value)
+        return value
+
+
+_pb = _LazyProtobuf()
+
+
+def __getattr__(name: str) -> Any:
+    """ Keeps "from VDrone.parameters import HeartBeat" and friends working without eager imports """
+    if name in _PROTOBUF_NAMES:
+        return getattr(_pb, name)
+    raise AttributeError("module {} has no attribute {}".format(__name__, name))
 
 
 class ParameterID(Enum):
@@ -26,16 +65,86 @@ class ParameterID(Enum):
 
     # Simulator Internals
     HEARTBEAT = auto()
+    SIM_TICK = auto()
+    TICK_ACK = auto()
 
     # Sensor measurements
     ACCEL_DATA = auto()
     GYRO_DATA = auto()
     MAG_DATA = auto()
 
+    # Combined sensor messages
+    IMU_FRAME = auto()
+    IMU_FRAME_BATCH = auto()
+
+    # Control inputs
+    STICK_INPUTS = auto()
+    MOTOR_COMMAND = auto()
+
+
+# Types whose instances can't be modified, so they can be shared with readers as-is
+_IMMUTABLE_TYPES = (type(None), bool, int, float, complex, str, bytes, tuple, frozenset, Enum)
+
+
+def freeze(value: Any) -> Any:
+    """
+    Produces a copy of a value that is safe to hand out to any number of readers. NumPy
+    arrays are copied once and marked read-only, immutable values are shared directly, and
+    everything else falls back to a deep copy.
+    Args:
+        value: Data to freeze
+
+    Returns:
+        Read-only equivalent of the value
+    """
+    if isinstance(value, np.ndarray):
+        frozen = np.array(value, copy=True)
+        frozen.setflags(write=False)
+        return frozen
+    elif isinstance(value, _IMMUTABLE_TYPES):
+        return value
+    else:
+        return copy.deepcopy(value)
+
+
+def _timestamp_ms(t: float) -> int:
+    """ Converts a time in seconds into the uint32 millisecond timestamp used on the wire """
+    return int(t * 1000.0) & 0xFFFFFFFF
+
+
+class Codec(Enum):
+    """ Wire formats a parameter can be encoded with """
+    PROTOBUF = "protobuf"  # Generated protobuf messages. Always available.
+    RAW = "raw"  # Packed little-endian copy of the nanopb C struct
+
+
+# Packed layouts of the nanopb C structs in ahrs.pb.h. Every member is 4 bytes wide, so the
+# structs contain no padding and the layouts below are byte-for-byte identical to them.
+_RAW_VECTOR3 = struct.Struct("<fffI")
+_RAW_IMU_FRAME = struct.Struct("<I" + "fffI" * 3)
+
+# Control input structs from controller.pb.h and sim.pb.h. The motor command's uint16 speed
+# count (pb_size_t) is padded out to the 4 byte alignment of the speed array.
+_RAW_STICK_INPUTS = struct.Struct("<ffff")
+_RAW_MOTOR_COMMAND = struct.Struct("<IH2x4f")
+
+# The batch holds a uint16 frame count (pb_size_t) ahead of its fixed array of frames, which
+# the C compiler pads out to the 4 byte alignment of the frames.
+_RAW_SAMPLE = np.dtype([('xyz', '<f4', (3,)), ('timestamp', '<u4')])
+_RAW_IMU_FRAME_DTYPE = np.dtype([('timestamp', '<u4'), ('samples', _RAW_SAMPLE, (3,))])
+_RAW_IMU_BATCH = np.dtype([('frames_count', '<u2'), ('padding', 'V2'), ('frames', _RAW_IMU_FRAME_DTYPE, (16,))])
+
+# Largest packed struct of any parameter. Buffers this size fit the output of any serialize_raw_into().
+RAW_MAX_SIZE = max(_RAW_VECTOR3.size, _RAW_IMU_FRAME.size, _RAW_STICK_INPUTS.size, _RAW_MOTOR_COMMAND.size,
+                   _RAW_IMU_BATCH.itemsize)
+
 
 class IParameter:
     __metaclass__ = ABCMeta
 
+    # Codecs this parameter knows how to encode with, beyond the protobuf default
+    SUPPORTED_CODECS = (Codec.PROTOBUF,)
+
     def __init__(self, param_type: Any):
         """
         Initialize the parameter interface
@@ -45,6 +154,10 @@ class IParameter:
         self._param_type = param_type
         self._param_data = None
 
+        # Immutable (version, data) pair published on every write. Readers grab the whole tuple
+        # in a single attribute load, so they never need a lock and never see a torn update.
+        self._snapshot = (0, None)  # type: Tuple[int, Any]
+
     def update(self, new_value: Any) -> bool:
         """
         Updates the old parameter data with the new value
@@ -56,11 +169,39 @@ class IParameter:
             False: Update was not successful
         """
         if isinstance(new_value, self._param_type):
-            self._param_data = copy.deepcopy(new_value)
+            self._param_data = freeze(new_value)
+            self._publish(frozen=self._param_data)
             return True
         else:
             return False
 
+    def view(self) -> Any:
+        """
+        Gets the most recently published value without copying or locking. NumPy data is
+        returned as a read-only array, so use value() if a modifiable copy is needed.
+        Returns:
+            Read-only view of the stored data
+        """
+        return self._snapshot[1]
+
+    def versioned_view(self) -> Tuple[int, Any]:
+        """
+        Gets the most recently published value along with its version number. The version
+        increments on every successful write.
+        Returns:
+            Tuple of (version, read-only data)
+        """
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        """
+        How many times the parameter has been published
+        Returns:
+            int
+        """
+        return self._snapshot[0]
+
     def value(self) -> Any:
         """
         Gets the current stored value and returns it as a copy. This prevents unwanted
@@ -90,6 +231,83 @@ class IParameter:
         """
         return False
 
+    def serialize_raw(self) -> bytes:
+        """
+        Serializes the parameter data using the packed layout of its nanopb C struct
+        Returns:
+            bytes
+        """
+        return b""
+
+    def serialize_raw_into(self, buffer: bytearray) -> int:
+        """
+        Same as serialize_raw(), but packs the data into the front of a caller owned buffer
+        Args:
+            buffer: Destination, at least RAW_MAX_SIZE bytes long
+
+        Returns:
+            Number of bytes written
+        """
+        data = self.serialize_raw()
+        buffer[:len(data)] = data
+        return len(data)
+
+    def deserialize_raw(self, data: Union[bytes, memoryview]) -> bool:
+        """
+        Converts data in the packed nanopb C struct layout into the format used in the simulator
+        Args:
+            data: Packed struct data
+
+        Returns:
+            True: The conversion was successful
+            False: The conversion was not successful
+        """
+        return False
+
+    def encode(self, codec: Codec = Codec.PROTOBUF) -> bytes:
+        """
+        Serializes the parameter with the requested codec. Parameters that don't support the
+        codec fall back to protobuf, which both ends of a socket resolve the same way.
+        Args:
+            codec: Wire format negotiated for the socket the data travels on
+
+        Returns:
+            bytes
+        """
+        if codec is Codec.RAW and codec in self.SUPPORTED_CODECS:
+            return self.serialize_raw()
+        return self.serialize()
+
+    def encode_into(self, buffer: bytearray, codec: Codec = Codec.PROTOBUF) -> Union[bytes, memoryview]:
+        """
+        Same as encode(), but RAW data is packed into a reusable buffer instead of a new bytes
+        object. Protobuf encoding still allocates.
+        Args:
+            buffer: Destination for RAW data, at least RAW_MAX_SIZE bytes long
+            codec: Wire format negotiated for the socket the data travels on
+
+        Returns:
+            The encoded data. RAW data is a view of the buffer, only valid until it is reused.
+        """
+        if codec is Codec.RAW and codec in self.SUPPORTED_CODECS:
+            return memoryview(buffer)[:self.serialize_raw_into(buffer)]
+        return self.serialize()
+
+    def decode(self, data: Union[bytes, memoryview], codec: Codec = Codec.PROTOBUF) -> bool:
+        """
+        Deserializes data that was produced by encode() with the same codec
+        Args:
+            data: Serialized data
+            codec: Wire format negotiated for the socket the data arrived on
+
+        Returns:
+            True: The conversion was successful
+            False: The conversion was not successful
+        """
+        if codec is Codec.RAW and codec in self.SUPPORTED_CODECS:
+            return self.deserialize_raw(data)
+        return self.deserialize(data)
+
     @abstractmethod
     def is_valid(self) -> bool:
         """
@@ -114,6 +332,38 @@ class IParameter:
     def param_type(self):
         return self._param_type
 
+    @property
+    def deadline(self) -> float:
+        """
+        Time at which the parameter stops being valid on its own, in the time base of the
+        parameter's clock. Parameters that never expire return infinity.
+        Returns:
+            float
+        """
+        return math.inf
+
+    @property
+    def timeout_managed(self) -> bool:
+        """
+        Whether a TimeoutService pushes expiry to this parameter, making is_valid() a flag read
+        Returns:
+            bool
+        """
+        return False
+
+    def _publish(self, frozen: Any = None) -> None:
+        """
+        Atomically replaces the reader snapshot with the current parameter data
+        Args:
+            frozen: Already frozen copy of the data, if the caller has one
+
+        Returns:
+            None
+        """
+        if frozen is None:
+            frozen = freeze(self._param_data)
+        self._snapshot = (self._snapshot[0] + 1, frozen)
+
 
 class DefaultParameter(IParameter):
     """ Most basic parameter type that is always valid once assigned """
@@ -129,6 +379,7 @@ class DefaultParameter(IParameter):
 
         # Default construct the data from the type if user didn't pass anything in
         self._param_data = initial_value if initial_value else param_type()
+        self._publish()
 
     def is_valid(self) -> bool:
         """
@@ -143,20 +394,55 @@ class DefaultParameter(IParameter):
 class TimedParameter(IParameter):
     """ A parameter type whose validity depends on a timeout"""
 
-    def __init__(self, param_type, initial_value: Any = None, timeout: float or int = 1.0):
+    def __init__(self, param_type, initial_value: Any = None, timeout: float or int = 1.0, clock: IClock = None):
         """
         Initialize the timed parameter object
         Args:
             param_type: Type of the tracked parameter
             initial_value: Initial value of the tracked parameter
             timeout: How frequently the parameter must be update before being considered stale
+            clock: Time source for the timeout. Defaults to the process wide monotonic clock.
         """
         super().__init__(param_type)
+        self._clock = clock if clock else default_clock()
         self._param_timeout = timeout
-        self._last_update = time.time()
+        self._last_update = self._clock.now()
+
+        # Timeout service state. While attached, expiry is pushed to the parameter instead of
+        # being computed on every validity check.
+        self._timeout_service = None  # type: Union[TimeoutService, None]
+        self._timeout_watched = False
+        self._expired = False
+
+        # Called with this parameter each time it expires
+        self.timeout_hook = None  # type: Callable[[TimedParameter], None]
 
         # Default construct the data from the type if user didn't pass anything in
         self._param_data = initial_value if initial_value is not None else param_type()
+        self._publish()
+
+    def __deepcopy__(self, memo: dict) -> 'TimedParameter':
+        """
+        Copies the parameter data while sharing the clock, so the copy keeps aging along with the
+        original. The copy is detached from any timeout service and timeout hook, and checks its
+        own deadline against the clock instead.
+        Args:
+            memo: Objects already copied, as passed by copy.deepcopy()
+
+        Returns:
+            The copy
+        """
+        result = self.__class__.__new__(self.__class__)
+        memo[id(self)] = result
+        memo[id(self._clock)] = self._clock
+
+        detached = {'_timeout_service': None, '_timeout_watched': False, '_expired': False, 'timeout_hook': None}
+        for key, value in self.__dict__.items():
+            if key in detached:
+                setattr(result, key, detached[key])
+            else:
+                setattr(result, key, copy.deepcopy(value, memo))
+        return result
 
     def update(self, new_value) -> bool:
         """
@@ -170,8 +456,15 @@ class TimedParameter(IParameter):
             False: Update was not successful
         """
         if isinstance(new_value, self._param_type):
-            self._param_data = new_value
-            self._last_update = time.time()
+            self._param_data = freeze(new_value)
+            self._last_update = self._clock.now()
+            self._publish(frozen=self._param_data)
+
+            if self._timeout_service is not None:
+                self._expired = False
+                if not self._timeout_watched:
+                    self._timeout_watched = True
+                    self._timeout_service.watch(self)
             return True
         else:
             return False
@@ -183,23 +476,88 @@ class TimedParameter(IParameter):
             True: Data has been consistently updated
             False: Data has not been updated within the timeout window
         """
-        return (time.time() - self._last_update) < self._param_timeout
+        if self._timeout_service is not None:
+            return not self._expired
+        return (self._clock.now() - self._last_update) < self._param_timeout
+
+    @property
+    def deadline(self) -> float:
+        return self._last_update + self._param_timeout
+
+    @property
+    def timeout_managed(self) -> bool:
+        return self._timeout_service is not None
+
+    @property
+    def clock(self) -> IClock:
+        return self._clock
+
+    def attach_timeout_service(self, service: TimeoutService) -> None:
+        """
+        Hands timeout tracking over to a service sharing this parameter's clock
+        Args:
+            service: Service that will expire the parameter
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: The service runs on a different clock than the parameter
+        """
+        if service.clock is not self._clock:
+            raise ValueError("Timeout service clock {} does not match the parameter clock {}".format(
+                type(service.clock).__name__, type(self._clock).__name__))
+
+        self._timeout_service = service
+        self._expired = self._clock.now() >= self.deadline
+        if not self._expired:
+            self._timeout_watched = True
+            service.watch(self)
+
+    def _expire(self, now: float) -> bool:
+        """
+        Called by the timeout service once the deadline has passed
+        Args:
+            now: Clock time the service is expiring at
+
+        Returns:
+            True: The parameter expired and its timeout hook ran
+            False: The parameter was updated in the meantime and remains valid
+        """
+        if self._expired:
+            return False
+
+        self._timeout_watched = False
+        self._expired = True
+
+        # An update racing with expiry either sees the watch flag cleared and re-arms itself,
+        # or moved the deadline before this check, in which case the expiry is undone here.
+        if self.deadline > now:
+            self._expired = False
+            if not self._timeout_watched:
+                self._timeout_watched = True
+                self._timeout_service.watch(self)
+            return False
+
+        if self.timeout_hook is not None:
+            self.timeout_hook(self)
+        return True
 
 
 class HeartBeatData(TimedParameter):
     """ Stores a virtual heart beat signal that indicates the sim is alive """
 
-    def __init__(self, timeout: float or int = 1.0):
-        super().__init__(param_type=int, initial_value=0, timeout=timeout)
-        self._protobuf_data = HeartBeat()
+    def __init__(self, timeout: float or int = 1.0, clock: IClock = None):
+        super().__init__(param_type=int, initial_value=0, timeout=timeout, clock=clock)
+        self._protobuf_data = _pb.HeartBeat()
 
     @property
     def id(self):
         return ParameterID.HEARTBEAT
 
     def serialize(self) -> str:
-        self.update(new_value=time.time())
-        self._protobuf_data.timestamp = self.value()
+        self.update(new_value=_timestamp_ms(self._clock.now()))
+        self._protobuf_data.timestamp = self._param_data
         return self._protobuf_data.SerializeToString()
 
     def deserialize(self, data: str) -> bool:
@@ -214,37 +572,303 @@ class HeartBeatData(TimedParameter):
         """
         try:
             parsed_bytes = self._protobuf_data.ParseFromString(data)
-        except DecodeError:
+        except _pb.DecodeError:
             return False
 
-        return self.update(new_value=self._protobuf_data.data.timestamp)
+        return self.update(new_value=self._protobuf_data.timestamp)
 
 
-class GyroData(TimedParameter):
-    """ Stores gyroscope data with a validity timeout """
+class SimTickData(TimedParameter):
+    """ Marks the end of a simulation tick. Published after all of the tick's sensor data. """
+
+    def __init__(self, timeout: float or int = 1.0, clock: IClock = None):
+        super().__init__(param_type=int, initial_value=0, timeout=timeout, clock=clock)
+        self._protobuf_data = _pb.SimTick()
+
+    @property
+    def id(self):
+        return ParameterID.SIM_TICK
+
+    def serialize(self) -> bytes:
+        self._protobuf_data.tick = self._param_data
+        self._protobuf_data.timestamp = _timestamp_ms(self._last_update)
+        return self._protobuf_data.SerializeToString()
+
+    def deserialize(self, data: Union[bytes, memoryview]) -> bool:
+        """
+        Converts the protobuf tick marker into the tick number
+        Args:
+            data: Serialized protobuf data
+
+        Returns:
+            True: The conversion was successful
+            False: The conversion was not successful
+        """
+        try:
+            self._protobuf_data.ParseFromString(data)
+        except _pb.DecodeError:
+            return False
+
+        return self.update(new_value=self._protobuf_data.tick)
+
+
+class TickAckData(TimedParameter):
+    """
+    Flight software acknowledgment that it has processed a simulation tick. Stored as a
+    (tick, motor_command) tuple, where the motor command is empty if the controller didn't
+    send one for the tick.
+    """
+
+    def __init__(self, timeout: float or int = 1.0, clock: IClock = None):
+        super().__init__(param_type=tuple, initial_value=(0, ()), timeout=timeout, clock=clock)
+        self._protobuf_data = _pb.TickAck()
+
+    @property
+    def id(self):
+        return ParameterID.TICK_ACK
+
+    @property
+    def tick(self) -> int:
+        return self._param_data[0]
+
+    @property
+    def motor_command(self) -> tuple:
+        return self._param_data[1]
+
+    def serialize(self) -> bytes:
+        tick, motor_command = self._param_data
+        self._protobuf_data.tick = tick
+        self._protobuf_data.motor_command[:] = motor_command
+        return self._protobuf_data.SerializeToString()
+
+    def deserialize(self, data: Union[bytes, memoryview]) -> bool:
+        """
+        Converts the protobuf acknowledgment into the format used in the simulator
+        Args:
+            data: Serialized protobuf data
+
+        Returns:
+            True: The conversion was successful
+            False: The conversion was not successful
+        """
+        try:
+            self._protobuf_data.ParseFromString(data)
+        except _pb.DecodeError:
+            return False
+
+        return self.update(new_value=(self._protobuf_data.tick, tuple(self._protobuf_data.motor_command)))
+
+
+class Vector3Parameter(TimedParameter):
+    """ Common storage and protobuf translation for three axis sensor data """
 
     KEY_X = 0
     KEY_Y = 1
     KEY_Z = 2
 
-    def __init__(self, timeout: float or int = 1.0):
-        super().__init__(param_type=type(np.ndarray((3, 1))), initial_value=np.zeros((3, 1)), timeout=timeout)
-        self._protobuf_data = GyroSample()
+    SUPPORTED_CODECS = (Codec.PROTOBUF, Codec.RAW)
+
+    def __init__(self, protobuf_type: Any, timeout: float or int = 1.0, clock: IClock = None):
+        """
+        Initialize the sensor parameter
+        Args:
+            protobuf_type: Generated protobuf message with x, y, z and timestamp fields
+            timeout: How frequently the parameter must be update before being considered stale
+            clock: Time source for the timeout and timestamps. Defaults to the default clock.
+        """
+        super().__init__(param_type=np.ndarray, initial_value=np.zeros((3, 1)), timeout=timeout, clock=clock)
+        self._protobuf_data = protobuf_type()
+
+        # Decode target reused for every received message. Safe to overwrite because readers
+        # only ever see the frozen snapshot published by update().
+        self._rx_buffer = np.zeros((3, 1))
+
+    def update(self, new_value) -> bool:
+        """
+        Updates the sensor data. Accepts either a (3, 1) column or a flat (3,) vector.
+        Args:
+            new_value: New data to be set
+
+        Returns:
+            True: Update was successful
+            False: Update was not successful
+        """
+        if isinstance(new_value, np.ndarray) and new_value.size != 3:
+            return False
+        return super().update(new_value=new_value)
+
+    def serialize(self) -> bytes:
+        x, y, z = self._param_data.ravel().tolist()
+        self._protobuf_data.x = x
+        self._protobuf_data.y = y
+        self._protobuf_data.z = z
+        self._protobuf_data.timestamp = _timestamp_ms(self._last_update)
+        return self._protobuf_data.SerializeToString()
+
+    def deserialize(self, data: Union[bytes, memoryview]) -> bool:
+        """
+        Converts the protobuf sensor data into the format used in the simulator. The values
+        are written straight into preallocated storage, so no new array is created.
+        Args:
+            data: Serialized protobuf data. Any bytes-like object, including a memoryview of
+                  a received ZMQ frame, is accepted.
+
+        Returns:
+            True: The conversion was successful
+            False: The conversion was not successful
+        """
+        try:
+            self._protobuf_data.ParseFromString(data)
+        except _pb.DecodeError:
+            return False
+
+        raw_data = self._rx_buffer
+        raw_data[self.KEY_X, 0] = self._protobuf_data.x
+        raw_data[self.KEY_Y, 0] = self._protobuf_data.y
+        raw_data[self.KEY_Z, 0] = self._protobuf_data.z
+
+        return self.update(new_value=raw_data)
+
+    def serialize_raw(self) -> bytes:
+        x, y, z = self._param_data.ravel().tolist()
+        return _RAW_VECTOR3.pack(x, y, z, _timestamp_ms(self._last_update))
+
+    def serialize_raw_into(self, buffer: bytearray) -> int:
+        x, y, z = self._param_data.ravel().tolist()
+        _RAW_VECTOR3.pack_into(buffer, 0, x, y, z, _timestamp_ms(self._last_update))
+        return _RAW_VECTOR3.size
+
+    def deserialize_raw(self, data: Union[bytes, memoryview]) -> bool:
+        """
+        Converts a packed sensor struct into the format used in the simulator
+        Args:
+            data: Packed struct data
+
+        Returns:
+            True: The conversion was successful
+            False: The conversion was not successful
+        """
+        try:
+            x, y, z, _ = _RAW_VECTOR3.unpack(data)
+        except struct.error:
+            return False
+
+        raw_data = self._rx_buffer
+        raw_data[self.KEY_X, 0] = x
+        raw_data[self.KEY_Y, 0] = y
+        raw_data[self.KEY_Z, 0] = z
+
+        return self.update(new_value=raw_data)
+
+
+class GyroData(Vector3Parameter):
+    """ Stores gyroscope data with a validity timeout """
+
+    def __init__(self, timeout: float or int = 1.0, clock: IClock = None):
+        super().__init__(protobuf_type=_pb.GyroSample, timeout=timeout, clock=clock)
 
     @property
     def id(self):
         return ParameterID.GYRO_DATA
 
-    def serialize(self) -> str:
-        raw_data = self.value()
-        self._protobuf_data.x = raw_data[self.KEY_X]
-        self._protobuf_data.y = raw_data[self.KEY_Y]
-        self._protobuf_data.z = raw_data[self.KEY_Z]
+
+class AccelData(Vector3Parameter):
+    """ Stores accelerometer data with a validity timeout """
+
+    def __init__(self, timeout: float or int = 1.0, clock: IClock = None):
+        super().__init__(protobuf_type=_pb.AccelSample, timeout=timeout, clock=clock)
+
+    @property
+    def id(self):
+        return ParameterID.ACCEL_DATA
+
+
+class MagData(Vector3Parameter):
+    """ Stores magnetometer data with a validity timeout """
+
+    def __init__(self, timeout: float or int = 1.0, clock: IClock = None):
+        super().__init__(protobuf_type=_pb.MagSample, timeout=timeout, clock=clock)
+
+    @property
+    def id(self):
+        return ParameterID.MAG_DATA
+
+
+class ImuFrameData(TimedParameter):
+    """ Stores one tick of accel, gyro and mag data, published together as a single message """
+
+    KEY_ACCEL = 0
+    KEY_GYRO = 1
+    KEY_MAG = 2
+
+    # Which row of the frame each sensor parameter is staged into
+    SENSOR_ROWS = {
+        ParameterID.ACCEL_DATA: KEY_ACCEL,
+        ParameterID.GYRO_DATA: KEY_GYRO,
+        ParameterID.MAG_DATA: KEY_MAG
+    }
+
+    _ALL_STAGED = (1 << KEY_ACCEL) | (1 << KEY_GYRO) | (1 << KEY_MAG)
+
+    SUPPORTED_CODECS = (Codec.PROTOBUF, Codec.RAW)
+
+    def __init__(self, timeout: float or int = 1.0, clock: IClock = None):
+        super().__init__(param_type=np.ndarray, initial_value=np.zeros((3, 3)), timeout=timeout, clock=clock)
+        self._protobuf_data = _pb.ImuFrame()
+        self._rx_buffer = np.zeros((3, 3))
+        self._staged = 0
+
+    @property
+    def id(self):
+        return ParameterID.IMU_FRAME
+
+    def stage(self, sensor: Vector3Parameter) -> bool:
+        """
+        Copies the latest data of one sensor into the frame being assembled for this tick
+        Args:
+            sensor: Accel, gyro or mag parameter
+
+        Returns:
+            True: All three sensors are now staged and the frame has been published
+            False: The frame is still waiting on other sensors
+        """
+        row = self.SENSOR_ROWS.get(sensor.id)
+        if row is None:
+            return False
+
+        self._rx_buffer[row, :] = sensor._param_data.ravel()
+        self._staged |= 1 << row
+        if self._staged != self._ALL_STAGED:
+            return False
+
+        self._staged = 0
+        return self.update(new_value=self._rx_buffer)
+
+    def fill(self, msg: 'ImuFrame') -> None:
+        """
+        Writes the current frame into a protobuf message
+        Args:
+            msg: Message to fill
+
+        Returns:
+            None
+        """
+        data = self._param_data
+        timestamp = _timestamp_ms(self._last_update)
+        msg.timestamp = timestamp
+        for sample, row in ((msg.accel, self.KEY_ACCEL), (msg.gyro, self.KEY_GYRO), (msg.mag, self.KEY_MAG)):
+            sample.x = float(data[row, 0])
+            sample.y = float(data[row, 1])
+            sample.z = float(data[row, 2])
+            sample.timestamp = timestamp
+
+    def serialize(self) -> bytes:
+        self.fill(self._protobuf_data)
         return self._protobuf_data.SerializeToString()
 
-    def deserialize(self, data: str) -> bool:
+    def deserialize(self, data: Union[bytes, memoryview]) -> bool:
         """
-        Converts the protobuf gyro data into the format used in the simulator
+        Converts the protobuf IMU frame into the format used in the simulator
         Args:
             data: Serialized protobuf data
 
@@ -253,43 +877,132 @@ class GyroData(TimedParameter):
             False: The conversion was not successful
         """
         try:
-            parsed_bytes = self._protobuf_data.ParseFromString(data)
-        except DecodeError:
+            self._protobuf_data.ParseFromString(data)
+        except _pb.DecodeError:
             return False
 
-        raw_data = self.param_type()
-        raw_data[self.KEY_X] = self._protobuf_data.x
-        raw_data[self.KEY_Y] = self._protobuf_data.y
-        raw_data[self.KEY_Z] = self._protobuf_data.z
+        raw_data = self._rx_buffer
+        for sample, row in ((self._protobuf_data.accel, self.KEY_ACCEL), (self._protobuf_data.gyro, self.KEY_GYRO),
+                            (self._protobuf_data.mag, self.KEY_MAG)):
+            raw_data[row, 0] = sample.x
+            raw_data[row, 1] = sample.y
+            raw_data[row, 2] = sample.z
 
         return self.update(new_value=raw_data)
 
+    def serialize_raw(self) -> bytes:
+        timestamp = _timestamp_ms(self._last_update)
+        a, g, m = self._param_data.tolist()
+        return _RAW_IMU_FRAME.pack(timestamp, a[0], a[1], a[2], timestamp, g[0], g[1], g[2], timestamp,
+                                   m[0], m[1], m[2], timestamp)
 
-class AccelData(TimedParameter):
-    """ Stores accelerometer data with a validity timeout """
+    def serialize_raw_into(self, buffer: bytearray) -> int:
+        timestamp = _timestamp_ms(self._last_update)
+        a, g, m = self._param_data.tolist()
+        _RAW_IMU_FRAME.pack_into(buffer, 0, timestamp, a[0], a[1], a[2], timestamp, g[0], g[1], g[2], timestamp,
+                                 m[0], m[1], m[2], timestamp)
+        return _RAW_IMU_FRAME.size
 
-    KEY_X = 0
-    KEY_Y = 1
-    KEY_Z = 2
+    def deserialize_raw(self, data: Union[bytes, memoryview]) -> bool:
+        """
+        Converts a packed ImuFrame struct into the format used in the simulator
+        Args:
+            data: Packed struct data
 
-    def __init__(self, timeout: float or int = 1.0):
-        super().__init__(param_type=type(np.ndarray((3, 1))), initial_value=np.zeros((3, 1)), timeout=timeout)
-        self._protobuf_data = AccelSample()
+        Returns:
+            True: The conversion was successful
+            False: The conversion was not successful
+        """
+        try:
+            values = _RAW_IMU_FRAME.unpack(data)
+        except struct.error:
+            return False
+
+        # Each sample is (x, y, z, timestamp) following the frame timestamp
+        raw_data = self._rx_buffer
+        for row in (self.KEY_ACCEL, self.KEY_GYRO, self.KEY_MAG):
+            base = 1 + 4 * row
+            raw_data[row, 0] = values[base]
+            raw_data[row, 1] = values[base + 1]
+            raw_data[row, 2] = values[base + 2]
+
+        return self.update(new_value=raw_data)
+
+
+class ImuFrameBatchData(TimedParameter):
+    """ Accumulates several ticks of IMU frames into one message for high throughput replay """
+
+    # Matches the max_count given to nanopb in ahrs.options
+    MAX_FRAMES = 16
+
+    SUPPORTED_CODECS = (Codec.PROTOBUF, Codec.RAW)
+
+    def __init__(self, batch_size: int = MAX_FRAMES, timeout: float or int = 1.0, clock: IClock = None):
+        """
+        Initialize the batch
+        Args:
+            batch_size: How many frames to accumulate before the batch is ready to send
+            timeout: How frequently the parameter must be update before being considered stale
+            clock: Time source for the timeout and timestamps. Defaults to the default clock.
+        """
+        if not 1 <= batch_size <= self.MAX_FRAMES:
+            raise ValueError("Batch size must be between 1 and {}".format(self.MAX_FRAMES))
+
+        super().__init__(param_type=np.ndarray, initial_value=np.zeros((0, 3, 3)), timeout=timeout, clock=clock)
+        self.batch_size = batch_size
+        self._protobuf_data = _pb.ImuFrameBatch()
+
+        # Pending frames are kept in the packed C layout, so the raw codec sends them as-is
+        self._pending = np.zeros(1, dtype=_RAW_IMU_BATCH)[0]
 
     @property
     def id(self):
-        return ParameterID.ACCEL_DATA
+        return ParameterID.IMU_FRAME_BATCH
 
-    def serialize(self) -> str:
-        raw_data = self.value()
-        self._protobuf_data.data.x = raw_data[self.KEY_X]
-        self._protobuf_data.data.y = raw_data[self.KEY_Y]
-        self._protobuf_data.data.z = raw_data[self.KEY_Z]
+    def __len__(self) -> int:
+        return int(self._pending['frames_count'])
+
+    def append(self, frame: ImuFrameData) -> bool:
+        """
+        Adds a completed frame to the pending batch
+        Args:
+            frame: Frame to add
+
+        Returns:
+            True: The batch is full and ready to send
+            False: The batch has room for more frames
+        """
+        count = int(self._pending['frames_count'])
+        timestamp = _timestamp_ms(frame._last_update)
+        slot = self._pending['frames'][count]
+        slot['timestamp'] = timestamp
+        slot['samples']['xyz'] = frame._param_data
+        slot['samples']['timestamp'] = timestamp
+
+        self._pending['frames_count'] = count + 1
+        return count + 1 >= self.batch_size
+
+    def serialize(self) -> bytes:
+        """
+        Serializes every pending frame and starts a new, empty batch
+        Returns:
+            bytes
+        """
+        frames = self._protobuf_data.frames
+        del frames[:]
+        for slot in self._pending['frames'][:len(self)]:
+            msg = frames.add()
+            msg.timestamp = int(slot['timestamp'])
+            for sample, raw in zip((msg.accel, msg.gyro, msg.mag), slot['samples']):
+                sample.x, sample.y, sample.z = raw['xyz'].tolist()
+                sample.timestamp = int(raw['timestamp'])
+
+        self._pending['frames_count'] = 0
         return self._protobuf_data.SerializeToString()
 
-    def deserialize(self, data: str) -> bool:
+    def deserialize(self, data: Union[bytes, memoryview]) -> bool:
         """
-        Converts the protobuf gyro data into the format used in the simulator
+        Converts a protobuf batch into an (N, 3, 3) array of frames
         Args:
             data: Serialized protobuf data
 
@@ -298,43 +1011,134 @@ class AccelData(TimedParameter):
             False: The conversion was not successful
         """
         try:
-            parsed_bytes = self._protobuf_data.ParseFromString(data)
-        except DecodeError:
+            self._protobuf_data.ParseFromString(data)
+        except _pb.DecodeError:
             return False
 
-        raw_data = self.param_type()
-        raw_data[self.KEY_X] = self._protobuf_data.data.x
-        raw_data[self.KEY_Y] = self._protobuf_data.data.y
-        raw_data[self.KEY_Z] = self._protobuf_data.data.z
+        frames = self._protobuf_data.frames
+        raw_data = np.empty((len(frames), 3, 3))
+        for idx, frame in enumerate(frames):
+            for sample, row in ((frame.accel, ImuFrameData.KEY_ACCEL), (frame.gyro, ImuFrameData.KEY_GYRO),
+                                (frame.mag, ImuFrameData.KEY_MAG)):
+                raw_data[idx, row, 0] = sample.x
+                raw_data[idx, row, 1] = sample.y
+                raw_data[idx, row, 2] = sample.z
 
+        del frames[:]
         return self.update(new_value=raw_data)
 
+    def serialize_raw(self) -> bytes:
+        data = self._pending.tobytes()
+        self._pending['frames_count'] = 0
+        return data
 
-class MagData(TimedParameter):
-    """ Stores magnetometer data with a validity timeout """
+    def serialize_raw_into(self, buffer: bytearray) -> int:
+        np.frombuffer(buffer, dtype=_RAW_IMU_BATCH, count=1)[0] = self._pending
+        self._pending['frames_count'] = 0
+        return _RAW_IMU_BATCH.itemsize
 
-    KEY_X = 0
-    KEY_Y = 1
-    KEY_Z = 2
+    def deserialize_raw(self, data: Union[bytes, memoryview]) -> bool:
+        """
+        Converts a packed ImuFrameBatch struct into an (N, 3, 3) array of frames
+        Args:
+            data: Packed struct data
+
+        Returns:
+            True: The conversion was successful
+            False: The conversion was not successful
+        """
+        if len(data) != _RAW_IMU_BATCH.itemsize:
+            return False
+
+        batch = np.frombuffer(data, dtype=_RAW_IMU_BATCH, count=1)[0]
+        count = int(batch['frames_count'])
+        if count > self.MAX_FRAMES:
+            return False
 
-    def __init__(self, timeout: float or int = 1.0):
-        super().__init__(param_type=type(np.ndarray((3, 1))), initial_value=np.zeros((3, 1)), timeout=timeout)
-        self._protobuf_data = MagSample()
+        return self.update(new_value=batch['frames']['samples']['xyz'][:count].astype(np.float64))
+
+
+class StickInputsData(TimedParameter):
+    """ Pilot stick positions, stored as a (pitch, roll, yaw, throttle) tuple """
+
+    KEY_PITCH = 0
+    KEY_ROLL = 1
+    KEY_YAW = 2
+    KEY_THROTTLE = 3
+
+    SUPPORTED_CODECS = (Codec.PROTOBUF, Codec.RAW)
+
+    def __init__(self, timeout: float or int = 1.0, clock: IClock = None):
+        super().__init__(param_type=tuple, initial_value=(0.0, 0.0, 0.0, 0.0), timeout=timeout, clock=clock)
+        self._protobuf_data = _pb.StickInputs()
 
     @property
     def id(self):
-        return ParameterID.MAG_DATA
+        return ParameterID.STICK_INPUTS
 
-    def serialize(self) -> str:
-        raw_data = self.value()
-        self._protobuf_data.data.x = raw_data[self.KEY_X]
-        self._protobuf_data.data.y = raw_data[self.KEY_Y]
-        self._protobuf_data.data.z = raw_data[self.KEY_Z]
+    def serialize(self) -> bytes:
+        msg = self._protobuf_data
+        msg.pitch, msg.roll, msg.yaw, msg.throttle = self._param_data
+        return msg.SerializeToString()
+
+    def deserialize(self, data: Union[bytes, memoryview]) -> bool:
+        """
+        Converts the protobuf stick inputs into the format used in the simulator
+        Args:
+            data: Serialized protobuf data
+
+        Returns:
+            True: The conversion was successful
+            False: The conversion was not successful
+        """
+        try:
+            self._protobuf_data.ParseFromString(data)
+        except _pb.DecodeError:
+            return False
+
+        msg = self._protobuf_data
+        return self.update(new_value=(msg.pitch, msg.roll, msg.yaw, msg.throttle))
+
+    def serialize_raw(self) -> bytes:
+        return _RAW_STICK_INPUTS.pack(*self._param_data)
+
+    def serialize_raw_into(self, buffer: bytearray) -> int:
+        _RAW_STICK_INPUTS.pack_into(buffer, 0, *self._param_data)
+        return _RAW_STICK_INPUTS.size
+
+    def deserialize_raw(self, data: Union[bytes, memoryview]) -> bool:
+        try:
+            return self.update(new_value=_RAW_STICK_INPUTS.unpack(data))
+        except struct.error:
+            return False
+
+
+class MotorCommandData(TimedParameter):
+    """
+    Speed command for each motor, normalized to [0, 1] of full speed and stored as a tuple in
+    front, right, back, left order
+    """
+
+    MAX_MOTORS = 4
+
+    SUPPORTED_CODECS = (Codec.PROTOBUF, Codec.RAW)
+
+    def __init__(self, timeout: float or int = 1.0, clock: IClock = None):
+        super().__init__(param_type=tuple, initial_value=(0.0,) * self.MAX_MOTORS, timeout=timeout, clock=clock)
+        self._protobuf_data = _pb.MotorCommand()
+
+    @property
+    def id(self):
+        return ParameterID.MOTOR_COMMAND
+
+    def serialize(self) -> bytes:
+        self._protobuf_data.timestamp = _timestamp_ms(self._last_update)
+        self._protobuf_data.speed[:] = self._param_data
         return self._protobuf_data.SerializeToString()
 
-    def deserialize(self, data: str) -> bool:
+    def deserialize(self, data: Union[bytes, memoryview]) -> bool:
         """
-        Converts the protobuf gyro data into the format used in the simulator
+        Converts the protobuf motor command into the format used in the simulator
         Args:
             data: Serialized protobuf data
 
@@ -343,13 +1147,94 @@ class MagData(TimedParameter):
             False: The conversion was not successful
         """
         try:
-            parsed_bytes = self._protobuf_data.ParseFromString(data)
-        except DecodeError:
+            self._protobuf_data.ParseFromString(data)
+        except _pb.DecodeError:
             return False
 
-        raw_data = self.param_type()
-        raw_data[self.KEY_X] = self._protobuf_data.data.x
-        raw_data[self.KEY_Y] = self._protobuf_data.data.y
-        raw_data[self.KEY_Z] = self._protobuf_data.data.z
+        if len(self._protobuf_data.speed) > self.MAX_MOTORS:
+            return False
+        return self.update(new_value=tuple(self._protobuf_data.speed))
 
-        return self.update(new_value=raw_data)
+    def serialize_raw(self) -> bytes:
+        speeds = self._param_data + (0.0,) * (self.MAX_MOTORS - len(self._param_data))
+        return _RAW_MOTOR_COMMAND.pack(_timestamp_ms(self._last_update), len(self._param_data), *speeds)
+
+    def serialize_raw_into(self, buffer: bytearray) -> int:
+        speeds = self._param_data + (0.0,) * (self.MAX_MOTORS - len(self._param_data))
+        _RAW_MOTOR_COMMAND.pack_into(buffer, 0, _timestamp_ms(self._last_update), len(self._param_data), *speeds)
+        return _RAW_MOTOR_COMMAND.size
+
+    def deserialize_raw(self, data: Union[bytes, memoryview]) -> bool:
+        """
+        Converts a packed MotorCommand struct into the format used in the simulator
+        Args:
+            data: Packed struct data
+
+        Returns:
+            True: The conversion was successful
+            False: The conversion was not successful
+        """
+        try:
+            _, count, *speeds = _RAW_MOTOR_COMMAND.unpack(data)
+        except struct.error:
+            return False
+
+        if count > self.MAX_MOTORS:
+            return False
+        return self.update(new_value=tuple(speeds[:count]))
+
+
+class ParameterPool:
+    """
+    Bounded free list of preallocated instances of a single parameter type. Receivers acquire
+    an instance per message and consumers hand it back with release() once they are done, so
+    high rate topics don't allocate a new parameter, protobuf object and buffer per message.
+    """
+
+    def __init__(self, param_type: type, size: int = 64):
+        """
+        Initialize the pool
+        Args:
+            param_type: Parameter class to pool. Must be default constructible.
+            size: Most instances held by the pool
+        """
+        self._param_type = param_type
+
+        # deque append/pop are atomic, so the receiving thread and a consuming thread can share
+        # the pool without a lock.
+        self._free = deque((param_type() for _ in range(size)), maxlen=size)  # type: deque
+
+        # How many acquires found the pool empty and had to construct a new instance
+        self.misses = 0
+
+    @property
+    def param_type(self) -> type:
+        return self._param_type
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+    def acquire(self) -> IParameter:
+        """
+        Takes an instance from the pool, constructing a new one if the pool is empty
+        Returns:
+            IParameter
+        """
+        try:
+            return self._free.pop()
+        except IndexError:
+            self.misses += 1
+            return self._param_type()
+
+    def release(self, param: IParameter) -> None:
+        """
+        Returns an instance to the pool. Must only be called once per acquire, and the caller
+        must not touch the instance afterwards. Readers holding a view() are unaffected.
+        Args:
+            param: Instance to recycle
+
+        Returns:
+            None
+        """
+        if type(param) is self._param_type:
+            self._free.append(param)
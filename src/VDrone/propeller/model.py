@@ -20,3 +20,6 @@ class StandardProp(IPropeller):
 
     def tf_evaluate(self, sig_in: np.ndarray, dt: float = 0.0) -> np.ndarray:
         return sig_in
+
+    def tf_evaluate_batch(self, sig_in: np.ndarray, dt: float = 0.0) -> np.ndarray:
+        return np.atleast_2d(sig_in)
@@ -0,0 +1,187 @@
+# **********************************************************************************************************************
+#   FileName:
+#       ring_buffer.py
+#
+#   Description:
+#       Fixed capacity single-producer/single-consumer ring buffer
+#
+#   4/26/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import time
+from enum import Enum
+from typing import Any, Callable, Dict, Union
+
+
+class OverflowPolicy(Enum):
+    """ What a ring buffer does with new data when it is full """
+    DROP_OLDEST = "drop_oldest"  # Overwrite the oldest unread item. The producer never waits.
+    DROP_NEWEST = "drop_newest"  # Discard the item being added. The producer never waits.
+    BLOCK = "block"  # Wait for the consumer to make room, up to a timeout
+
+
+class SPSCRingBuffer:
+    """
+    Bounded queue for exactly one producer thread and one consumer thread. The producer only
+    ever writes the tail index and the consumer only ever writes the head index, so neither
+    side takes a lock. Indices count up forever and are wrapped when addressing the storage,
+    which keeps full/empty checks to a single subtraction.
+
+    Each slot holds (sequence, box), where sequence is the index the item was written at and
+    box is a single element list holding the item. Whoever pops the box owns the item, and
+    list.pop() is atomic under the GIL, so an item overwritten under DROP_OLDEST goes either
+    to the consumer or to the eviction hook, never both. The sequence lets the consumer notice
+    a slot that was lapped while it was reading it.
+    """
+
+    # How long a blocked producer sleeps between checks for free space (seconds)
+    BLOCK_POLL_PERIOD = 50e-6
+
+    def __init__(self, capacity: int = 1024, policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+                 on_evict: Callable[[Any], None] = None):
+        """
+        Initialize the ring buffer
+        Args:
+            capacity: Most items the buffer holds before the overflow policy kicks in
+            policy: How to handle writes while the buffer is full
+            on_evict: Called from the producer thread with each unread item the DROP_OLDEST
+                      policy overwrites, e.g. to hand it back to a pool
+        """
+        if capacity < 1:
+            raise ValueError("Ring buffer capacity must be at least 1")
+
+        self._capacity = capacity
+        self._policy = policy
+        self._storage = [None] * capacity  # type: list
+        self._on_evict = on_evict
+        self._head = 0  # Next index to read. Only written by the consumer.
+        self._tail = 0  # Next index to write. Only written by the producer.
+
+        # Health counters. Each is only written by one side.
+        self._dropped = 0
+        self._high_water = 0
+        self._overruns = 0
+
+    def __len__(self) -> int:
+        return min(self._tail - self._head, self._capacity)
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def policy(self) -> OverflowPolicy:
+        return self._policy
+
+    def empty(self) -> bool:
+        return self._tail == self._head
+
+    def full(self) -> bool:
+        return self._tail - self._head >= self._capacity
+
+    def put(self, item: Any, timeout: Union[float, None] = None) -> bool:
+        """
+        Adds an item to the buffer. Producer side only.
+        Args:
+            item: Data to add
+            timeout: How long the BLOCK policy may wait for space (seconds). None waits forever.
+
+        Returns:
+            True: The item was added
+            False: The item was discarded because the buffer was full
+        """
+        tail = self._tail
+        if tail - self._head >= self._capacity:
+            if self._policy is OverflowPolicy.DROP_NEWEST:
+                self._dropped += 1
+                return False
+            elif self._policy is OverflowPolicy.BLOCK:
+                if not self._wait_for_space(tail, timeout):
+                    self._dropped += 1
+                    return False
+            else:
+                # Claim the oldest item before replacing it. If the consumer got there first,
+                # the slot has already been read and nothing is dropped.
+                try:
+                    evicted = self._storage[tail % self._capacity][1].pop()
+                except IndexError:
+                    pass
+                else:
+                    self._dropped += 1
+                    if self._on_evict is not None:
+                        self._on_evict(evicted)
+
+        self._storage[tail % self._capacity] = (tail, [item])
+        self._tail = tail + 1
+
+        depth = tail + 1 - self._head
+        if depth > self._high_water:
+            self._high_water = min(depth, self._capacity)
+        return True
+
+    def get(self) -> Any:
+        """
+        Removes the oldest item from the buffer. Consumer side only.
+        Returns:
+            The item, or None if the buffer is empty
+        """
+        while True:
+            head = self._head
+            tail = self._tail
+            if head == tail:
+                return None
+
+            # Items the producer overwrote under the DROP_OLDEST policy are skipped
+            if tail - head > self._capacity:
+                head = tail - self._capacity
+
+            sequence, box = self._storage[head % self._capacity]
+
+            # The producer lapped the slot before it was read, so it holds a later write. Try
+            # again from the new oldest item.
+            if sequence != head:
+                self._overruns += 1
+                self._head = max(head + 1, self._tail - self._capacity)
+                continue
+
+            # The producer evicted the item while it was being read
+            try:
+                item = box.pop()
+            except IndexError:
+                self._overruns += 1
+                self._head = head + 1
+                continue
+
+            self._head = head + 1
+            return item
+
+    def metrics(self) -> Dict[str, int]:
+        """
+        Snapshot of the buffer health counters
+        Returns:
+            Dictionary of the current depth, high water mark, drop count and read overruns
+        """
+        return {
+            "depth": len(self),
+            "high_water": self._high_water,
+            "dropped": self._dropped,
+            "overruns": self._overruns
+        }
+
+    def _wait_for_space(self, tail: int, timeout: Union[float, None]) -> bool:
+        """
+        Waits for the consumer to free a slot
+        Args:
+            tail: Producer index that is waiting to be written
+            timeout: Longest time to wait (seconds). None waits forever.
+
+        Returns:
+            True: Space is available
+            False: Timed out while the buffer was still full
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while tail - self._head >= self._capacity:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(self.BLOCK_POLL_PERIOD)
+        return True
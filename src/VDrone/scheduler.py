@@ -0,0 +1,209 @@
+# **********************************************************************************************************************
+#   FileName:
+#       scheduler.py
+#
+#   Description:
+#       Deterministic scheduler that owns simulation time and runs periodic tasks on it
+#
+#   4/30/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+from enum import Enum
+from threading import Event
+from typing import Callable, Dict, List, Union
+from VDrone.clock import IClock, MonotonicClock, SimClock, TimeoutService
+
+
+class RunMode(Enum):
+    """ How simulation time is paced against the wall clock """
+    AS_FAST_AS_POSSIBLE = "afap"  # Never wait. Results are identical to the paced modes.
+    REAL_TIME = "real_time"  # One second of sim time per second of wall time
+    SCALED = "scaled"  # time_scale seconds of sim time per second of wall time
+
+
+class PeriodicTask:
+    """ Callback that runs every N base ticks of the scheduler """
+
+    def __init__(self, name: str, period_ticks: int, offset_ticks: int, callback: Callable[[float, float], None],
+                 dt: float):
+        """
+        Initialize the task
+        Args:
+            name: Unique name of the task
+            period_ticks: How many base ticks between runs
+            offset_ticks: Base tick of the first run
+            callback: Called with (sim time, task period in seconds)
+            dt: Task period in seconds
+        """
+        self.name = name
+        self.period_ticks = period_ticks
+        self.offset_ticks = offset_ticks
+        self.callback = callback
+        self.dt = dt
+        self.next_tick = offset_ticks
+        self.runs = 0
+
+
+# Smallest lateness, in wall seconds, that counts as an overrun unless configured otherwise. Sleeping
+# threads routinely wake this late, so anything smaller is scheduling noise rather than a slow tick.
+DEFAULT_OVERRUN_TOLERANCE = 0.001
+
+
+class SimScheduler:
+    """
+    Owns simulation time. Time only moves in whole base ticks and is computed as tick * base_tick
+    rather than accumulated, so every task runs at an exact multiple of the base tick and a run
+    is reproducible no matter how it is paced. Tasks due on the same tick run in the order they
+    were added.
+    """
+
+    def __init__(self, base_tick: float = 0.001, mode: RunMode = RunMode.AS_FAST_AS_POSSIBLE,
+                 time_scale: float = 1.0, clock: SimClock = None, timeout_service: TimeoutService = None,
+                 wall_clock: IClock = None, overrun_tolerance: float = None):
+        """
+        Initialize the scheduler
+        Args:
+            base_tick: Smallest step of simulation time (seconds)
+            mode: How to pace simulation time against the wall clock
+            time_scale: Sim seconds per wall second in SCALED mode, e.g. 100.0 for 100x real time
+            clock: Sim clock to drive. Hand the same clock to parameters so their timeouts follow
+                   sim time. A new clock starting at zero is created if not given.
+            timeout_service: Service to poll after every tick, typically one built on the same clock
+            wall_clock: Real time source used for pacing. Defaults to a monotonic clock.
+            overrun_tolerance: How late a tick may start before it counts as an overrun (wall
+                               seconds). Defaults to one paced tick or DEFAULT_OVERRUN_TOLERANCE,
+                               whichever is larger.
+        """
+        if base_tick <= 0.0:
+            raise ValueError("Base tick must be positive")
+        if mode is RunMode.SCALED and time_scale <= 0.0:
+            raise ValueError("Time scale must be positive")
+        if overrun_tolerance is not None and overrun_tolerance < 0.0:
+            raise ValueError("Overrun tolerance can't be negative")
+
+        self.base_tick = base_tick
+        self.mode = mode
+        self.time_scale = 1.0 if mode is RunMode.REAL_TIME else time_scale
+        self.clock = clock if clock else SimClock()
+        self.timeout_service = timeout_service
+        self.overrun_tolerance = overrun_tolerance if overrun_tolerance is not None else \
+            max(base_tick / self.time_scale, DEFAULT_OVERRUN_TOLERANCE)
+
+        self._wall_clock = wall_clock if wall_clock else MonotonicClock()
+        self._tick_origin = self.clock.now()
+        self._tick = 0
+        self._tasks = []  # type: List[PeriodicTask]
+        self._task_names = {}  # type: Dict[str, PeriodicTask]
+        self._stop = Event()
+
+        # Metrics: how many ticks started later than the overrun tolerance, and the worst lag seen
+        self.overruns = 0
+        self.max_lag = 0.0
+
+    @property
+    def tick(self) -> int:
+        return self._tick
+
+    @property
+    def time(self) -> float:
+        return self.clock.now()
+
+    def add_task(self, name: str, period: float, callback: Callable[[float, float], None],
+                 offset: float = 0.0) -> PeriodicTask:
+        """
+        Registers a periodic task
+        Args:
+            name: Unique name of the task
+            period: How often to run (seconds). Must be a whole multiple of the base tick.
+            callback: Called with (sim time, period)
+            offset: Sim time of the first run, relative to the current tick. Must also be a whole
+                    multiple of the base tick.
+
+        Returns:
+            The registered task
+
+        Raises:
+            ValueError: Name already used, or period/offset not a multiple of the base tick
+        """
+        if name in self._task_names:
+            raise ValueError("Task {} already exists".format(name))
+
+        period_ticks = self._to_ticks(period, "Period")
+        offset_ticks = self._to_ticks(offset, "Offset", allow_zero=True)
+
+        task = PeriodicTask(name=name, period_ticks=period_ticks, offset_ticks=self._tick + offset_ticks,
+                            callback=callback, dt=period_ticks * self.base_tick)
+        self._tasks.append(task)
+        self._task_names[name] = task
+        return task
+
+    def remove_task(self, name: str) -> None:
+        task = self._task_names.pop(name)
+        self._tasks.remove(task)
+
+    def step(self) -> float:
+        """
+        Runs every task due on the current tick, then advances sim time by one base tick
+        Returns:
+            The new simulation time
+        """
+        t = self.clock.now()
+        tick = self._tick
+        for task in self._tasks:
+            if task.next_tick == tick:
+                task.callback(t, task.dt)
+                task.next_tick += task.period_ticks
+                task.runs += 1
+
+        self._tick = tick + 1
+        self.clock.set(self._tick_origin + self._tick * self.base_tick)
+        if self.timeout_service is not None:
+            self.timeout_service.poll()
+        return self.clock.now()
+
+    def run(self, duration: Union[float, None] = None) -> int:
+        """
+        Runs the simulation, paced according to the run mode
+        Args:
+            duration: How much sim time to run for (seconds). None runs until stop() is called.
+
+        Returns:
+            Number of ticks executed
+        """
+        self._stop.clear()
+        ticks = None if duration is None else int(round(duration / self.base_tick))
+        start_tick = self._tick
+        wall_start = self._wall_clock.now()
+        paced = self.mode is not RunMode.AS_FAST_AS_POSSIBLE
+
+        while not self._stop.is_set() and (ticks is None or self._tick - start_tick < ticks):
+            if paced:
+                target = wall_start + (self._tick - start_tick) * self.base_tick / self.time_scale
+                lag = self._wall_clock.now() - target
+                if lag < 0.0:
+                    # Event.wait() returns early when stop() is called
+                    if self._stop.wait(-lag):
+                        break
+                elif lag > self.overrun_tolerance:
+                    self.overruns += 1
+                    self.max_lag = max(self.max_lag, lag)
+
+            self.step()
+
+        return self._tick - start_tick
+
+    def stop(self) -> None:
+        """
+        Makes run() return after the tick in progress. Safe to call from any thread or task.
+        Returns:
+            None
+        """
+        self._stop.set()
+
+    def _to_ticks(self, seconds: float, what: str, allow_zero: bool = False) -> int:
+        ticks = int(round(seconds / self.base_tick))
+        if abs(ticks * self.base_tick - seconds) > 1e-9 * max(1.0, abs(seconds)) or ticks < 0 or \
+                (ticks == 0 and not allow_zero):
+            raise ValueError("{} of {}s is not a whole multiple of the {}s base tick".format(what, seconds,
+                                                                                           self.base_tick))
+        return ticks
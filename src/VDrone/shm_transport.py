@@ -0,0 +1,326 @@
+# **********************************************************************************************************************
+#   FileName:
+#       shm_transport.py
+#
+#   Description:
+#       Shared memory transport for a simulator and flight software running on the same host.
+#
+#       Each direction of traffic gets its own shared memory region holding one seqlock protected
+#       slot per ParameterID. Writers publish the latest sample into its slot and ring a ZMQ ipc
+#       doorbell so the reader wakes up, but only when the reader has not already been notified.
+#       Region layout, all little-endian:
+#
+#           Header:  uint32 magic | uint32 slot_count | uint32 slot_size | uint32 doorbell_pending |
+#                    uint32 owner_pid | uint32 reserved
+#           Slot N:  uint32 sequence | uint32 length | uint8 payload[slot_size]
+#
+#       A slot's sequence is odd while it is being written. Readers copy the payload and retry
+#       if the sequence changed underneath them. Sequences wrap at 2^32 and skip zero, which is
+#       reserved for a slot that has never been written.
+#
+#       Doorbell protocol, which a C peer must follow as well:
+#           Writer:  write the slot, then if doorbell_pending is 0, set it to 1 and send an empty
+#                    message on the reader's doorbell socket
+#           Reader:  drain the doorbell socket, set doorbell_pending to 0, then scan every slot
+#                    whose sequence changed since it was last read
+#
+#       Python has no atomic operations or fences on shared memory, so these are plain loads and
+#       stores. Even on x86, which keeps stores in order, a writer's load of doorbell_pending may
+#       be satisfied before its slot store becomes visible, while the reader clears the flag and
+#       scans. Both sides can then miss each other and the wakeup is lost. C peers should use a
+#       sequentially consistent exchange on the flag. On the Python side the reader also rescans
+#       the region whenever it has been idle for a polling period, which bounds the delay of a
+#       lost wakeup instead of preventing it.
+#
+#   4/27/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import os
+import tempfile
+import numpy as np
+import zmq
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Iterator, Tuple, Union
+
+REGION_MAGIC = 0x56445348  # "VDSH"
+HEADER_SIZE = 24
+HEADER_WORDS = HEADER_SIZE // 4
+SEQUENCE_MASK = 0xFFFFFFFF
+SLOT_HEADER_SIZE = 8
+
+
+class SeqlockRegion:
+    """ Shared memory block of seqlock protected, latest-value slots """
+
+    # How many times a reader retries a slot that keeps changing before giving up on it
+    MAX_READ_ATTEMPTS = 1000
+
+    def __init__(self, name: str, slot_count: int = 0, slot_size: int = 2048, create: bool = False):
+        """
+        Create or attach to a region
+        Args:
+            name: System wide name of the shared memory block
+            slot_count: Number of slots. Only used when creating the region.
+            slot_size: Largest payload a slot can hold (bytes). Only used when creating the region.
+            create: Whether to create the region or attach to an existing one
+        """
+        if create:
+            slot_size = (slot_size + 7) & ~7
+            size = HEADER_SIZE + slot_count * (SLOT_HEADER_SIZE + slot_size)
+            try:
+                self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            except FileExistsError:
+                self._remove_stale(name)
+                self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+            self._header = np.ndarray((HEADER_WORDS,), dtype='<u4', buffer=self._shm.buf)
+            self._header[:] = (REGION_MAGIC, slot_count, slot_size, 0, os.getpid(), 0)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            self._header = np.ndarray((HEADER_WORDS,), dtype='<u4', buffer=self._shm.buf)
+            if self._header[0] != REGION_MAGIC:
+                raise ValueError("Shared memory block {} is not a VDrone region".format(name))
+
+        self._owner = create
+        self._buf = self._shm.buf
+        self.slot_count = int(self._header[1])
+        self.slot_size = int(self._header[2])
+
+        # Strided views of every slot's sequence and length words
+        self._stride = SLOT_HEADER_SIZE + self.slot_size
+        self._sequence = np.ndarray((self.slot_count,), dtype='<u4', buffer=self._buf, offset=HEADER_SIZE,
+                                    strides=(self._stride,))
+        self._length = np.ndarray((self.slot_count,), dtype='<u4', buffer=self._buf, offset=HEADER_SIZE + 4,
+                                  strides=(self._stride,))
+
+        # Sequence of the last sample consumed from each slot by this process. Starts from zero so
+        # that anything written before this process attached is picked up on the first scan.
+        self._last_seen = np.zeros(self.slot_count, dtype='<u4')
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def write(self, index: int, payload: Union[bytes, memoryview]) -> bool:
+        """
+        Publishes a payload into a slot, replacing whatever was there
+        Args:
+            index: Slot to write
+            payload: Data to publish
+
+        Returns:
+            True: The reader has no notification pending and should be woken up
+            False: The reader is already due to scan the region
+        """
+        length = len(payload)
+        if length > self.slot_size:
+            raise ValueError("Payload of {} bytes exceeds the {} byte slot size".format(length, self.slot_size))
+
+        start = HEADER_SIZE + index * self._stride + SLOT_HEADER_SIZE
+        sequence = int(self._sequence[index])
+        self._sequence[index] = (sequence + 1) & SEQUENCE_MASK
+        self._buf[start:start + length] = payload
+        self._length[index] = length
+        self._sequence[index] = ((sequence + 2) & SEQUENCE_MASK) or 2
+
+        if self._header[3]:
+            return False
+        self._header[3] = 1
+        return True
+
+    def read(self, index: int) -> Union[bytes, None]:
+        """
+        Takes a consistent copy of a slot's payload
+        Args:
+            index: Slot to read
+
+        Returns:
+            The payload, or None if the slot has never been written or is stuck mid-write
+        """
+        start = HEADER_SIZE + index * self._stride + SLOT_HEADER_SIZE
+        for _ in range(self.MAX_READ_ATTEMPTS):
+            sequence = int(self._sequence[index])
+            if sequence & 1:
+                continue
+
+            payload = bytes(self._buf[start:start + int(self._length[index])])
+            if int(self._sequence[index]) == sequence:
+                self._last_seen[index] = sequence
+                return payload if sequence else None
+
+        # Writer died or stalled mid-update. Leave the slot marked unread so a later scan retries.
+        return None
+
+    def cancel_doorbell(self) -> None:
+        """
+        Withdraws a notification that the writer failed to deliver
+        Returns:
+            None
+        """
+        self._header[3] = 0
+
+    def changes(self) -> Iterator[Tuple[int, bytes]]:
+        """
+        Clears the pending doorbell and yields every slot written since it was last read.
+        Slots written more than once in between only yield their latest payload.
+        Returns:
+            Iterator of (slot index, payload)
+        """
+        self._header[3] = 0
+        for index in np.flatnonzero(self._sequence != self._last_seen):
+            payload = self.read(int(index))
+            if payload is not None:
+                yield int(index), payload
+
+    @staticmethod
+    def _remove_stale(name: str) -> None:
+        """
+        Unlinks a region left behind by a run that didn't shut down cleanly
+        Args:
+            name: System wide name of the shared memory block
+
+        Returns:
+            None
+
+        Raises:
+            FileExistsError: The block isn't a VDrone region, or the process that created it
+                             is still running
+        """
+        stale = shared_memory.SharedMemory(name=name)
+        try:
+            magic, owner = 0, 0
+            if stale.size >= HEADER_SIZE:
+                header = np.ndarray((HEADER_WORDS,), dtype='<u4', buffer=stale.buf)
+                magic, owner = int(header[0]), int(header[4])
+                del header
+
+            if magic != REGION_MAGIC:
+                raise FileExistsError("Shared memory block {} exists and is not a VDrone region".format(name))
+            if owner and _process_alive(owner):
+                raise FileExistsError("Shared memory block {} is in use by running process {}. Give this "
+                                      "simulator a different shm_name.".format(name, owner))
+        finally:
+            stale.close()
+
+        stale.unlink()
+
+    def close(self) -> None:
+        """
+        Detaches from the region, destroying it if this process created it
+        Returns:
+            None
+        """
+        # Views into the buffer must be gone before the mapping can be released
+        del self._header, self._sequence, self._length, self._buf
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+def _process_alive(pid: int) -> bool:
+    """
+    Checks whether a process exists
+    Args:
+        pid: Process ID to check
+
+    Returns:
+        True: The process is running, possibly owned by another user
+        False: No such process
+    """
+    # Windows destroys a block once its last handle closes, so an existing one always has a
+    # live owner. os.kill() would also terminate the process there rather than probe it.
+    if pid == os.getpid() or os.name == 'nt':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        # Signals aren't available for this check on every platform. Assume the owner is
+        # alive rather than risk destroying its region.
+        return True
+    return True
+
+
+class ShmTransport:
+    """
+    Pair of seqlock regions and doorbells forming a bidirectional link. The owner (the simulator)
+    creates the regions and writes "<name>_tx", while the peer (the flight software) attaches
+    and writes "<name>_rx".
+    """
+
+    def __init__(self, name: str, slot_count: int, context: zmq.Context, owner: bool = True,
+                 slot_size: int = 2048):
+        """
+        Initialize the transport
+        Args:
+            name: Base name of the shared memory regions and doorbells
+            slot_count: Number of slots in each region
+            context: ZMQ context used to create the doorbell sockets
+            owner: Whether this end creates the regions
+            slot_size: Largest payload a slot can hold (bytes)
+        """
+        tx_name, rx_name = ("{}_tx".format(name), "{}_rx".format(name))
+        if not owner:
+            tx_name, rx_name = rx_name, tx_name
+
+        self._tx_region = SeqlockRegion(tx_name, slot_count=slot_count, slot_size=slot_size, create=owner)
+        self._rx_region = SeqlockRegion(rx_name, slot_count=slot_count, slot_size=slot_size, create=owner)
+
+        # Each doorbell carries empty messages. Only one is ever in flight per direction, since
+        # writers only ring when the reader has cleared the pending flag.
+        self.doorbell = context.socket(zmq.PULL)
+        self.doorbell.bind(self._doorbell_address(rx_name))
+        self._peer_doorbell = context.socket(zmq.PUSH)
+        self._peer_doorbell.setsockopt(zmq.LINGER, 0)
+        self._peer_doorbell.connect(self._doorbell_address(tx_name))
+
+    def write(self, index: int, payload: Union[bytes, memoryview]) -> None:
+        """
+        Publishes a payload to the peer
+        Args:
+            index: Slot to write, normally the ParameterID value
+            payload: Serialized parameter data
+
+        Returns:
+            None
+        """
+        if self._tx_region.write(index, payload):
+            try:
+                self._peer_doorbell.send(b'', flags=zmq.NOBLOCK)
+            except zmq.ZMQError:
+                # Peer isn't listening yet. It scans every slot when it first attaches, and
+                # clearing the flag lets the next write try the doorbell again.
+                self._tx_region.cancel_doorbell()
+
+    def receive(self) -> Iterator[Tuple[int, bytes]]:
+        """
+        Acknowledges the doorbell and yields everything the peer has written since the last call
+        Returns:
+            Iterator of (slot index, payload)
+        """
+        try:
+            while True:
+                self.doorbell.recv(flags=zmq.NOBLOCK)
+        except zmq.ZMQError:
+            pass
+
+        return self._rx_region.changes()
+
+    def close(self) -> None:
+        """
+        Closes the doorbells and detaches from both regions
+        Returns:
+            None
+        """
+        self.doorbell.close(linger=0)
+        self._peer_doorbell.close(linger=0)
+        self._tx_region.close()
+        self._rx_region.close()
+
+    @staticmethod
+    def _doorbell_address(region_name: str) -> str:
+        return "ipc://{}".format(Path(tempfile.gettempdir(), "{}.bell".format(region_name)))
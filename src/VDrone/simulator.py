@@ -9,11 +9,98 @@
 # **********************************************************************************************************************
 
 import numpy as np
-from typing import Any
+from typing import Any, Callable
 from VDrone.interface import TransferFunction
 from VDrone.propeller.model import StandardProp
 
 
+class SimTrace:
+    """
+    Preallocated, array backed storage for simulation samples. Once the reserved space runs
+    out the storage grows geometrically, so recording stays amortized O(1) per sample no
+    matter how long a run goes on for.
+    """
+
+    # Samples reserved when no capacity was requested
+    DEFAULT_CAPACITY = 4096
+
+    def __init__(self, capacity: int = 0, growth_factor: float = 2.0):
+        """
+        Initialize the trace storage
+        Args:
+            capacity: Number of samples to reserve up front
+            growth_factor: How much to multiply the storage by once the reserved space is exhausted
+
+        Raises:
+            ValueError: The growth factor would not grow the storage
+        """
+        if growth_factor <= 1.0:
+            raise ValueError("Growth factor must be greater than 1, got {}".format(growth_factor))
+
+        self.growth_factor = growth_factor
+        self._capacity = max(int(capacity), 0)
+        self._size = 0
+        self._buffer = None  # type: np.ndarray
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        """
+        Number of samples that fit before the storage has to grow again
+        Returns:
+            int
+        """
+        return self._buffer.shape[0] if self._buffer is not None else self._capacity
+
+    @property
+    def data(self) -> np.ndarray:
+        """
+        Zero-copy view of the recorded samples as a structured array with fields 't' and 'output'
+        Returns:
+            np.ndarray
+        """
+        if self._buffer is None:
+            return np.empty(0, dtype=[('t', np.float64), ('output', np.float64)])
+        return self._buffer[:self._size]
+
+    def reset(self, capacity: int = 0) -> None:
+        """
+        Discards all recorded samples and reserves space for a new run
+        Args:
+            capacity: Number of samples to reserve
+
+        Returns:
+            None
+        """
+        self._capacity = max(int(capacity), 0)
+        self._size = 0
+        self._buffer = None
+
+    def append(self, t: float, output: Any) -> None:
+        """
+        Records a single sample. Storage is allocated on the first sample so the output
+        shape can be inferred from the model.
+        Args:
+            t: Simulation time of the sample
+            output: Model output at that time
+
+        Returns:
+            None
+        """
+        if self._buffer is None:
+            dtype = np.dtype([('t', np.float64), ('output', np.float64, np.shape(output))])
+            self._buffer = np.empty(self._capacity or self.DEFAULT_CAPACITY, dtype=dtype)
+        elif self._size >= self._buffer.shape[0]:
+            grown = np.empty(int(self._buffer.shape[0] * self.growth_factor) + 1, dtype=self._buffer.dtype)
+            grown[:self._size] = self._buffer[:self._size]
+            self._buffer = grown
+
+        self._buffer[self._size] = (t, output)
+        self._size += 1
+
+
 class Simulator:
     """ Takes a mathematical system and simulates its behavior """
 
@@ -21,26 +108,113 @@ class Simulator:
         self.t0 = 0.0
         self.tf = 0.0
         self.model = TransferFunction()
-        self._sim_data = []
+        self._sim_data = SimTrace()
+        self._batch_data = np.empty((0, 0, 0))
 
     def attach_model(self, model: TransferFunction):
         self.model = model
 
-    def run(self, t0: float, tf: float, ts: float) -> None:
+    def run(self, t0: float, tf: float, ts: float, sig_in: Any = 0.0) -> None:
         """
         Runs the simulation on the model
         Args:
             t0: Initial time to start at
             tf: Final time to execute to
             ts: Sampling rate resolution
+            sig_in: Input applied to the model at every step
 
         Returns:
             None
         """
         time_steps = np.arange(t0, tf, ts)
+        self._sim_data.reset(capacity=time_steps.size)
         for t in time_steps:
-            output = self.model.tf_evaluate(sig_in=0.0, dt=ts)
-            self._sim_data.append([t, output])
+            output = self.model.tf_evaluate(sig_in=sig_in, dt=ts)
+            self._sim_data.append(t, output)
+
+    def run_until(self, t0: float, ts: float, stop: Callable[[float, Any], bool], sig_in: Any = 0.0,
+                  max_steps: int = None) -> None:
+        """
+        Runs the simulation on the model with no fixed end time. Steps continue until the stop
+        condition is met, and the trace grows as needed to hold however many samples that takes.
+        Args:
+            t0: Initial time to start at
+            ts: Sampling rate resolution
+            stop: Called with the time and model output after every step. Return True to end the run.
+            sig_in: Input applied to the model at every step
+            max_steps: Optional limit on the number of steps, in case the condition is never met
+
+        Returns:
+            None
+        """
+        self._sim_data.reset()
+        step = 0
+        while max_steps is None or step < max_steps:
+            t = t0 + step * ts
+            output = self.model.tf_evaluate(sig_in=sig_in, dt=ts)
+            self._sim_data.append(t, output)
+            step += 1
+            if stop(t, output):
+                break
+
+    @property
+    def sim_data(self) -> np.ndarray:
+        """
+        Results of the last run as a structured array with fields 't' and 'output'
+        Returns:
+            np.ndarray
+        """
+        return self._sim_data.data
+
+    def run_batch(self, t0: float, tf: float, ts: float, sig_in: np.ndarray) -> np.ndarray:
+        """
+        Runs many independent scenarios of the model in lock step. Each time step advances
+        every scenario with a single call to the model's batch evaluation. Scenario n produces
+        the same outputs as run() given the input sig_in[n].
+        Args:
+            t0: Initial time to start at
+            tf: Final time to execute to
+            ts: Sampling rate resolution
+            sig_in: Input of each scenario. Either shaped (N, input_dim) and applied at every
+                    step, or shaped (steps, N, input_dim) to give every step its own input.
+
+        Returns:
+            Model output for every step and scenario, shaped (steps, N, output_dim)
+
+        Raises:
+            ValueError: A per step input doesn't have one entry for each time step
+        """
+        time_steps = np.arange(t0, tf, ts)
+        sig_in = np.asarray(sig_in, dtype=float)
+        if sig_in.ndim == 3:
+            if sig_in.shape[0] != time_steps.size:
+                raise ValueError("Expected inputs for {} steps, got {}".format(time_steps.size, sig_in.shape[0]))
+            inputs = sig_in
+        else:
+            sig_in = np.atleast_2d(sig_in)
+            inputs = np.broadcast_to(sig_in, (time_steps.size,) + sig_in.shape)
+
+        if time_steps.size == 0:
+            self._batch_data = np.empty((0, 0, 0))
+            return self._batch_data
+
+        # Storage is allocated on the first step so the output shape can be inferred from the model
+        for idx in range(time_steps.size):
+            output = np.atleast_2d(self.model.tf_evaluate_batch(sig_in=inputs[idx], dt=ts))
+            if idx == 0:
+                self._batch_data = np.empty((time_steps.size,) + output.shape)
+            self._batch_data[idx] = output
+
+        return self._batch_data
+
+    @property
+    def batch_data(self) -> np.ndarray:
+        """
+        Results of the last batched run
+        Returns:
+            np.ndarray shaped (steps, N, state_dim)
+        """
+        return self._batch_data
 
     def plot(self):
         pass
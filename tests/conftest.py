@@ -0,0 +1,34 @@
+# **********************************************************************************************************************
+#   FileName:
+#       conftest.py
+#
+#   Description:
+#       Makes the VDrone package importable from the source tree when running the tests, and
+#       provides fixtures shared between test modules
+#
+#   5/1/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import socket
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from VDrone.connection import SimConnection
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def sim_ports() -> dict:
+    """ Sim port configuration on free loopback ports, so tests never collide with a running sim """
+    ports = {key.value: free_port() for key in SimConnection.TxSocket}
+    ports.update({key.value: free_port() for key in SimConnection.RxSocket})
+    return {"transport": "tcp", "bind_ip": "127.0.0.1", "port": ports}
@@ -0,0 +1,95 @@
+# **********************************************************************************************************************
+#   FileName:
+#       test_actuation.py
+#
+#   Description:
+#       Tests for the mixer and the actuator pipeline feeding the dynamics
+#
+#   5/1/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import numpy as np
+import pytest
+from VDrone.actuation import ActuatorPipeline, ControlSource
+from VDrone.motors.mixer import QuadMixer
+
+
+class RecordingDynamics:
+    """ Stands in for the airframe and keeps the motor speeds of every step """
+
+    def __init__(self):
+        self.controls = []
+
+    def step(self, control: np.ndarray, last_state: np.ndarray, dt: float) -> np.ndarray:
+        self.controls.append(control.copy())
+        return control
+
+
+@pytest.mark.parametrize("sticks, expected", [
+    ((0.0, 0.0, 0.0, 0.5), (0.5, 0.5, 0.5, 0.5)),  # Collective only
+    ((1.0, 0.0, 0.0, 0.5), (0.25, 0.5, 0.75, 0.5)),  # Pitch trades the front for the back
+    ((0.0, 1.0, 0.0, 0.5), (0.5, 0.25, 0.5, 0.75)),  # Roll speeds up the left motor
+    ((0.0, 0.0, 1.0, 0.5), (0.6, 0.4, 0.6, 0.4)),  # Yaw favors one spin direction
+])
+def test_mix_axes(sticks, expected):
+    assert QuadMixer().mix(np.array(sticks)) == pytest.approx(expected)
+
+
+def test_mix_clips_to_full_range():
+    mixer = QuadMixer()
+    assert mixer.mix(np.array([0.0, 1.0, 0.0, 1.0])) == pytest.approx((1.0, 0.75, 1.0, 1.0))
+    assert mixer.mix(np.array([-1.0, 0.0, 0.0, 0.0])) == pytest.approx((0.25, 0.0, 0.0, 0.0))
+
+
+def test_mix_batch_matches_mix():
+    mixer = QuadMixer()
+    rng = np.random.default_rng(25)
+    sticks = np.column_stack([rng.uniform(-1.0, 1.0, size=(50, 3)), rng.uniform(0.0, 1.0, size=50)])
+
+    out = np.empty((50, 4))
+    assert mixer.mix_batch(sticks, out=out) is out
+    for row, commands in zip(sticks, out):
+        assert commands == pytest.approx(mixer.mix(row))
+    assert out.min() >= 0.0 and out.max() <= 1.0
+
+
+def test_pipeline_mixes_sticks_into_motor_speeds():
+    dynamics = RecordingDynamics()
+    pipeline = ActuatorPipeline(dynamics, max_speed=100.0)
+
+    assert pipeline.set_sticks((0.0, 1.0, 0.0, 0.5))
+    pipeline.step(t=0.0, dt=0.01)
+    assert pipeline.source is ControlSource.STICKS
+    assert dynamics.controls[-1] == pytest.approx((50.0, 25.0, 50.0, 75.0))
+
+
+def test_pipeline_passes_motor_commands_through():
+    dynamics = RecordingDynamics()
+    pipeline = ActuatorPipeline(dynamics, max_speed=100.0)
+
+    assert pipeline.set_motor_command((0.1, 0.2, 1.5, -0.5))
+    pipeline.step(t=0.0, dt=0.01)
+    assert pipeline.source is ControlSource.MOTOR_COMMAND
+    assert dynamics.controls[-1] == pytest.approx((10.0, 20.0, 100.0, 0.0))
+
+
+def test_pipeline_rejects_wrong_size_inputs():
+    pipeline = ActuatorPipeline(RecordingDynamics())
+    assert not pipeline.set_sticks((0.0, 0.0, 0.5))
+    assert not pipeline.set_motor_command((0.5,) * 5)
+    assert pipeline.rejected == 2
+    assert pipeline.source is ControlSource.NONE
+
+
+def test_pipeline_stops_motors_on_stale_input():
+    dynamics = RecordingDynamics()
+    pipeline = ActuatorPipeline(dynamics, input_timeout=0.5)
+
+    pipeline.set_motor_command((0.5, 0.5, 0.5, 0.5))
+    pipeline.step(t=0.0, dt=0.1)
+    pipeline.step(t=0.5, dt=0.1)
+    assert dynamics.controls[-1] == pytest.approx((500.0,) * 4)
+
+    pipeline.step(t=0.6, dt=0.1)
+    assert pipeline.source is ControlSource.NONE
+    assert not dynamics.controls[-1].any()
@@ -0,0 +1,289 @@
+# **********************************************************************************************************************
+#   FileName:
+#       test_database.py
+#
+#   Description:
+#       Tests for the parameter database
+#
+#   5/1/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import threading
+import numpy as np
+import pytest
+from VDrone.clock import SimClock, TimeoutService
+from VDrone.database import Entry, Events, ListenerDispatcher, ParameterDatabase
+from VDrone.parameters import AccelData, GyroData, MagData, ParameterID
+
+
+def gyro_entry(clock: SimClock) -> Entry:
+    param = GyroData(timeout=1.0, clock=clock)
+    param.update(np.zeros((3, 1)))
+    return Entry(param.id, param)
+
+
+def blocked_dispatcher(**kwargs):
+    """ Dispatcher whose worker is held inside a listener until the returned event is set """
+    dispatcher = ListenerDispatcher(**kwargs)
+    gate = threading.Event()
+    started = threading.Event()
+
+    def hold(_):
+        started.set()
+        gate.wait(timeout=5.0)
+
+    dispatcher.submit(Events.REMOVED, "hold", (hold,))
+    assert started.wait(timeout=5.0)
+    return dispatcher, gate
+
+
+def sensor_db(**kwargs) -> ParameterDatabase:
+    db = ParameterDatabase(**kwargs)
+    db.create(Entry(ParameterID.GYRO_DATA, GyroData()))
+    db.create(Entry(ParameterID.ACCEL_DATA, AccelData()))
+    return db
+
+
+def test_get_param_copy_with_timeout_service():
+    clock = SimClock()
+    db = ParameterDatabase(timeout_service=TimeoutService(clock=clock))
+    entry = gyro_entry(clock)
+    db.create(entry)
+
+    copied = db.get_param(entry.param_id)
+    assert copied.clock is clock
+    assert copied.is_valid()
+
+    clock.advance(5.0)
+    db._timeout_service.poll()
+    assert not db.is_valid(entry.param_id)
+    assert not copied.is_valid()
+
+
+def test_get_param_copy_follows_clock():
+    clock = SimClock()
+    db = ParameterDatabase(clock=clock)
+    entry = gyro_entry(clock)
+    db.create(entry)
+
+    copied = db.get_param(entry.param_id)
+    clock.advance(5.0)
+    assert not db.is_valid(entry.param_id)
+    assert not copied.is_valid()
+
+
+def test_mismatched_clocks_are_rejected():
+    clock = SimClock()
+    with pytest.raises(ValueError):
+        ParameterDatabase().create(gyro_entry(clock))
+    with pytest.raises(ValueError):
+        ParameterDatabase(timeout_service=TimeoutService(clock=clock)).create(gyro_entry(SimClock()))
+    with pytest.raises(ValueError):
+        ParameterDatabase(timeout_service=TimeoutService(clock=clock), clock=SimClock())
+
+
+def test_snapshot_versioning():
+    clock = SimClock()
+    db = ParameterDatabase(clock=clock)
+    entry = gyro_entry(clock)
+    db.create(entry)
+    version, first = entry.versioned_view()
+
+    buffer = np.ones((3, 1))
+    assert db.set(ParameterID.GYRO_DATA, buffer)
+    assert not db.set(ParameterID.GYRO_DATA, [1.0, 2.0, 3.0])
+    assert entry.versioned_view()[0] == version + 1
+
+    # Readers hold immutable snapshots that neither the producer nor later writes can change
+    view = db.get_view(ParameterID.GYRO_DATA)
+    buffer[:] = 7.0
+    assert np.array_equal(view, np.ones((3, 1)))
+    assert np.array_equal(first, np.zeros((3, 1)))
+    with pytest.raises(ValueError):
+        view[0, 0] = 2.0
+
+    # Views are shared, value() hands out a private copy
+    assert db.get_view(ParameterID.GYRO_DATA) is view
+    copied = db.get_value(ParameterID.GYRO_DATA)
+    copied[0, 0] = 5.0
+    assert view[0, 0] == 1.0
+
+
+def test_set_many_is_atomic_for_get_many():
+    db = sensor_db()
+    ids = (ParameterID.GYRO_DATA, ParameterID.ACCEL_DATA)
+    done = threading.Event()
+    torn = []
+
+    def writer():
+        for idx in range(2000):
+            value = np.full((3, 1), float(idx))
+            db.set_many({param_id: value for param_id in ids})
+        done.set()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    while not done.is_set():
+        snapshot = db.get_many(ids)
+        if not np.array_equal(snapshot[ids[0]], snapshot[ids[1]]):
+            torn.append(snapshot)
+    thread.join()
+
+    assert not torn
+    assert db.get_view(ids[0])[0, 0] == 1999.0
+
+
+def test_set_many_notifies_outside_the_lock():
+    db = sensor_db()
+    updates = []
+    batches = []
+
+    def listener(param_id):
+        # Another thread must be able to take the database lock while listeners run
+        reader = threading.Thread(target=lambda: updates.append(db.get_many([param_id])))
+        reader.start()
+        reader.join(timeout=1.0)
+        assert not reader.is_alive()
+
+    db._database[ParameterID.GYRO_DATA].register_listener(Events.UPDATE, listener)
+    db.register_batch_listener(batches.append)
+    results = db.set_many({ParameterID.GYRO_DATA: np.ones((3, 1)), ParameterID.ACCEL_DATA: "bad"})
+
+    assert results == {ParameterID.GYRO_DATA: True, ParameterID.ACCEL_DATA: False}
+    assert len(updates) == 1
+    assert batches == [{ParameterID.GYRO_DATA: Events.UPDATE, ParameterID.ACCEL_DATA: Events.ERROR}]
+
+
+def test_dispatcher_delivers_in_arrival_order():
+    dispatcher, gate = blocked_dispatcher(coalesce_updates=False)
+    delivered = []
+    for event_id, name in ((Events.TIMEOUT, "a"), (Events.UPDATE, "b"), (Events.INVALID, "c"), (Events.UPDATE, "d")):
+        assert dispatcher.submit(event_id, name, (delivered.append,))
+
+    gate.set()
+    dispatcher.shutdown()
+    assert delivered == ["a", "b", "c", "d"]
+
+
+def test_dispatcher_coalesces_updates():
+    dispatcher, gate = blocked_dispatcher()
+    delivered = []
+    for _ in range(5):
+        assert dispatcher.submit(Events.UPDATE, ParameterID.GYRO_DATA, (delivered.append,))
+    dispatcher.submit(Events.UPDATE, ParameterID.ACCEL_DATA, (delivered.append,))
+    dispatcher.submit(Events.TIMEOUT, ParameterID.GYRO_DATA, (delivered.append,))
+
+    gate.set()
+    dispatcher.shutdown()
+    assert delivered == [ParameterID.GYRO_DATA, ParameterID.ACCEL_DATA, ParameterID.GYRO_DATA]
+    assert dispatcher.metrics()["coalesced"] == 4
+
+
+def test_dispatcher_drops_per_event_type():
+    dispatcher, gate = blocked_dispatcher(queue_size=2, coalesce_updates=False)
+    delivered = []
+    results = [dispatcher.submit(Events.UPDATE, idx, (delivered.append,)) for idx in range(4)]
+    assert results == [True, True, False, False]
+
+    # A full UPDATE queue doesn't stop other event types
+    assert dispatcher.submit(Events.TIMEOUT, "timeout", (delivered.append,))
+
+    def broken(_):
+        raise RuntimeError("listener failure")
+
+    assert dispatcher.submit(Events.ERROR, "error", (broken,))
+
+    gate.set()
+    dispatcher.shutdown()
+    metrics = dispatcher.metrics()
+    assert delivered == [0, 1, "timeout"]
+    assert metrics["dropped"][Events.UPDATE] == 2
+    assert metrics["high_water"][Events.UPDATE] == 2
+    assert metrics["errors"] == 1
+    assert all(depth == 0 for depth in metrics["queue_depth"].values())
+
+
+def chain_db(clock: SimClock, **kwargs) -> ParameterDatabase:
+    """ Mag depends on accel, which depends on gyro """
+    db = ParameterDatabase(clock=clock, **kwargs)
+    for param_id, param, deps in ((ParameterID.GYRO_DATA, GyroData(clock=clock), None),
+                                  (ParameterID.ACCEL_DATA, AccelData(timeout=10.0, clock=clock),
+                                   [ParameterID.GYRO_DATA]),
+                                  (ParameterID.MAG_DATA, MagData(timeout=10.0, clock=clock), [ParameterID.ACCEL_DATA])):
+        db.create(Entry(param_id, param, dependencies=deps))
+    return db
+
+
+def test_invalidate_propagates_downstream():
+    db = chain_db(SimClock())
+    invalid = []
+    for param_id in (ParameterID.GYRO_DATA, ParameterID.ACCEL_DATA, ParameterID.MAG_DATA):
+        db._database[param_id].register_listener(Events.INVALID, invalid.append)
+    assert db.is_valid(ParameterID.MAG_DATA)
+
+    db.invalidate(ParameterID.ACCEL_DATA)
+    assert db.is_valid(ParameterID.GYRO_DATA)
+    assert not db.is_valid(ParameterID.ACCEL_DATA)
+    assert not db.is_valid(ParameterID.MAG_DATA)
+    assert invalid == [ParameterID.ACCEL_DATA, ParameterID.MAG_DATA]
+
+    # Writing the invalidated parameter restores the whole tree
+    assert db.set(ParameterID.ACCEL_DATA, np.zeros((3, 1)))
+    assert db.is_valid(ParameterID.MAG_DATA)
+
+
+def test_stale_dependency_invalidates_dependents():
+    clock = SimClock()
+    db = chain_db(clock)
+    assert db.is_valid(ParameterID.MAG_DATA)
+
+    # The gyro times out after 1s, while accel and mag are still fresh
+    clock.advance(2.0)
+    assert db._database[ParameterID.MAG_DATA].validity
+    assert not db.is_valid(ParameterID.MAG_DATA)
+
+    # A direct entry write bypassing the database still drops the cached result
+    db._database[ParameterID.GYRO_DATA].update(np.zeros((3, 1)))
+    assert db.is_valid(ParameterID.MAG_DATA)
+
+
+def test_dependency_cycles_are_rejected():
+    db = chain_db(SimClock())
+    with pytest.raises(ValueError):
+        db._graph.add(ParameterID.GYRO_DATA, [ParameterID.MAG_DATA])
+    assert db.dependency_list(ParameterID.GYRO_DATA) is None
+    assert db._graph.downstream(ParameterID.GYRO_DATA) == (ParameterID.GYRO_DATA, ParameterID.ACCEL_DATA,
+                                                           ParameterID.MAG_DATA)
+
+
+def test_timeout_service_expires_once_per_deadline():
+    clock = SimClock()
+    service = TimeoutService(clock=clock)
+    db = chain_db(clock, timeout_service=service)
+    timeouts = []
+    db._database[ParameterID.GYRO_DATA].register_listener(Events.TIMEOUT, timeouts.append)
+    assert db.is_valid(ParameterID.MAG_DATA)
+
+    # Nothing expires before the deadline
+    clock.advance(0.5)
+    assert service.poll() == 0
+    assert db.is_valid(ParameterID.MAG_DATA)
+
+    # The gyro misses its 1s deadline, which also invalidates its dependents
+    clock.advance(0.6)
+    assert service.poll() == 1
+    assert service.poll() == 0
+    assert timeouts == [ParameterID.GYRO_DATA]
+    assert not db.is_valid(ParameterID.GYRO_DATA)
+    assert not db.is_valid(ParameterID.MAG_DATA)
+
+    # An update re-arms the watch, and the next missed deadline expires it again
+    assert db.set(ParameterID.GYRO_DATA, np.zeros((3, 1)))
+    assert db.is_valid(ParameterID.MAG_DATA)
+    clock.advance(0.9)
+    db.set(ParameterID.GYRO_DATA, np.zeros((3, 1)))
+    clock.advance(0.9)
+    assert service.poll() == 0
+    clock.advance(0.2)
+    assert service.poll() == 1
+    assert timeouts == [ParameterID.GYRO_DATA] * 2
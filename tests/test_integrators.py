@@ -0,0 +1,70 @@
+# **********************************************************************************************************************
+#   FileName:
+#       test_integrators.py
+#
+#   Description:
+#       Tests for the generic state integrators
+#
+#   5/1/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import math
+import numpy as np
+from VDrone.dynamics.integrators import EulerIntegrator, RK4Integrator, RK45Integrator
+
+
+def decay(state: np.ndarray, control: np.ndarray, out: np.ndarray) -> None:
+    """ y' = -y, solved exactly by y0 * exp(-t) """
+    np.negative(state, out=out)
+
+
+def integrate(integrator, dt: float, h: float, y0: float = 1.0):
+    state = np.array([y0, 2.0 * y0])
+    steps = integrator.integrate(decay, state, np.zeros(0), dt, h)
+    return state, steps
+
+
+def test_fixed_step_count():
+    _, steps = integrate(EulerIntegrator(), 1.0, 0.1)
+    assert steps == 10
+    _, steps = integrate(RK4Integrator(), 1.0, 0.3)
+    assert steps == 4
+    _, steps = integrate(RK4Integrator(), 0.01, 0.1)
+    assert steps == 1
+
+
+def test_rk4_is_fourth_order():
+    errors = []
+    for h in (0.1, 0.05):
+        state, _ = integrate(RK4Integrator(), 1.0, h)
+        errors.append(abs(state[0] - math.exp(-1.0)))
+
+    assert 14.0 < errors[0] / errors[1] < 18.0
+
+
+def test_rk45_meets_tolerance():
+    loose, loose_steps = integrate(RK45Integrator(rtol=1e-4, atol=1e-6), 2.0, 0.01)
+    tight, tight_steps = integrate(RK45Integrator(rtol=1e-10, atol=1e-12), 2.0, 0.01)
+
+    exact = math.exp(-2.0)
+    assert abs(loose[0] - exact) < 1e-4
+    assert abs(tight[0] - exact) < 1e-9
+    assert np.allclose(tight[1], 2.0 * exact)
+    assert tight_steps > loose_steps
+
+
+def test_rk45_carries_step_size():
+    integrator = RK45Integrator(rtol=1e-6, atol=1e-9)
+    _, first_steps = integrate(integrator, 1.0, 1e-4)
+    earned = integrator.step_size
+    assert earned > 1e-4
+
+    # Starting from the earned step size takes fewer steps than growing it again from 1e-4
+    _, second_steps = integrate(integrator, 1.0, 1e-4)
+    assert second_steps < first_steps
+
+    # A short call is truncated to the remaining time without shrinking the carried step
+    carried = integrator.step_size
+    _, steps = integrate(integrator, carried / 10.0, 1e-4)
+    assert steps == 1
+    assert integrator.step_size == carried
@@ -0,0 +1,92 @@
+# **********************************************************************************************************************
+#   FileName:
+#       test_kernels.py
+#
+#   Description:
+#       Tests that the compiled and uncompiled dynamics kernels agree
+#
+#   5/1/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import importlib.util
+import os
+import warnings
+import numpy as np
+import pytest
+from VDrone.dynamics import kernels
+from VDrone.dynamics.integrators import RK4Integrator
+from VDrone.dynamics.newton_euler import NewtonEulerSim
+
+
+@pytest.fixture(scope="module")
+def numpy_kernels():
+    """ Separate copy of the kernels module loaded with the NumPy backend forced """
+    os.environ["VDRONE_DYNAMICS_BACKEND"] = "numpy"
+    try:
+        spec = importlib.util.spec_from_file_location("numpy_kernels", kernels.__file__)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        del os.environ["VDRONE_DYNAMICS_BACKEND"]
+
+    assert module.BACKEND == module.BACKEND_NUMPY
+    return module
+
+
+def airframe() -> NewtonEulerSim:
+    sim = NewtonEulerSim()
+    sim.mass = 1.2
+    sim.moment_arm_length = 0.2
+    sim.Ixx = 0.011
+    sim.Iyy = 0.012
+    sim.Izz = 0.021
+    sim.thrust_coefficient = 1.2e-5
+    sim.drag_coefficient = 2.0e-7
+    sim.phi = 0.1
+    sim.theta = -0.2
+    sim.psi = 0.3
+    sim.wx = 0.5
+    return sim
+
+
+CONTROL = np.array([510.0, 495.0, 505.0, 490.0])
+
+
+def test_rk4_backends_identical(numpy_kernels):
+    sim = airframe()
+    sim._pack_params()
+    state = sim.get_state()
+    compiled = state.copy()
+    uncompiled = state.copy()
+
+    kernels.rk4_integrate(compiled, CONTROL, sim._params, 0.01, 10, np.zeros((5, kernels.STATE_SIZE)))
+    numpy_kernels.rk4_integrate(uncompiled, CONTROL, sim._params, 0.01, 10, np.zeros((5, kernels.STATE_SIZE)))
+
+    assert np.array_equal(compiled, uncompiled)
+    assert not np.array_equal(compiled, state)
+
+
+def test_step_matches_generic_integrator(monkeypatch):
+    fused = airframe()
+    fused.step(CONTROL, None, 0.01)
+
+    monkeypatch.setattr(kernels, "COMPILED", False)
+    generic = airframe()
+    generic.step(CONTROL, None, 0.01)
+
+    assert isinstance(generic.integrator, RK4Integrator)
+    assert np.allclose(fused.get_state(), generic.get_state(), rtol=1e-10, atol=1e-13)
+
+
+def test_backends_agree_on_bad_params(numpy_kernels):
+    state = np.zeros(kernels.STATE_SIZE)
+    params = np.zeros(kernels.PARAM_SIZE)
+    for module in (kernels, numpy_kernels):
+        out = np.zeros(kernels.STATE_SIZE)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            module.derivative(state, np.ones(4), params, out)
+        assert np.isnan(out[3:6]).all()
+
+    with pytest.raises(ValueError):
+        NewtonEulerSim().step(np.zeros(4), None, 0.001)
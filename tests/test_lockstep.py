@@ -0,0 +1,148 @@
+# **********************************************************************************************************************
+#   FileName:
+#       test_lockstep.py
+#
+#   Description:
+#       Loopback tests of the lockstep tick protocol between the simulator and the flight software
+#
+#   5/1/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import asyncio
+import threading
+import time
+import pytest
+import zmq
+from VDrone.async_connection import AsyncSimConnection
+from VDrone.connection import SimConnection
+from VDrone.parameters import SimTickData, TickAckData
+
+MOTOR_COMMAND = (0.1, 0.2, 0.3, 0.4)
+
+
+class FakeFlightSoftware:
+    """ Acknowledges every sim tick it receives while 'responding' is set """
+
+    def __init__(self, config: dict):
+        ports = config["port"]
+        context = zmq.Context.instance()
+        self._sub = context.socket(zmq.SUB)
+        self._sub.connect("tcp://127.0.0.1:{}".format(ports[SimConnection.TxSocket.SENSOR.value]))
+        self._sub.setsockopt_string(zmq.SUBSCRIBE, SimConnection.TxTopics.SIM_TICK.value)
+        self._pub = context.socket(zmq.PUB)
+        self._pub.bind("tcp://127.0.0.1:{}".format(ports[SimConnection.RxSocket.SIM_INTERNAL.value]))
+
+        self.responding = threading.Event()
+        self.responding.set()
+        self._quit = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        tick, ack = SimTickData(), TickAckData()
+        topic = SimConnection.RxTopics.TICK_ACK.value.encode()
+        while not self._quit.is_set():
+            if self._sub.poll(10):
+                _, data = self._sub.recv_multipart()
+                if tick.decode(data) and self.responding.is_set():
+                    ack.update((tick.view(), MOTOR_COMMAND))
+                    self._pub.send_multipart([topic, ack.encode()])
+
+    def close(self) -> None:
+        self._quit.set()
+        self._thread.join()
+        self._sub.close(linger=0)
+        self._pub.close(linger=0)
+
+
+@pytest.fixture
+def lockstep(sim_ports):
+    conn = SimConnection(processing_period=0.01, sim_ports=sim_ports, log_file=None, lockstep=True,
+                         lockstep_timeout=0.05, lockstep_max_missed=3)
+    conn.start()
+    fsw = FakeFlightSoftware(sim_ports)
+    try:
+        # Tick until the PUB/SUB connections are up and acknowledgments flow
+        tick = 0
+        deadline = time.monotonic() + 5.0
+        while conn.end_tick(tick) is None:
+            assert time.monotonic() < deadline, "No acknowledgment through the loopback"
+            tick += 1
+            time.sleep(0.01)
+
+        yield conn, fsw, tick + 1
+    finally:
+        fsw.close()
+        conn.kill()
+        conn.join()
+
+
+def test_every_tick_is_acknowledged(lockstep):
+    conn, _, start = lockstep
+    before = conn.metrics()["lockstep"]
+    for tick in range(start, start + 20):
+        ack = conn.end_tick(tick)
+        assert ack is not None
+        assert ack[0] >= tick
+        assert ack[1] == pytest.approx(MOTOR_COMMAND)
+
+    after = conn.metrics()["lockstep"]
+    assert after["acked"] - before["acked"] == 20
+    assert after["timeouts"] == before["timeouts"]
+
+
+def test_missed_acks_time_out_then_free_run(lockstep):
+    conn, fsw, tick = lockstep
+    fsw.responding.clear()
+    before = conn.metrics()["lockstep"]
+
+    # The first misses wait out the timeout, after that the sim stops waiting
+    for _ in range(5):
+        assert conn.end_tick(tick) is None
+        tick += 1
+
+    stats = conn.metrics()["lockstep"]
+    assert stats["timeouts"] - before["timeouts"] == 3
+    assert stats["free_running"] - before["free_running"] == 2
+
+    # Acknowledgments resuming ends free running
+    fsw.responding.set()
+    deadline = time.monotonic() + 5.0
+    while conn.end_tick(tick) is None:
+        assert time.monotonic() < deadline, "Lockstep never resumed"
+        tick += 1
+        time.sleep(0.01)
+
+    assert conn.end_tick(tick + 1) is not None
+
+
+def test_async_connection_waits_for_acks(sim_ports):
+
+    async def run():
+        async with AsyncSimConnection(sim_ports=sim_ports, lockstep=True, lockstep_timeout=0.05,
+                                      lockstep_max_missed=3) as conn:
+            fsw = FakeFlightSoftware(sim_ports)
+            try:
+                tick = 0
+                deadline = time.monotonic() + 5.0
+                while await conn.end_tick(tick) is None:
+                    assert time.monotonic() < deadline, "No acknowledgment through the loopback"
+                    tick += 1
+                    await asyncio.sleep(0.01)
+
+                ack = await conn.end_tick(tick + 1)
+                assert ack[0] >= tick + 1
+                assert ack[1] == pytest.approx(MOTOR_COMMAND)
+
+                fsw.responding.clear()
+                before = conn.metrics()["lockstep"]
+                for offset in range(2, 7):
+                    assert await conn.end_tick(tick + offset) is None
+
+                stats = conn.metrics()["lockstep"]
+                assert stats["timeouts"] - before["timeouts"] == 3
+                assert stats["free_running"] - before["free_running"] == 2
+            finally:
+                fsw.close()
+
+    asyncio.run(run())
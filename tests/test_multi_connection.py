@@ -0,0 +1,70 @@
+# **********************************************************************************************************************
+#   FileName:
+#       test_multi_connection.py
+#
+#   Description:
+#       Loopback tests of the per-vehicle receive queues of the ConnectionManager
+#
+#   5/1/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import time
+import pytest
+import zmq
+from VDrone.connection import SimConnection
+from VDrone.multi_connection import ConnectionManager
+from VDrone.parameters import MotorCommandData
+from VDrone.ring_buffer import OverflowPolicy
+
+
+@pytest.fixture
+def manager(sim_ports):
+    manager = ConnectionManager(sim_ports=sim_ports, rx_queue_size=2, rx_overflow=OverflowPolicy.DROP_OLDEST)
+    manager.start()
+    try:
+        yield manager
+    finally:
+        manager.kill()
+        manager.join()
+
+
+def test_full_rx_queue_drops_oldest_and_recycles(manager, sim_ports):
+    link = manager.register(vehicle_id=7)
+    topic = link.data_map.get_encoded_topic(SimConnection.RxTopics.MOTOR_COMMAND)
+
+    pub = zmq.Context.instance().socket(zmq.PUB)
+    pub.bind("tcp://127.0.0.1:{}".format(sim_ports["port"][SimConnection.RxSocket.SYS_CONTROL.value]))
+    try:
+        # Wait for the subscription to go through before flooding the vehicle
+        command = MotorCommandData()
+        deadline = time.monotonic() + 5.0
+        while link.metrics()["depth"] == 0:
+            assert time.monotonic() < deadline, "Nothing received through the loopback"
+            command.update((0.0, 0.0, 0.0, 0.0))
+            pub.send_multipart([topic, command.encode()])
+            time.sleep(0.01)
+
+        for idx in range(10):
+            command.update((idx / 10.0,) * 4)
+            pub.send_multipart([topic, command.encode()])
+
+        # Let the pump work through the flood
+        dropped = -1
+        deadline = time.monotonic() + 5.0
+        while link.metrics()["dropped"] != dropped:
+            assert time.monotonic() < deadline, "Receive queue never settled"
+            dropped = link.metrics()["dropped"]
+            time.sleep(0.1)
+        assert dropped >= 9
+    finally:
+        pub.close(linger=0)
+
+    # Only the two newest commands are kept, everything else went back to the pool
+    received = [link.receive(), link.receive()]
+    assert link.receive() is None
+    assert [param.view()[0] for param in received] == pytest.approx([0.8, 0.9])
+
+    for param in received:
+        link.release(param)
+    pool = link.data_map._pools[MotorCommandData]
+    assert len(pool) == link.data_map.pool_size
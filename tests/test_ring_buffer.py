@@ -0,0 +1,107 @@
+# **********************************************************************************************************************
+#   FileName:
+#       test_ring_buffer.py
+#
+#   Description:
+#       Tests for the single-producer/single-consumer ring buffer
+#
+#   5/1/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+from threading import Thread
+from VDrone.ring_buffer import OverflowPolicy, SPSCRingBuffer
+
+
+class InterleavedStorage(list):
+    """ Slot storage that runs a producer action right after the consumer loads a slot """
+
+    def __init__(self, items: list):
+        super().__init__(items)
+        self.on_read = None
+
+    def __getitem__(self, index):
+        value = super().__getitem__(index)
+        if self.on_read is not None:
+            action, self.on_read = self.on_read, None
+            action()
+        return value
+
+
+def drain(ring: SPSCRingBuffer) -> list:
+    items = []
+    item = ring.get()
+    while item is not None:
+        items.append(item)
+        item = ring.get()
+    return items
+
+
+def test_fifo_order():
+    ring = SPSCRingBuffer(capacity=4)
+    for item in "abc":
+        assert ring.put(item)
+    assert drain(ring) == ["a", "b", "c"]
+    assert ring.empty()
+
+
+def test_drop_newest_rejects_when_full():
+    ring = SPSCRingBuffer(capacity=2, policy=OverflowPolicy.DROP_NEWEST)
+    assert ring.put("a") and ring.put("b")
+    assert not ring.put("c")
+    assert drain(ring) == ["a", "b"]
+    assert ring.metrics()["dropped"] == 1
+
+
+def test_block_times_out_when_full():
+    ring = SPSCRingBuffer(capacity=1, policy=OverflowPolicy.BLOCK)
+    assert ring.put("a")
+    assert not ring.put("b", timeout=0.001)
+    assert drain(ring) == ["a"]
+
+
+def test_drop_oldest_evicts_through_hook():
+    evicted = []
+    ring = SPSCRingBuffer(capacity=2, policy=OverflowPolicy.DROP_OLDEST, on_evict=evicted.append)
+    for item in "abcd":
+        assert ring.put(item)
+    assert drain(ring) == ["c", "d"]
+    assert evicted == ["a", "b"]
+
+
+def test_overwrite_during_read_delivers_each_item_once():
+    # Producer overwrites the slot the consumer is in the middle of reading
+    evicted = []
+    ring = SPSCRingBuffer(capacity=2, policy=OverflowPolicy.DROP_OLDEST, on_evict=evicted.append)
+    ring.put("a")
+    ring.put("b")
+
+    storage = InterleavedStorage(ring._storage)
+    storage.on_read = lambda: ring.put("c")
+    ring._storage = storage
+
+    delivered = drain(ring)
+    assert delivered == ["b", "c"]
+    assert evicted == ["a"]
+    assert ring.get() is None
+
+
+def test_threaded_drop_oldest_never_duplicates():
+    count = 100000
+    evicted = []
+    ring = SPSCRingBuffer(capacity=8, policy=OverflowPolicy.DROP_OLDEST, on_evict=evicted.append)
+    delivered = []
+
+    def producer():
+        for item in range(count):
+            ring.put(item)
+
+    thread = Thread(target=producer)
+    thread.start()
+    while thread.is_alive() or not ring.empty():
+        item = ring.get()
+        if item is not None:
+            delivered.append(item)
+    thread.join()
+
+    assert all(later > earlier for earlier, later in zip(delivered, delivered[1:]))
+    assert sorted(delivered + evicted) == list(range(count))
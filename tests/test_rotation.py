@@ -0,0 +1,73 @@
+# **********************************************************************************************************************
+#   FileName:
+#       test_rotation.py
+#
+#   Description:
+#       Tests for the body to inertial frame rotation kernels
+#
+#   5/1/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import numpy as np
+import pytest
+from VDrone.dynamics.newton_euler import NewtonEulerSim
+from VDrone.dynamics.rotation import EulerRotation, QuaternionRotation
+
+
+def reference_matrix(phi: float, theta: float, psi: float) -> np.ndarray:
+    """ R = Rz(psi) * Ry(theta) * Rx(phi) """
+    c, s = np.cos, np.sin
+    rx = np.array([[1.0, 0.0, 0.0], [0.0, c(phi), -s(phi)], [0.0, s(phi), c(phi)]])
+    ry = np.array([[c(theta), 0.0, s(theta)], [0.0, 1.0, 0.0], [-s(theta), 0.0, c(theta)]])
+    rz = np.array([[c(psi), -s(psi), 0.0], [s(psi), c(psi), 0.0], [0.0, 0.0, 1.0]])
+    return rz @ ry @ rx
+
+
+@pytest.fixture
+def attitudes() -> np.ndarray:
+    return np.random.default_rng(4).uniform(-1.5, 1.5, size=(25, 3))
+
+
+def test_sim_rotation_matches_reference(attitudes):
+    sim = NewtonEulerSim()
+    for phi, theta, psi in attitudes:
+        R = sim.rotation_matrix_to_interial(phi, theta, psi)
+        assert np.allclose(R, reference_matrix(phi, theta, psi))
+        assert np.allclose(R @ R.T, np.eye(3))
+
+
+@pytest.mark.parametrize("kernel", [EulerRotation(), QuaternionRotation()])
+def test_kernels_match_sim(kernel, attitudes):
+    sim = NewtonEulerSim()
+    for phi, theta, psi in attitudes:
+        assert np.allclose(kernel.compute(phi, theta, psi), sim.rotation_matrix_to_interial(phi, theta, psi))
+
+    batch = kernel.compute_batch(attitudes[:, 0], attitudes[:, 1], attitudes[:, 2])
+    assert batch.shape == (attitudes.shape[0], 3, 3)
+    for R, (phi, theta, psi) in zip(batch, attitudes):
+        assert np.allclose(R, sim.rotation_matrix_to_interial(phi, theta, psi))
+
+
+def test_quaternion_entry_points(attitudes):
+    quaternions = QuaternionRotation.from_euler_batch(attitudes[:, 0], attitudes[:, 1], attitudes[:, 2])
+    assert np.allclose(np.linalg.norm(quaternions, axis=1), 1.0)
+
+    kernel = QuaternionRotation()
+    batch = QuaternionRotation.compute_quaternion_batch(quaternions)
+    for q, R, (phi, theta, psi) in zip(quaternions, batch, attitudes):
+        assert np.allclose(kernel.compute_quaternion(q), reference_matrix(phi, theta, psi))
+        assert np.allclose(R, reference_matrix(phi, theta, psi))
+
+
+def test_euler_cache_and_output_buffer():
+    kernel = EulerRotation()
+    first = kernel.compute(0.1, 0.2, 0.3).copy()
+
+    # Only psi changes, the cached phi and theta terms must still combine correctly
+    assert np.allclose(kernel.compute(0.1, 0.2, -0.7), reference_matrix(0.1, 0.2, -0.7))
+    assert np.allclose(kernel.compute(0.1, 0.2, 0.3), first)
+
+    out = np.zeros((3, 3))
+    assert kernel.compute(0.4, -0.2, 0.9, out=out) is out
+    assert np.allclose(out, reference_matrix(0.4, -0.2, 0.9))
+    assert kernel.compute(0.4, -0.2, 0.9) is kernel.matrix
@@ -0,0 +1,94 @@
+# **********************************************************************************************************************
+#   FileName:
+#       test_simulator.py
+#
+#   Description:
+#       Tests for the generic model simulator
+#
+#   5/1/21 | Brandon Braun | brandonbraun653@gmail.com
+# **********************************************************************************************************************
+
+import numpy as np
+import pytest
+from VDrone.interface import TransferFunction
+from VDrone.propeller.model import StandardProp
+from VDrone.simulator import SimTrace, Simulator
+
+
+class QuadraticModel(TransferFunction):
+    """ Memoryless model that only provides the scalar evaluation, so batches use the row by row fallback """
+
+    def tf_evaluate(self, sig_in: np.ndarray, dt: float = 0.0) -> np.ndarray:
+        sig_in = np.asarray(sig_in, dtype=float)
+        return np.array([sig_in.sum() ** 2, dt * sig_in[0]])
+
+
+def scalar_runs(model: TransferFunction, t0: float, tf: float, ts: float, inputs: np.ndarray) -> np.ndarray:
+    sim = Simulator()
+    sim.attach_model(model)
+    outputs = []
+    for sig_in in inputs:
+        sim.run(t0, tf, ts, sig_in=sig_in)
+        outputs.append(sim.sim_data['output'].copy())
+    return np.stack(outputs, axis=1)
+
+
+@pytest.mark.parametrize("model", [StandardProp(), QuadraticModel()])
+def test_run_batch_matches_scalar_runs(model):
+    inputs = np.array([[0.0, 1.0], [2.0, -3.0], [0.5, 0.25]])
+
+    sim = Simulator()
+    sim.attach_model(model)
+    batch = sim.run_batch(0.0, 1.0, 0.1, sig_in=inputs)
+
+    expected = scalar_runs(model, 0.0, 1.0, 0.1, inputs)
+    assert batch.shape == expected.shape
+    assert np.allclose(batch, expected)
+
+
+def test_run_batch_per_step_inputs():
+    steps = np.arange(0.0, 0.5, 0.1).size
+    inputs = np.arange(steps * 2 * 2, dtype=float).reshape(steps, 2, 2)
+
+    sim = Simulator()
+    sim.attach_model(StandardProp())
+    batch = sim.run_batch(0.0, 0.5, 0.1, sig_in=inputs)
+
+    assert np.array_equal(batch, inputs)
+    with pytest.raises(ValueError):
+        sim.run_batch(0.0, 1.0, 0.1, sig_in=inputs)
+
+
+def test_run_batch_without_steps():
+    sim = Simulator()
+    sim.attach_model(StandardProp())
+    sim.run_batch(0.0, 0.5, 0.1, sig_in=np.ones((3, 2)))
+
+    batch = sim.run_batch(0.5, 0.5, 0.1, sig_in=np.ones((3, 2)))
+    assert batch.size == 0
+    assert sim.batch_data is batch
+
+
+def test_trace_grows_geometrically():
+    trace = SimTrace(capacity=4)
+    capacities = set([])
+    for idx in range(1000):
+        trace.append(float(idx), [idx, -idx])
+        capacities.add(trace.capacity)
+
+    assert len(trace) == 1000
+    assert len(capacities) < 10
+    assert np.array_equal(trace.data['t'], np.arange(1000.0))
+    assert np.array_equal(trace.data['output'][:, 1], -np.arange(1000.0))
+
+
+def test_run_until_stops_on_condition():
+    sim = Simulator()
+    sim.attach_model(StandardProp())
+    sim.run_until(0.0, 0.5, stop=lambda t, output: t >= 5000.0, sig_in=np.array([1.0]))
+
+    assert len(sim.sim_data) == 10001
+    assert sim.sim_data['t'][-1] == 5000.0
+
+    sim.run_until(0.0, 0.5, stop=lambda t, output: False, max_steps=3)
+    assert len(sim.sim_data) == 3